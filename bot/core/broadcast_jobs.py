@@ -0,0 +1,124 @@
+"""
+broadcast_jobs.py
+
+Сохраняемые рассылки:
+- Задание записывается в broadcast_job и планируется в JobQueue на время,
+  указанное администратором (прошедшее время — запуск сразу).
+- При старте рассылки получатели фиксируются в broadcast_delivery одним
+  INSERT ... SELECT (роль, исключения, отказ от рассылок), затем читаются
+  страницами по ключу на коротких соединениях; после каждой отправки
+  записывается её результат.
+- После перезапуска бота `schedule_active_broadcasts` заново планирует
+  запланированные задания и продолжает прерванные — только по получателям,
+  которым ещё ничего не отправлялось.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from telegram.ext import Application, ContextTypes, JobQueue
+
+from bot.core.broadcaster import BroadcastMessage, BroadcastStats, run_broadcast, progress_message_updater
+from db.broadcasts import (
+    get_broadcast_job, get_active_broadcast_jobs, begin_broadcast_job, iter_pending_deliveries,
+    claim_delivery, complete_delivery, finish_broadcast_job, get_delivery_counts, recipient_roles
+)
+from log_dialog.logger import moscow
+
+# Задания, выполняемые в этом процессе (защита от повторного запуска)
+_running_jobs: set[int] = set()
+
+
+def schedule_broadcast_job(job_queue: JobQueue, job_id: int, scheduled_at: datetime) -> None:
+    """
+    Планирует запуск рассылки в JobQueue.
+
+    Args:
+        job_queue (JobQueue): Очередь заданий приложения.
+        job_id (int): ID задания рассылки.
+        scheduled_at (datetime): Время запуска (aware); прошедшее время — запуск сразу.
+    """
+    delay = max(0.0, (scheduled_at - datetime.now(moscow)).total_seconds())
+    job_queue.run_once(broadcast_job_callback, timedelta(seconds=delay), data=job_id, name=f"broadcast:{job_id}")
+    logging.info(f"[BROADCAST] Рассылка #{job_id} запланирована через {delay:.0f} с")
+
+
+async def broadcast_job_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Колбэк JobQueue: выполняет рассылку из context.job.data.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): Контекст задания.
+    """
+    await run_broadcast_job(context.bot, context.job.data)
+
+
+async def run_broadcast_job(bot, job_id: int) -> None:
+    """
+    Выполняет (или продолжает) рассылку: фиксирует получателей, рассылает
+    ещё не обработанным и записывает результат по каждому.
+
+    Args:
+        bot: Экземпляр Telegram-бота.
+        job_id (int): ID задания рассылки.
+    """
+    if job_id in _running_jobs:
+        return
+    _running_jobs.add(job_id)
+    try:
+        job = await get_broadcast_job(job_id)
+        if job is None or job["status"] not in ("scheduled", "running"):
+            return
+
+        await begin_broadcast_job(job_id, recipient_roles(job["target_role"]))
+        counts = await get_delivery_counts(job_id)
+        stats = BroadcastStats(
+            total=sum(counts.values()),
+            success=counts.get("sent", 0),
+            failed=counts.get("failed", 0) + counts.get("unknown", 0),
+        )
+        logging.info(f"[BROADCAST] Рассылка #{job_id}: осталось {counts.get('pending', 0)} из {stats.total}")
+
+        on_progress = None
+        if job["progress_chat_id"] and job["progress_message_id"]:
+            on_progress = progress_message_updater(
+                bot, job["progress_chat_id"], job["progress_message_id"], job["progress_with_caption"]
+            )
+
+        async def claim(chat_id: int) -> bool:
+            return await claim_delivery(job_id, chat_id)
+
+        async def on_result(chat_id: int, success: bool) -> None:
+            await complete_delivery(job_id, chat_id, success)
+
+        await run_broadcast(
+            bot,
+            iter_pending_deliveries(job_id),
+            BroadcastMessage(text=job["text"], photo_file_id=job["photo_file_id"]),
+            on_progress=on_progress,
+            claim=claim,
+            on_result=on_result,
+            stats=stats,
+        )
+        if not await finish_broadcast_job(job_id):
+            # Часть получателей осталась pending (ошибка БД при резервировании) —
+            # задание остаётся running и будет продолжено при следующем запуске
+            logging.warning(f"[BROADCAST] Рассылка #{job_id} не завершена: остались неотправленные получатели")
+    except Exception as e:
+        # Задание остаётся running и будет продолжено при следующем запуске
+        logging.error(f"[BROADCAST] Рассылка #{job_id} прервана: {e}")
+    finally:
+        _running_jobs.discard(job_id)
+
+
+async def schedule_active_broadcasts(application: Application) -> None:
+    """
+    Планирует все запланированные и незавершённые рассылки (вызывается при старте бота).
+
+    Args:
+        application (Application): Приложение PTB.
+    """
+    jobs = await get_active_broadcast_jobs()
+    for job in jobs:
+        schedule_broadcast_job(application.job_queue, job["id"], job["scheduled_at"])
+    if jobs:
+        logging.info(f"[BROADCAST] Восстановлено рассылок: {len(jobs)}")
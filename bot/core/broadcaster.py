@@ -0,0 +1,248 @@
+"""
+broadcaster.py
+
+Движок рассылок:
+- Пул из BROADCAST_WORKERS воркеров, разбирающих общую очередь получателей.
+- Общий token bucket на BROADCAST_RATE сообщений в секунду (лимит Telegram ~30/с)
+  и минимальный интервал BROADCAST_CHAT_INTERVAL между сообщениями в один чат.
+- RetryAfter приостанавливает все воркеры на указанное время, сообщение
+  отправляется повторно.
+- Прогресс раз в BROADCAST_PROGRESS_INTERVAL секунд выводится в одно сообщение
+  администратора.
+
+Задания рассылок, их планирование и сохранение прогресса — в bot.core.broadcast_jobs.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import AsyncIterable, Awaitable, Callable, Optional
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+from bot.core.utils.rate_limit import TokenBucket, retry_after_seconds
+
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", 25))
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", 8))
+BROADCAST_CHAT_INTERVAL = float(os.getenv("BROADCAST_CHAT_INTERVAL", 1.0))
+BROADCAST_PROGRESS_INTERVAL = float(os.getenv("BROADCAST_PROGRESS_INTERVAL", 3.0))
+BROADCAST_MAX_RETRIES = 3
+
+# Общий для всех рассылок процесса: лимит Telegram действует на бота целиком
+_bucket = TokenBucket(BROADCAST_RATE)
+_chat_last_sent: dict[int, float] = {}
+
+ProgressCallback = Callable[["BroadcastStats", bool], Awaitable[None]]
+ClaimCallback = Callable[[int], Awaitable[bool]]
+ResultCallback = Callable[[int, bool], Awaitable[None]]
+
+
+@dataclass
+class BroadcastMessage:
+    """
+    Содержимое рассылки.
+
+    Args:
+        text (str): Текст (HTML) или подпись к фото.
+        photo_file_id (Optional[str]): file_id фото, если рассылка с картинкой.
+    """
+    text: str
+    photo_file_id: Optional[str] = None
+
+    async def send(self, bot, chat_id: int) -> None:
+        if self.photo_file_id:
+            await bot.send_photo(chat_id=chat_id, photo=self.photo_file_id, caption=self.text, parse_mode="HTML")
+        else:
+            await bot.send_message(chat_id=chat_id, text=self.text, parse_mode="HTML")
+
+
+@dataclass
+class BroadcastStats:
+    """Счётчики рассылки."""
+    total: int = 0
+    success: int = 0
+    failed: int = 0
+
+    @property
+    def done(self) -> int:
+        return self.success + self.failed
+
+
+async def _wait_chat_slot(chat_id: int) -> None:
+    """Выдерживает BROADCAST_CHAT_INTERVAL между сообщениями в один чат."""
+    loop = asyncio.get_running_loop()
+    last = _chat_last_sent.get(chat_id)
+    if last is not None:
+        delay = last + BROADCAST_CHAT_INTERVAL - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    _chat_last_sent[chat_id] = loop.time()
+
+
+def _prune_chat_slots() -> None:
+    """Забывает чаты, интервал для которых уже истёк."""
+    threshold = asyncio.get_running_loop().time() - BROADCAST_CHAT_INTERVAL
+    for chat_id in [cid for cid, last in _chat_last_sent.items() if last < threshold]:
+        del _chat_last_sent[chat_id]
+
+
+async def send_with_limits(bot, chat_id: int, message: BroadcastMessage) -> bool:
+    """
+    Отправляет сообщение с учётом общего лимита, лимита на чат и RetryAfter.
+
+    Args:
+        bot: Экземпляр Telegram-бота.
+        chat_id (int): Получатель.
+        message (BroadcastMessage): Содержимое рассылки.
+
+    Returns:
+        bool: True, если сообщение доставлено.
+    """
+    for _ in range(BROADCAST_MAX_RETRIES):
+        await _bucket.acquire()
+        await _wait_chat_slot(chat_id)
+        try:
+            await message.send(bot, chat_id)
+            return True
+        except RetryAfter as e:
+            delay = retry_after_seconds(e)
+            logging.warning(f"[BROADCAST] RetryAfter {delay}s, пауза рассылки")
+            _bucket.pause(delay)
+        except (Forbidden, BadRequest) as e:
+            # Бот заблокирован или чат не существует — повтор не поможет
+            logging.warning(f"[BROADCAST] Не удалось отправить пользователю {chat_id}: {e}")
+            return False
+        except Exception as e:
+            logging.error(f"[BROADCAST] Ошибка отправки пользователю {chat_id}: {e}")
+            return False
+    logging.error(f"[BROADCAST] Пользователю {chat_id} не отправлено: превышено число повторов")
+    return False
+
+
+async def run_broadcast(
+    bot,
+    recipients: AsyncIterable[list[int]],
+    message: BroadcastMessage,
+    on_progress: Optional[ProgressCallback] = None,
+    claim: Optional[ClaimCallback] = None,
+    on_result: Optional[ResultCallback] = None,
+    stats: Optional[BroadcastStats] = None
+) -> BroadcastStats:
+    """
+    Рассылает сообщение всем получателям пулом воркеров.
+
+    Получатели читаются пачками по мере того, как воркеры разбирают очередь:
+    очередь ограничена, поэтому весь список в памяти не держится.
+
+    Args:
+        bot: Экземпляр Telegram-бота.
+        recipients (AsyncIterable[list[int]]): Пачки Telegram ID получателей.
+        message (BroadcastMessage): Содержимое рассылки.
+        on_progress (Optional[ProgressCallback]): Вызывается с текущими счётчиками
+            раз в BROADCAST_PROGRESS_INTERVAL секунд и один раз в конце (final=True).
+        claim (Optional[ClaimCallback]): Вызывается перед отправкой; False — получатель пропускается.
+        on_result (Optional[ResultCallback]): Вызывается с результатом отправки каждому получателю.
+        stats (Optional[BroadcastStats]): Счётчики рассылки с известным total (например,
+            продолжаемой после перезапуска). Если не переданы, total считается по мере чтения.
+
+    Returns:
+        BroadcastStats: Итоговые счётчики.
+    """
+    queue: asyncio.Queue[Optional[int]] = asyncio.Queue(maxsize=BROADCAST_WORKERS * 2)
+    count_total = stats is None
+    if stats is None:
+        stats = BroadcastStats()
+
+    async def producer() -> None:
+        try:
+            async for chunk in recipients:
+                for chat_id in chunk:
+                    if count_total:
+                        stats.total += 1
+                    await queue.put(chat_id)
+        finally:
+            for _ in workers:
+                await queue.put(None)
+
+    async def worker() -> None:
+        while True:
+            chat_id = await queue.get()
+            if chat_id is None:
+                return
+            if claim is not None and not await claim(chat_id):
+                continue
+            success = await send_with_limits(bot, chat_id, message)
+            if success:
+                stats.success += 1
+            else:
+                stats.failed += 1
+            if on_result is not None:
+                await on_result(chat_id, success)
+
+    async def reporter() -> None:
+        while True:
+            await asyncio.sleep(BROADCAST_PROGRESS_INTERVAL)
+            await _report(on_progress, stats, final=False)
+
+    workers = [asyncio.create_task(worker()) for _ in range(BROADCAST_WORKERS)]
+    tasks = [asyncio.create_task(producer()), *workers]
+    progress_task = asyncio.create_task(reporter()) if on_progress else None
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if progress_task:
+            progress_task.cancel()
+
+    _prune_chat_slots()
+    await _report(on_progress, stats, final=True)
+    logging.info(f"[BROADCAST] Завершена: {stats.success}/{stats.total}, ошибок {stats.failed}")
+    return stats
+
+
+async def _report(on_progress: Optional[ProgressCallback], stats: BroadcastStats, final: bool) -> None:
+    if on_progress is None:
+        return
+    try:
+        await on_progress(stats, final)
+    except Exception as e:
+        logging.warning(f"[BROADCAST] Ошибка обновления прогресса: {e}")
+
+
+def progress_message_updater(bot, chat_id: int, message_id: int, with_caption: bool = False) -> ProgressCallback:
+    """
+    Создаёт колбэк, который выводит прогресс рассылки в сообщение администратора.
+    Повторные одинаковые тексты не отправляются (Telegram отвечает на них ошибкой).
+
+    Args:
+        bot: Экземпляр Telegram-бота.
+        chat_id (int): Чат сообщения с прогрессом.
+        message_id (int): ID сообщения с прогрессом.
+        with_caption (bool): Сообщение — фото с подписью (редактируется caption).
+
+    Returns:
+        ProgressCallback: Колбэк для `run_broadcast`.
+    """
+    last_text: list[str] = []
+
+    async def update(stats: BroadcastStats, final: bool) -> None:
+        if final:
+            text = (
+                f"✅ Рассылка завершена!\n\n"
+                f"Успешно: {stats.success} ✅\nНе удалось: {stats.failed} ❌"
+            )
+        else:
+            text = (
+                f"⏳ Рассылка: {stats.done}/{stats.total}\n\n"
+                f"Успешно: {stats.success} ✅\nНе удалось: {stats.failed} ❌"
+            )
+        if last_text and last_text[0] == text:
+            return
+        if with_caption:
+            await bot.edit_message_caption(chat_id=chat_id, message_id=message_id, caption=text)
+        else:
+            await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text)
+        last_text[:] = [text]
+
+    return update
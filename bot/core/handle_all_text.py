@@ -9,18 +9,16 @@ handlers.py
 """
 
 import logging
-from telegram import Update, InputFile
-from telegram.constants import ParseMode
+from telegram import Update
 from telegram.ext import ContextTypes
-import psycopg2
 
 from db.feedback import fetch_feedback_by_id
-from db.admins import execute_custom_sql_query, df_to_excel_bytes
 from bot.feedback.router import feedback_router
 from macro.filter_rows.handler import process_filter_rows_scenario
 from macro.convert_to_num.handler import process_convert_column_scenario
 from bot.core.utils.admin_utils import is_admin
 from bot.core.handlers_admin.broadcast import handle_broadcast_datetime, handle_broadcast_whats_new
+from bot.core.handlers_admin.sql_tools import run_sql_with_guard
 
 
 async def handle_all_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -78,30 +76,13 @@ async def handle_all_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if table_name and "table" in query_text.lower():
             query_text = query_text.replace("table", table_name)
 
-        try:
-            df = await execute_custom_sql_query(query_text, user_id)
-        except psycopg2.Error as e:
-            msg = e.pgerror or str(e)
-            return await update.message.reply_text(
-                f"❌ Ошибка SQL:\n<code>{msg.strip()}</code>", parse_mode=ParseMode.HTML
-            )
-        except Exception as e:
-            return await update.message.reply_text(
-                f"❌ Неизвестная ошибка:\n<code>{str(e)}</code>", parse_mode=ParseMode.HTML
-            )
-
-        if df.empty:
-            return await update.message.reply_text("⚠️ Запрос выполнен, но результат пуст.")
-
-        if len(df) <= 10 and df.shape[1] <= 5:
-            text = df.to_string(index=False)
-            await update.message.reply_text(f"✅ Запрос выполнен:\n<pre>{text}</pre>", parse_mode=ParseMode.HTML)
-        else:
-            excel_buf = df_to_excel_bytes(df)
-            await update.message.reply_document(
-                document=InputFile(excel_buf, "result.xlsx"),
-                caption="📎 Результат запроса (Excel)"
-            )
+        await run_sql_with_guard(
+            update.message,
+            context,
+            user_id,
+            query_text,
+            done_text="✅ Запрос выполнен:"
+        )
 
         user_data.pop("state", None)
         user_data.pop("sql_table", None)
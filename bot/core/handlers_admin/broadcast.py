@@ -6,7 +6,8 @@ broadcast.py
 - Ввод даты/времени
 - Ввод текста или фото
 - Предпросмотр и подтверждение
-- Рассылка сообщений
+- Сохранение и планирование рассылки
+- Статус последних рассылок
 """
 
 import logging
@@ -18,8 +19,16 @@ from telegram import (
 )
 from telegram.ext import ContextTypes
 
-from db.users import get_users_by_role, get_all_roles_from_db
+from db.broadcasts import create_broadcast_job, get_recent_broadcast_jobs
 from bot.core.utils.admin_utils import is_admin, reset_all_user_state
+from bot.core.broadcast_jobs import schedule_broadcast_job
+from log_dialog.logger import moscow
+
+BROADCAST_STATUS_LABELS = {
+    "scheduled": "🗓 запланирована",
+    "running": "⏳ идёт",
+    "done": "✅ завершена",
+}
 
 
 async def admin_broadcast_entry(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -43,6 +52,7 @@ async def admin_broadcast_entry(update: Update, context: ContextTypes.DEFAULT_TY
         [InlineKeyboardButton("👥 Пользователям", callback_data="broadcast_role_auth")],
         [InlineKeyboardButton("🛠 Админам", callback_data="broadcast_role_admin")],
         [InlineKeyboardButton("👤 Всем", callback_data="broadcast_role_all")],
+        [InlineKeyboardButton("📋 Статус рассылок", callback_data="broadcast_status")],
     ])
 
     await update.callback_query.message.edit_text(
@@ -218,7 +228,8 @@ async def handle_broadcast_cancel(update: Update, context: ContextTypes.DEFAULT_
 
 async def handle_broadcast_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
-    Подтверждает и запускает рассылку сообщения выбранной роли.
+    Подтверждает рассылку: сохраняет задание и планирует его на указанные дату и время.
+    Рассылка идёт в фоне (bot.core.broadcast_jobs), прогресс обновляется в этом же сообщении.
 
     Args:
         update (Update): Объект Telegram.
@@ -242,47 +253,76 @@ async def handle_broadcast_confirm(update: Update, context: ContextTypes.DEFAULT
         f"<b>Опубликовал:</b> {author}"
     )
 
-    if target_role == "all":
-        roles = await get_all_roles_from_db()
-        user_ids = []
-        for role in roles:
-            await user_ids.extend(get_users_by_role(role))
-        user_ids = list(set(user_ids))
-    else:
-        user_ids = await get_users_by_role(target_role)
-
-    success, failed = 0, 0
-    for user_id in user_ids:
-        try:
-            if photo_id:
-                await context.bot.send_photo(
-                    chat_id=user_id,
-                    photo=photo_id,
-                    caption=final_text,
-                    parse_mode="HTML"
-                )
-            else:
-                await context.bot.send_message(
-                    chat_id=user_id,
-                    text=final_text,
-                    parse_mode="HTML"
-                )
-            success += 1
-        except Exception as e:
-            logging.error(f"Не удалось отправить пользователю {user_id}: {e}")
-            failed += 1
-
-    confirm_text = (
-        f"✅ Рассылка завершена!\n\n"
-        f"Успешно: {success} ✅\nНе удалось: {failed} ❌"
+    try:
+        scheduled_at = moscow.localize(datetime.strptime(dt, "%d.%m.%Y %H:%M"))
+    except ValueError:
+        scheduled_at = datetime.now(moscow)
+
+    with_caption = bool(query.message.photo)
+    job_id = await create_broadcast_job(
+        target_role=target_role,
+        text=final_text,
+        photo_file_id=photo_id,
+        scheduled_at=scheduled_at,
+        created_by=update.effective_user.id,
+        progress_chat_id=query.message.chat_id,
+        progress_message_id=query.message.message_id,
+        progress_with_caption=with_caption
     )
 
+    if job_id is None:
+        status_text = "❌ Не удалось сохранить рассылку. Попробуйте ещё раз."
+    else:
+        schedule_broadcast_job(context.job_queue, job_id, scheduled_at)
+        if scheduled_at > datetime.now(moscow):
+            status_text = f"🗓 Рассылка #{job_id} запланирована на {dt}."
+        else:
+            status_text = f"⏳ Рассылка #{job_id} запущена."
+
     try:
-        if query.message.photo:
-            await query.message.edit_caption(confirm_text)
+        if with_caption:
+            await query.message.edit_caption(status_text)
         else:
-            await query.message.edit_text(confirm_text)
+            await query.message.edit_text(status_text)
     except Exception as e:
-        logging.error(f"Ошибка при финальном сообщении: {e}")
+        logging.error(f"Ошибка при обновлении сообщения рассылки: {e}")
 
     context.user_data.clear()
+
+
+async def show_broadcast_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Показывает последние рассылки: время запуска, статус и счётчики доставки.
+
+    Args:
+        update (Update): Объект Telegram.
+        context (ContextTypes.DEFAULT_TYPE): Контекст.
+    """
+    query = update.callback_query
+    if not await is_admin(update.effective_user.id):
+        await query.answer("⛔ Недостаточно прав.")
+        return
+    await query.answer()
+
+    jobs = await get_recent_broadcast_jobs(limit=5)
+    if not jobs:
+        text = "📋 Рассылок пока не было."
+    else:
+        lines = ["📋 <b>Последние рассылки:</b>\n"]
+        for job in jobs:
+            scheduled = job["scheduled_at"].astimezone(moscow).strftime("%d.%m.%Y %H:%M")
+            status = BROADCAST_STATUS_LABELS.get(job["status"], job["status"])
+            lines.append(
+                f"<b>#{job['id']}</b> · {job['target_role']} · {scheduled} · {status}\n"
+                f"✅ {job['sent']}  ❌ {job['failed']}  ⏳ {job['pending']}"
+            )
+        text = "\n".join(lines)
+
+    keyboard = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🔄 Обновить", callback_data="broadcast_status")],
+        [InlineKeyboardButton("🔙 Назад", callback_data="admin_broadcast")],
+    ])
+    try:
+        await query.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+    except Exception as e:
+        logging.error(f"Ошибка при отображении статуса рассылок: {e}")
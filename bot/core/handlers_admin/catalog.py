@@ -0,0 +1,36 @@
+"""
+catalog.py
+
+Ручное обновление каталога макросов и формул (macro.catalog) из админ-панели.
+Обычно каталог обновляется сам по NOTIFY от триггеров vba_unit/vba_formule;
+кнопка нужна, если данные правили в обход триггеров или уведомление потерялось.
+"""
+
+import html
+import logging
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from macro.catalog import vba_catalog
+from bot.core.keyboards.admin_panel import get_admin_panel_keyboard
+
+
+async def handle_admin_catalog_reload(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Перечитывает каталог макросов и формул из БД и сообщает, сколько загружено.
+
+    Args:
+        update (Update): Объект Telegram.
+        context (ContextTypes.DEFAULT_TYPE): Контекст.
+    """
+    query = update.callback_query
+    await query.answer()
+
+    try:
+        snapshot = await vba_catalog.reload()
+        text = f"📚 Каталог обновлён: макросов {len(snapshot.macros)}, формул {len(snapshot.formulas)}"
+    except Exception as e:
+        logging.error(f"[VBA_CATALOG] Ошибка ручного обновления каталога: {e}")
+        text = f"⚠️ Не удалось обновить каталог: {html.escape(str(e))}"
+
+    await query.edit_message_text(text=text, reply_markup=get_admin_panel_keyboard())
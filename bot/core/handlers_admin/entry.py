@@ -17,6 +17,7 @@ from bot.core.handlers_admin.broadcast import (
     handle_broadcast_choose_role,
     handle_broadcast_confirm,
     handle_broadcast_cancel,
+    show_broadcast_status,
 )
 from bot.core.handlers_admin.feedback import (
     show_feedback_list,
@@ -27,12 +28,17 @@ from bot.core.handlers_admin.feedback import (
 from bot.core.handlers_admin.stats import (
     handle_admin_speed_entry,
     handle_admin_speed_stats,
+    handle_admin_pool_stats,
 )
 from bot.core.handlers_admin.users import handle_admin_users
+from bot.core.handlers_admin.catalog import handle_admin_catalog_reload
 from bot.core.handlers_admin.sql_tools import (
     handle_sql_entry,
     handle_sql_table_select,
+    handle_sql_format_select,
     handle_sql_all_query,
+    handle_sql_run_confirmed,
+    handle_sql_run_cancel,
 )
 
 
@@ -53,6 +59,10 @@ def get_admin_handlers() -> list[CallbackQueryHandler]:
         # Статистика
         CallbackQueryHandler(handle_admin_speed_entry, pattern="^admin_stats_speed$"),
         CallbackQueryHandler(handle_admin_speed_stats, pattern="^admin_stats_speed_(hour|day|all)$"),
+        CallbackQueryHandler(handle_admin_pool_stats, pattern="^admin_stats_pool$"),
+
+        # Каталог макросов и формул
+        CallbackQueryHandler(handle_admin_catalog_reload, pattern="^admin_catalog_reload$"),
 
         # Пользователи
         CallbackQueryHandler(handle_admin_users, pattern="^admin_users$"),
@@ -68,11 +78,15 @@ def get_admin_handlers() -> list[CallbackQueryHandler]:
         CallbackQueryHandler(handle_broadcast_choose_role, pattern="^broadcast_role_"),
         CallbackQueryHandler(handle_broadcast_confirm, pattern="^broadcast_confirm$"),
         CallbackQueryHandler(handle_broadcast_cancel, pattern="^broadcast_cancel$"),
+        CallbackQueryHandler(show_broadcast_status, pattern="^broadcast_status$"),
 
         # SQL
         CallbackQueryHandler(handle_sql_entry, pattern="^admin_sql$"),
         CallbackQueryHandler(handle_sql_table_select, pattern=r"^sql_table_"),
+        CallbackQueryHandler(handle_sql_format_select, pattern=r"^sql_fmt_"),
         CallbackQueryHandler(handle_sql_all_query, pattern=r"^sql_all_"),
+        CallbackQueryHandler(handle_sql_run_confirmed, pattern=r"^sql_run_confirmed$"),
+        CallbackQueryHandler(handle_sql_run_cancel, pattern=r"^sql_run_cancel$"),
     ]
 
 
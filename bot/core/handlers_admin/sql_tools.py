@@ -5,11 +5,16 @@ sql_tools.py
 - Выбор таблицы
 - Просмотр всех строк
 - Показ полей таблицы
-- Экспорт в Excel
+- Оценка запроса через EXPLAIN и подтверждение тяжёлых запросов
+- Выбор формата выгрузки (xlsx, CSV, CSV.gz, Parquet — см. db.export.EXPORTERS)
+- Потоковая выгрузка результата в файлы (с пределом строк, частями под лимит Telegram)
+  и статус «Готовлю файл…»
+- Повторные запросы к неизменившимся таблицам отдаются из кэша (db.result_cache)
 """
 
-import textwrap
+import html
 import logging
+import time
 from telegram import (
     Update,
     InlineKeyboardMarkup,
@@ -25,15 +30,20 @@ from db.users import get_user_role
 from db.admins import (
     get_all_table_names,
     get_table_columns,
-    execute_custom_sql_query,
-    df_to_excel_bytes,
+    export_custom_sql_query,
+    explain_query,
+    get_sql_limits,
 )
+from db.export import DEFAULT_EXPORT_FORMAT, EXPORTERS, QueryExport, format_rows_as_text
+from db.result_cache import get_table_versions, query_result_cache
 from bot.core.utils.sql_utils import reply_with_log
 from log_dialog.models_daig import Point
 
 
 load_dotenv()
 ADMIN_CHAT_ID = int(getenv("ADMIN_CHAT_ID", "0"))
+# Не чаще раза в столько секунд обновляем сообщение о ходе сборки файла
+EXPORT_PROGRESS_INTERVAL = float(getenv("EXPORT_PROGRESS_INTERVAL", 3))
 
 async def handle_sql_entry(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -97,23 +107,63 @@ async def handle_sql_table_select(update: Update, context: ContextTypes.DEFAULT_
 
     field_list = "\n".join([f"• <code>{name}</code>: <i>{dtype}</i>" for name, dtype in columns])
 
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("📥 Показать все данные (ALL)", callback_data=f"sql_all_{table}")],
-        [InlineKeyboardButton("✏️ Ввести свой SQL-запрос", callback_data="sql_custom_query")]
-    ])
-
     await query.message.edit_text(
         f"📄 <b>Таблица:</b> <code>{table}</code>\n\n"
         f"<b>Поля:</b>\n{field_list}\n\n"
-        f"Выберите действие ниже или введите свой SQL-запрос вручную.",
-        reply_markup=keyboard,
+        f"Выберите действие ниже или введите свой SQL-запрос вручную.\n"
+        f"Формат файла выбирается кнопками внизу.",
+        reply_markup=_table_actions_keyboard(table, _selected_format(context)),
         parse_mode=ParseMode.HTML
     )
 
 
+def _selected_format(context: ContextTypes.DEFAULT_TYPE) -> str:
+    fmt = context.user_data.get("sql_format", DEFAULT_EXPORT_FORMAT)
+    return fmt if fmt in EXPORTERS else DEFAULT_EXPORT_FORMAT
+
+
+def _table_actions_keyboard(table: str, fmt: str) -> InlineKeyboardMarkup:
+    """Действия с таблицей и переключатель формата выгрузки (выбранный отмечен ✅)."""
+    format_row = [
+        InlineKeyboardButton(
+            f"✅ {exporter.label}" if key == fmt else exporter.label,
+            callback_data=f"sql_fmt_{key}"
+        )
+        for key, exporter in EXPORTERS.items()
+    ]
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("📥 Показать все данные (ALL)", callback_data=f"sql_all_{table}")],
+        [InlineKeyboardButton("✏️ Ввести свой SQL-запрос", callback_data="sql_custom_query")],
+        format_row,
+    ])
+
+
+async def handle_sql_format_select(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Переключает формат выгрузки для следующих запросов к выбранной таблице.
+
+    Args:
+        update (Update): Объект Telegram.
+        context (ContextTypes.DEFAULT_TYPE): Контекст.
+    """
+    query = update.callback_query
+    fmt = query.data.replace("sql_fmt_", "")
+    if fmt not in EXPORTERS:
+        return await query.answer("Формат недоступен", show_alert=True)
+
+    await query.answer(f"Формат: {EXPORTERS[fmt].label}")
+    if fmt == _selected_format(context):
+        return
+
+    context.user_data["sql_format"] = fmt
+    table = context.user_data.get("sql_table")
+    if table:
+        await query.message.edit_reply_markup(reply_markup=_table_actions_keyboard(table, fmt))
+
+
 async def handle_sql_all_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
-    Выполняет SELECT * FROM table и отправляет как текст или Excel-файл.
+    Выполняет SELECT * FROM table и отправляет как текст или файлы выбранного формата (потоковая выгрузка).
 
     Args:
         update (Update): Объект Telegram.
@@ -125,39 +175,249 @@ async def handle_sql_all_query(update: Update, context: ContextTypes.DEFAULT_TYP
     table = query.data.replace("sql_all_", "")
     sql = f"SELECT * FROM {table}"
 
+    await run_sql_with_guard(
+        query.message,
+        context,
+        update.effective_user.id,
+        sql,
+        filename=table,
+        caption=f"📎 Все строки из таблицы <b>{table}</b>",
+        empty_text="⚠️ Таблица пуста."
+    )
+
+    # Очищаем состояние пользователя
+    context.user_data.pop("state", None)
+    context.user_data.pop("sql_table", None)
+
+
+async def run_sql_with_guard(
+    message,
+    context: ContextTypes.DEFAULT_TYPE,
+    user_id: int,
+    sql: str,
+    filename: str = "result",
+    caption: str = "📎 Результат запроса",
+    empty_text: str = "⚠️ Запрос выполнен, но результат пуст.",
+    done_text: str = "📥 Результат:"
+) -> None:
+    """
+    Оценивает запрос через EXPLAIN и выполняет его фоновой задачей, если оценка не превышает порог роли.
+    Иначе сохраняет запрос в user_data и просит подтверждение (кнопки sql_run_confirmed / sql_run_cancel).
+
+    Args:
+        message (Message): Сообщение, на которое отвечаем.
+        context (ContextTypes.DEFAULT_TYPE): Контекст.
+        user_id (int): Telegram user_id, инициатор запроса.
+        sql (str): SQL-запрос.
+        filename (str): Имя файла выгрузки без расширения.
+        caption (str): Подпись к файлу (HTML).
+        empty_text (str): Текст для пустого результата.
+        done_text (str): Заголовок короткого результата.
+    """
+    limits = await get_sql_limits(user_id)
+    plan = await explain_query(sql, user_id)
+    estimated = plan.rows if plan is not None else None
+    request = {
+        "sql": sql, "filename": filename, "caption": caption,
+        "empty_text": empty_text, "done_text": done_text,
+        "fmt": _selected_format(context),
+        "max_rows": limits.max_rows,
+        "relations": list(plan.relations) if plan is not None else [],
+    }
+
+    if estimated is not None and estimated > limits.warn_rows:
+        context.user_data["sql_pending"] = request
+        keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("▶️ Выполнить", callback_data="sql_run_confirmed")],
+            [InlineKeyboardButton("❌ Отмена", callback_data="sql_run_cancel")],
+        ])
+        truncation = (
+            f"\nВ файл попадут только первые {limits.max_rows} строк."
+            if estimated > limits.max_rows else ""
+        )
+        await message.reply_text(
+            f"⚠️ По оценке планировщика запрос вернёт около {estimated} строк.{truncation}\nВыполнить?",
+            reply_markup=keyboard
+        )
+        return
+
+    _start_sql_request(message, context, user_id, request)
+
+
+def _start_sql_request(message, context: ContextTypes.DEFAULT_TYPE, user_id: int, request: dict) -> None:
+    """
+    Запускает выполнение и выгрузку запроса фоновой задачей приложения:
+    хендлер сразу возвращается, и апдейты остальных пользователей не ждут сборки файла.
+    """
+    context.application.create_task(
+        _run_sql_request(message, user_id, request),
+        name=f"sql_export_{user_id}"
+    )
+
+
+class ExportProgress:
+    """
+    Сообщение «Готовлю файл…» на время сборки выгрузки.
+    Появляется, только если результат идёт файлом; счётчик строк обновляется
+    не чаще EXPORT_PROGRESS_INTERVAL секунд, после отправки сообщение удаляется.
+    """
+
+    def __init__(self, message) -> None:
+        self._message = message
+        self._status = None
+        self._last_update = 0.0
+
+    async def update(self, row_count: int) -> None:
+        try:
+            if self._status is None:
+                self._status = await self._message.reply_text("⏳ Готовлю файл…")
+                self._last_update = time.monotonic()
+            elif time.monotonic() - self._last_update >= EXPORT_PROGRESS_INTERVAL:
+                await self._status.edit_text(f"⏳ Готовлю файл… записано строк: {row_count}")
+                self._last_update = time.monotonic()
+        except Exception as e:
+            logging.debug(f"[SQL] Не удалось обновить статус выгрузки: {e}")
+
+    async def done(self) -> None:
+        if self._status is None:
+            return
+        try:
+            await self._status.delete()
+        except Exception as e:
+            logging.debug(f"[SQL] Не удалось удалить статус выгрузки: {e}")
+
+
+async def _cache_lookup(request: dict):
+    """
+    Ключ кэша, текущие версии таблиц запроса и закэшированный результат (если он актуален).
+    Если запрос не кэшируется или версии не удалось получить, возвращает (None, None, None).
+    """
+    key = query_result_cache.make_key(
+        request["sql"], request.get("fmt", DEFAULT_EXPORT_FORMAT), request.get("max_rows", 0)
+    )
+    if key is None or not request.get("relations"):
+        return None, None, None
     try:
-        df = await execute_custom_sql_query(sql, user_id=ADMIN_CHAT_ID)
+        versions = await get_table_versions(request["relations"])
     except Exception as e:
-        logging.error(f"Ошибка при выполнении SQL-запроса: {e}")
-        return await query.message.reply_text(
-            f"❌ Ошибка при выполнении запроса:\n<code>{e}</code>",
+        logging.warning(f"[SQL] Не удалось получить версии таблиц для кэша: {e}")
+        return None, None, None
+    if versions is None:
+        return None, None, None
+    return key, versions, query_result_cache.get(key, versions)
+
+
+async def _run_sql_request(message, user_id: int, request: dict) -> None:
+    key, versions, cached = await _cache_lookup(request)
+    if cached is not None:
+        logging.info(f"[SQL] Результат из кэша для user_id={user_id}: {query_result_cache.stats()}")
+        return await send_query_export(
+            message,
+            cached,
+            caption=request["caption"],
+            empty_text=request["empty_text"],
+            done_text=request["done_text"]
+        )
+
+    progress = ExportProgress(message)
+    try:
+        export = await export_custom_sql_query(
+            request["sql"], user_id, fmt=request.get("fmt", DEFAULT_EXPORT_FORMAT),
+            filename=request["filename"], progress=progress.update
+        )
+        await send_query_export(
+            message,
+            export,
+            caption=request["caption"],
+            empty_text=request["empty_text"],
+            done_text=request["done_text"]
+        )
+    finally:
+        await progress.done()
+
+    if key is not None:
+        query_result_cache.put(key, versions, export)
+
+
+async def handle_sql_run_confirmed(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Выполняет запрос, отложенный до подтверждения из-за большой оценки EXPLAIN.
+
+    Args:
+        update (Update): Объект Telegram.
+        context (ContextTypes.DEFAULT_TYPE): Контекст.
+    """
+    query = update.callback_query
+    await query.answer()
+
+    request = context.user_data.pop("sql_pending", None)
+    if request is None:
+        return await query.message.edit_text("⚠️ Запрос уже выполнен или устарел.")
+
+    await query.message.edit_text("⏳ Выполняю запрос...")
+    _start_sql_request(query.message, context, update.effective_user.id, request)
+
+
+async def handle_sql_run_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Отменяет запрос, ожидающий подтверждения.
+
+    Args:
+        update (Update): Объект Telegram.
+        context (ContextTypes.DEFAULT_TYPE): Контекст.
+    """
+    query = update.callback_query
+    await query.answer()
+    context.user_data.pop("sql_pending", None)
+    await query.message.edit_text("🚫 Запрос отменён.")
+
+
+async def send_query_export(message, export: QueryExport, caption: str, empty_text: str, done_text: str = "📥 Результат:") -> None:
+    """
+    Отправляет результат SQL-запроса: ошибку, короткий результат текстом или файлы выгрузки
+    (несколько, если результат разбит на части под лимит Telegram).
+    Части из кэша отправляются по file_id; у отправленных частей file_id запоминается.
+
+    Args:
+        message (Message): Сообщение, на которое отвечаем.
+        export (QueryExport): Результат выгрузки.
+        caption (str): Подпись к файлу (HTML).
+        empty_text (str): Текст для пустого результата.
+        done_text (str): Заголовок короткого результата.
+    """
+    if export.error is not None:
+        return await message.reply_text(
+            f"❌ Ошибка при выполнении запроса:\n<code>{html.escape(export.error)}</code>",
             parse_mode=ParseMode.HTML
         )
 
-    if df.empty:
-        return await query.message.reply_text("⚠️ Таблица пуста.")
+    if export.is_empty:
+        return await message.reply_text(empty_text)
+
+    notice = f"\n⚠️ Результат обрезан до {export.row_count} строк." if export.truncated else ""
 
-    # Если таблица маленькая, отправляем текст
-    if len(df) <= 10 and df.shape[1] <= 5:
-        text = df.to_string(index=False)
+    # Маленький результат отправляем текстом
+    if export.rows is not None:
+        text = format_rows_as_text(export.columns, export.rows)
         # Ограничиваем длину текста, если он слишком большой
-        max_length = 4096
+        max_length = 4000
         if len(text) > max_length:
-            text = textwrap.fill(text, max_length)  # Разбиваем текст на несколько частей
-
-        return await query.message.reply_text(
-            f"📥 Результат:\n<pre>{text}</pre>",
+            text = text[:max_length]
+        return await message.reply_text(
+            f"{done_text}\n<pre>{html.escape(text)}</pre>{notice}",
             parse_mode=ParseMode.HTML
         )
 
-    # Если таблица большая, отправляем Excel
-    excel_buf = df_to_excel_bytes(df)
-    await query.message.reply_document(
-        document=InputFile(excel_buf, f"{table}.xlsx"),
-        caption=f"📎 Все строки из таблицы <b>{table}</b>",
-        parse_mode=ParseMode.HTML
-    )
-
-    # Очищаем состояние пользователя
-    context.user_data.pop("state", None)
-    context.user_data.pop("sql_table", None)
+    # Большой — файлами
+    try:
+        total = len(export.parts)
+        for number, part in enumerate(export.parts, 1):
+            part_caption = caption if total == 1 else f"{caption} (часть {number}/{total}, строк: {part.row_count})"
+            sent = await message.reply_document(
+                document=part.file_id or InputFile(part.file, part.filename),
+                caption=part_caption + (notice if number == total else ""),
+                parse_mode=ParseMode.HTML
+            )
+            part.file_id = sent.document.file_id
+    finally:
+        export.close()
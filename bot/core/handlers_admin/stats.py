@@ -3,15 +3,20 @@ stats.py
 
 Обработчики административной статистики:
 - Просмотр скорости ответа за период (час / день / всё время)
+- Нагрузка на пулы соединений БД и самые затратные запросы
 """
 
 import asyncio
+import html
 import logging
 from datetime import timedelta
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from db.connection import get_pool_stats
 from db.logs import get_average_response_time
+from db.pool_metrics import ACQUIRE_BUCKETS_MS
+from db.statements import statements
 from bot.core.utils.admin_utils import get_now_msk
 from bot.core.keyboards.admin_panel import (
     get_speed_stats_period_keyboard,
@@ -83,3 +88,63 @@ async def handle_admin_speed_stats(update: Update, context: ContextTypes.DEFAULT
     )
 
     context.user_data["last_bot_message_id"] = msg.message_id
+
+
+def _format_ms(value) -> str:
+    """Граница корзины квантиля ожидания: «≤N», «>N» для последней корзины, «—» без данных."""
+    if value is None:
+        return "—"
+    return f">{ACQUIRE_BUCKETS_MS[-1]:g}" if value == float("inf") else f"≤{value:g}"
+
+
+def format_pool_stats(pools: list[dict], top_statements: list[dict]) -> str:
+    """
+    Текст отчёта о пулах соединений и запросах для админ-панели.
+
+    Args:
+        pools (list[dict]): Снимки метрик пулов (db.connection.get_pool_stats).
+        top_statements (list[dict]): Статистика запросов (db.statements.statements.stats).
+
+    Returns:
+        str: Отчёт (HTML).
+    """
+    lines = ["🗄 <b>Пулы соединений БД</b>"]
+    for p in pools:
+        lines.append(
+            f"\n<b>{p['name']}</b>: {p['size']}/{p['max_size']} (мин. {p['min_size']}), "
+            f"занято {p['in_use']}, свободно {p['idle']}, ждут {p['waiting']}"
+        )
+        lines.append(f"Выдано: {p['acquires']}, таймаутов: {p['timeouts']}")
+        lines.append(
+            f"Ожидание, мс: avg {p['avg_wait_ms']}, p50 {_format_ms(p['p50_ms'])}, "
+            f"p95 {_format_ms(p['p95_ms'])}, p99 {_format_ms(p['p99_ms'])}, max {p['max_wait_ms']}"
+        )
+        histogram = ", ".join(f"{label}: {count}" for label, count in p["histogram"].items() if count)
+        if histogram:
+            lines.append(f"<code>{html.escape(histogram)}</code>")
+
+    if top_statements:
+        lines.append("\n<b>Запросы (по суммарному времени)</b>")
+        for st in top_statements:
+            lines.append(
+                f"<code>{html.escape(st['name'])}</code>: {st['calls']} выз., "
+                f"avg {st['avg_ms']} мс, max {st['max_ms']} мс, ошибок {st['errors']}"
+            )
+    return "\n".join(lines)
+
+
+async def handle_admin_pool_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Показывает метрики пулов соединений БД и пять самых затратных запросов.
+
+    Args:
+        update (Update): Объект Telegram.
+        context (ContextTypes.DEFAULT_TYPE): Контекст.
+    """
+    query = update.callback_query
+    await query.answer()
+
+    await query.edit_message_text(
+        text=format_pool_stats(get_pool_stats(), statements.stats()[:5]),
+        reply_markup=get_admin_panel_keyboard()
+    )
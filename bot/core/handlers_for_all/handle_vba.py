@@ -22,11 +22,7 @@ from macro.utils import (
     escape_markdown,
     format_comment_bold_before_dash,
 )
-from db.macros import (
-    fetch_all_formul_macros,
-    fetch_all_macros,
-    fetch_formula_by_name,
-)
+from macro.catalog import vba_catalog
 from db.users import (
     save_user,
     get_user_role,
@@ -55,21 +51,17 @@ async def handle_formulas(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Returns:
         Message: Ответное сообщение или отредактированное сообщение с клавиатурой.
     """
-
-    formulas = await fetch_all_formul_macros()
-
-    buttons = [[InlineKeyboardButton(name, callback_data=f"formula:{name}")] for _, name, _, _ in formulas]
-    buttons.append([InlineKeyboardButton("⬅️ В главное меню", callback_data="back_to_main")])
+    catalog = await vba_catalog.get()
 
     if update.callback_query:
         return await update.callback_query.edit_message_text(
             "📚 Выбери нужную формулу:",
-            reply_markup=InlineKeyboardMarkup(buttons)
+            reply_markup=catalog.formulas_keyboard
         )
     else:
         return await update.message.reply_text(
             "📚 Выбери нужную формулу:",
-            reply_markup=InlineKeyboardMarkup(buttons)
+            reply_markup=catalog.formulas_keyboard
         )
 
 
@@ -78,8 +70,8 @@ async def handle_macros(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Обрабатывает выбор раздела "Макросы" из главного меню.
 
-    Загружает все доступные макросы из базы данных и отправляет пользователю список кнопок
-    для выбора одного из них, включая кнопку возврата в главное меню.
+    Отправляет пользователю готовую клавиатуру каталога (macro.catalog) со списком
+    макросов и кнопкой возврата в главное меню.
 
     Args:
         update (Update): Объект Telegram-обновления.
@@ -88,19 +80,17 @@ async def handle_macros(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Returns:
         Message: Сообщение с клавиатурой или отредактированное сообщение, если был callback.
     """
-    macros = await fetch_all_macros()
-    buttons = [[InlineKeyboardButton(name, callback_data=f"macro:{name}")] for _, name, _ in macros]
-    buttons.append([InlineKeyboardButton("⬅️ В главное меню", callback_data="back_to_main")])
+    catalog = await vba_catalog.get()
 
     if update.callback_query:
         return await update.callback_query.edit_message_text(
             "⚙️ Выбери нужный макрос:",
-            reply_markup=InlineKeyboardMarkup(buttons)
+            reply_markup=catalog.macros_keyboard
         )
     else:
         return await update.message.reply_text(
             "⚙️ Выбери нужный макрос:",
-            reply_markup=InlineKeyboardMarkup(buttons)
+            reply_markup=catalog.macros_keyboard
         )
 
 
@@ -373,7 +363,7 @@ async def handle_formula_detail(update: Update, context: ContextTypes.DEFAULT_TY
     """
     Обрабатывает выбор формулы из списка.
 
-    Извлекает данные по выбранной формуле из БД и отображает код формулы
+    Берёт выбранную формулу из каталога (macro.catalog) и отображает код формулы
     с комментарием (если есть), в формате Markdown. Также предлагает инструкцию.
 
     Args:
@@ -385,12 +375,12 @@ async def handle_formula_detail(update: Update, context: ContextTypes.DEFAULT_TY
     """
     query = update.callback_query
     formula_name = query.data.split(":", 1)[1]
-    formula_data = await fetch_formula_by_name(formula_name)
+    formula = (await vba_catalog.get()).formulas.get(formula_name)
 
-    if not formula_data:
+    if not formula:
         return await query.message.reply_text("🔍 Формула не найдена")
 
-    _, name, code, comment = formula_data
+    name, code, comment = formula.name, formula.code, formula.comment
 
     response_text = f"*{name}*\n\n```vb\n{code}\n```"
 
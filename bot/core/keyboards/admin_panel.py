@@ -23,6 +23,10 @@ def get_admin_panel_keyboard() -> InlineKeyboardMarkup:
             InlineKeyboardButton("📨 Обратная связь", callback_data="admin_feedback"),
             InlineKeyboardButton("📢 Рассылка", callback_data="admin_broadcast"),
         ],
+        [
+            InlineKeyboardButton("🗄 Пул БД", callback_data="admin_stats_pool"),
+            InlineKeyboardButton("📚 Обновить каталог", callback_data="admin_catalog_reload"),
+        ],
 
     ]
 
@@ -0,0 +1,126 @@
+"""
+purge.py
+
+Фоновая очистка сообщений бота у отклонённых пользователей.
+
+- Сообщения удаляются пачками через `bot.delete_messages` (до 100 id за вызов).
+- Каждая очистка — отдельная фоновая задача, не блокирующая монитор ролей;
+  одновременно работает не больше PURGE_CONCURRENCY задач.
+- Все задачи делят общий лимит вызовов PURGE_RATE в секунду, RetryAfter
+  приостанавливает их всех. Сетевые ошибки (NetworkError, TimedOut) повторяются
+  до PURGE_MAX_RETRIES раз с растущей паузой.
+- Прогресс хранится в таблице message_purge и в самом dialog_log (удалённые
+  пачки вычищаются из него), поэтому прерванная очистка продолжается с места
+  остановки (`resume_purges`): при старте монитора ролей и на каждом его
+  периодическом опросе.
+"""
+
+import asyncio
+import logging
+import os
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from bot.core.utils.rate_limit import TokenBucket, retry_after_seconds
+from db.logs import (
+    create_purge_job, get_pending_purge_jobs, fetch_purge_chunk,
+    complete_purge_chunk, finish_purge_job
+)
+
+PURGE_CHUNK_SIZE = 100  # лимит deleteMessages
+PURGE_CONCURRENCY = int(os.getenv("PURGE_CONCURRENCY", 3))
+PURGE_RATE = float(os.getenv("PURGE_RATE", 5))
+PURGE_MAX_RETRIES = int(os.getenv("PURGE_MAX_RETRIES", 5))
+PURGE_RETRY_DELAY = float(os.getenv("PURGE_RETRY_DELAY", 2))
+
+_semaphore = asyncio.Semaphore(PURGE_CONCURRENCY)
+_bucket = TokenBucket(PURGE_RATE)
+_tasks: dict[int, asyncio.Task] = {}
+
+
+async def _delete_chunk(bot, user_id: int, message_ids: list[int]) -> None:
+    """
+    Удаляет пачку сообщений, повторяя вызов после RetryAfter и сетевых ошибок.
+    Пауза после сетевой ошибки удваивается; после PURGE_MAX_RETRIES неудач ошибка
+    пробрасывается, и задание остаётся в message_purge до следующего `resume_purges`.
+    """
+    failures = 0
+    while True:
+        await _bucket.acquire()
+        try:
+            await bot.delete_messages(chat_id=user_id, message_ids=message_ids)
+            return
+        except RetryAfter as e:
+            delay = retry_after_seconds(e)
+            logging.warning(f"[PURGE] RetryAfter {delay}s при очистке для {user_id}")
+            _bucket.pause(delay)
+        except (BadRequest, Forbidden) as e:
+            # Сообщения старше 48 часов или чат недоступен — повтор не поможет.
+            # BadRequest — подкласс NetworkError, поэтому проверяется раньше.
+            logging.warning(f"[PURGE] Не удалось удалить {len(message_ids)} сообщений для {user_id}: {e}")
+            return
+        except NetworkError as e:
+            failures += 1
+            if failures > PURGE_MAX_RETRIES:
+                raise
+            delay = PURGE_RETRY_DELAY * 2 ** (failures - 1)
+            logging.warning(
+                f"[PURGE] Сетевая ошибка при очистке для {user_id} "
+                f"(попытка {failures}/{PURGE_MAX_RETRIES}), повтор через {delay}s: {e}"
+            )
+            _bucket.pause(delay)
+
+
+async def _run_purge(bot, user_id: int) -> None:
+    """Удаляет все сообщения бота пользователя пачками и закрывает задание."""
+    async with _semaphore:
+        deleted = 0
+        try:
+            while True:
+                message_ids = await fetch_purge_chunk(user_id, PURGE_CHUNK_SIZE)
+                if not message_ids:
+                    break
+                await _delete_chunk(bot, user_id, message_ids)
+                await complete_purge_chunk(user_id, message_ids)
+                deleted += len(message_ids)
+        except Exception as e:
+            # Задание остаётся в message_purge и будет продолжено следующим resume_purges
+            logging.error(f"[PURGE] Очистка для {user_id} прервана: {e}")
+            return
+        await finish_purge_job(user_id)
+        logging.info(f"[PURGE] Удалено {deleted} сообщений бота для {user_id}")
+
+
+def _spawn(bot, user_id: int) -> None:
+    task = _tasks.get(user_id)
+    if task is not None and not task.done():
+        return
+    task = asyncio.create_task(_run_purge(bot, user_id))
+    _tasks[user_id] = task
+    task.add_done_callback(lambda t: _tasks.pop(user_id, None) if _tasks.get(user_id) is t else None)
+
+
+async def start_purge(bot, user_id: int) -> None:
+    """
+    Регистрирует задание очистки и запускает его в фоне (если оно ещё не идёт).
+
+    Args:
+        bot: Экземпляр Telegram-бота.
+        user_id (int): Telegram ID пользователя.
+    """
+    await create_purge_job(user_id)
+    _spawn(bot, user_id)
+
+
+async def resume_purges(bot) -> None:
+    """
+    Продолжает очистки, прерванные перезапуском бота или ошибкой.
+    Уже идущие задания не дублируются.
+
+    Args:
+        bot: Экземпляр Telegram-бота.
+    """
+    pending = await get_pending_purge_jobs()
+    if pending:
+        logging.info(f"[PURGE] Продолжаем незавершённые очистки: {len(pending)}")
+    for user_id in pending:
+        _spawn(bot, user_id)
@@ -3,93 +3,194 @@ role_monitor.py
 
 Фоновый мониторинг ролей пользователей. При изменении ролей:
 - Обновляет команды Telegram
-- Очищает сообщения бота у отклонённых пользователей
+- Запускает фоновую очистку сообщений бота у отклонённых пользователей (bot.core.purge)
+  и на каждом периодическом опросе продолжает прерванные очистки
+
+Изменения приходят событиями: триггер trg_user_role_change шлёт NOTIFY
+на канал `user_role_changed`, выделенное LISTEN-соединение (db.listener)
+кладёт их в очередь `role_changes`.
+
+Дополнительно монитор опрашивает только строки, изменённые после водяного
+знака (`User_Contacts_VBA.updated_at`): редко — пока LISTEN работает, как
+страховка, и часто — если LISTEN недоступен. Водяной знак хранится в
+bot_state, поэтому после перезапуска команды заново получают только
+пользователи, изменившиеся за время простоя.
 """
 
 import asyncio
+import json
 import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
 from telegram import BotCommand, BotCommandScopeChat
 
-from db.users import get_all_user_roles
-from db.logs import get_bot_messages_for_user, delete_bot_messages_for_user
+from db.users import get_user_roles_changed_since
+from db.listener import is_listening
+from db.state import get_state, set_state
+from bot.core.purge import start_purge, resume_purges
+
+# Интервал опроса, пока LISTEN/NOTIFY работает (страховка) и когда он недоступен
+ROLE_MONITOR_SWEEP_SECONDS = float(os.getenv("ROLE_MONITOR_SWEEP_SECONDS", 600))
+ROLE_MONITOR_POLL_SECONDS = float(os.getenv("ROLE_MONITOR_POLL_SECONDS", 10))
+# Перекрытие окна опроса: транзакция могла начаться до водяного знака, а закоммититься после
+ROLE_WATERMARK_OVERLAP = timedelta(seconds=30)
+WATERMARK_KEY = "role_monitor.watermark"
+
+ROLES_AND_COMMANDS: dict[str, list[BotCommand]] = {
+    "admin": [
+        BotCommand("start", "Запустить бота"),
+        BotCommand("get_users", "Получить данные пользователей"),
+    ],
+    "auth": [BotCommand("start", "Запустить бота")],
+    "preauth": [BotCommand("start", "Запустить бота")],
+    "noauth": [BotCommand("start", "Запустить бота")],
+    "rejected": []
+}
 
 # Кэши
 roles_cache: dict[int, str] = {}
 menu_messages: dict[int, int] = {}
 user_messages: dict[int, list[int]] = {}
 
+# (user_id, new_role) из NOTIFY; None — запрос на внеочередной опрос изменений
+role_changes: asyncio.Queue = asyncio.Queue()
+
+_watermark: datetime | None = None
+_watermark_loaded = False
+
+
+def on_role_notify(payload: Optional[str]) -> None:
+    """
+    Обработчик NOTIFY канала `user_role_changed`: кладёт изменение в очередь монитора.
+
+    Args:
+        payload (Optional[str]): JSON {"user_id", "old_role", "new_role"}; None — уведомления
+            могли быть потеряны (переподключение), нужен опрос изменений.
+    """
+    if payload is None:
+        role_changes.put_nowait(None)
+        return
+    try:
+        data = json.loads(payload)
+        role_changes.put_nowait((int(data["user_id"]), data.get("new_role")))
+    except (ValueError, KeyError, TypeError) as e:
+        logging.warning(f"[MONITOR] Некорректный payload '{payload}': {e}")
+        role_changes.put_nowait(None)
+
+
+async def apply_role_change(bot, user_id: int, role: Optional[str]) -> None:
+    """
+    Применяет новую роль пользователя: команды Telegram и очистка для rejected.
+
+    Args:
+        bot: Экземпляр Telegram-бота.
+        user_id (int): Telegram ID пользователя.
+        role (Optional[str]): Новая роль; None — пользователь удалён.
+    """
+    if role is None:
+        roles_cache.pop(user_id, None)
+        return
+    if roles_cache.get(user_id) == role:
+        return
+
+    # Обновляем кэш и команды
+    roles_cache[user_id] = role
+    scope = BotCommandScopeChat(user_id)
+    commands = ROLES_AND_COMMANDS.get(role, [BotCommand("start", "Запустить бота")])
+    try:
+        await bot.set_my_commands(commands=commands, scope=scope)
+    except Exception as e:
+        logging.warning(f"[MONITOR] Не удалось установить команды для {user_id}: {e}")
+
+    # Действия для rejected
+    if role == "rejected":
+        # Удаление inline-меню
+        msg_id = menu_messages.pop(user_id, None)
+        if msg_id is not None:
+            try:
+                await bot.delete_message(chat_id=user_id, message_id=msg_id)
+            except Exception as e:
+                logging.warning(f"[MONITOR] Ошибка удаления inline-меню {msg_id} для {user_id}: {e}")
+
+        # Удаление сообщений от бота — пачками в фоновой задаче
+        try:
+            await start_purge(bot, user_id)
+        except Exception as e:
+            logging.error(f"[MONITOR] Не удалось запустить очистку сообщений для {user_id}: {e}")
+
+        # Очистка кэша пользовательских сообщений
+        user_messages.pop(user_id, None)
+
+
+async def sync_changed_roles(bot) -> None:
+    """
+    Применяет роли пользователей, изменённых после водяного знака, и сдвигает его.
+    При самом первом запуске (водяного знака ещё нет) обрабатываются все пользователи.
+    Если водяной знак не удалось прочитать, ошибка пробрасывается в цикл монитора,
+    и чтение повторяется на следующем проходе — без полной пересинхронизации.
+
+    Args:
+        bot: Экземпляр Telegram-бота.
+    """
+    global _watermark, _watermark_loaded
+    if not _watermark_loaded:
+        stored = await get_state(WATERMARK_KEY)
+        _watermark = datetime.fromisoformat(stored) if stored else None
+        _watermark_loaded = True
+
+    since = _watermark - ROLE_WATERMARK_OVERLAP if _watermark else None
+    changed = await get_user_roles_changed_since(since)
+    for user_id, role, _ in changed:
+        await apply_role_change(bot, user_id, role)
+
+    if changed and (_watermark is None or changed[-1][2] > _watermark):
+        _watermark = changed[-1][2]
+        await set_state(WATERMARK_KEY, _watermark.isoformat())
+
 
 async def role_monitor(bot) -> None:
     """
     Запускает бесконечный цикл мониторинга ролей.
-    При смене роли на 'rejected' удаляет команды и сообщения.
+    Обрабатывает изменения из очереди `role_changes` и периодически опрашивает
+    изменения после водяного знака: раз в ROLE_MONITOR_SWEEP_SECONDS, пока работает
+    LISTEN, иначе раз в ROLE_MONITOR_POLL_SECONDS. На том же опросе перезапускаются
+    очистки сообщений, прерванные ошибкой.
 
     Args:
         bot: Экземпляр Telegram-бота.
     """
     logging.info("🎯 Запущен мониторинг ролей пользователей...")
-
-    roles_and_commands: dict[str, list[BotCommand]] = {
-        "admin": [
-            BotCommand("start", "Запустить бота"),
-            BotCommand("get_users", "Получить данные пользователей"),
-        ],
-        "auth": [BotCommand("start", "Запустить бота")],
-        "preauth": [BotCommand("start", "Запустить бота")],
-        "noauth": [BotCommand("start", "Запустить бота")],
-        "rejected": []
-    }
+    try:
+        await resume_purges(bot)
+    except Exception as e:
+        logging.error(f"[MONITOR] Не удалось продолжить незавершённые очистки: {e}")
+    loop = asyncio.get_running_loop()
+    next_sweep = loop.time()
 
     while True:
         try:
-            users = await get_all_user_roles()
-
-            for user_id, role in users:
-                prev_role = roles_cache.get(user_id)
-                if role == prev_role:
-                    continue
-
-                # Обновляем кэш и команды
-                roles_cache[user_id] = role
-                scope = BotCommandScopeChat(user_id)
-                commands = roles_and_commands.get(role, [BotCommand("start", "Запустить бота")])
+            if loop.time() >= next_sweep:
+                await sync_changed_roles(bot)
                 try:
-                    await bot.set_my_commands(commands=commands, scope=scope)
+                    await resume_purges(bot)
                 except Exception as e:
-                    logging.warning(f"[MONITOR] Не удалось установить команды для {user_id}: {e}")
-
-                # Действия для rejected
-                if role == "rejected":
-                    # Удаление inline-меню
-                    msg_id = menu_messages.pop(user_id, None)
-                    if msg_id is not None:
-                        try:
-                            await bot.delete_message(chat_id=user_id, message_id=msg_id)
-                        except Exception as e:
-                            logging.warning(f"[MONITOR] Ошибка удаления inline-меню {msg_id} для {user_id}: {e}")
-
-                    # Удаление сообщений от бота
-                    try:
-                        bot_messages = await get_bot_messages_for_user(user_id)
-                        for msg_id in bot_messages:
-                            try:
-                                await bot.delete_message(chat_id=user_id, message_id=msg_id)
-                            except Exception as e:
-                                logging.warning(f"[MONITOR] Не удалось удалить сообщение {msg_id} для {user_id}: {e}")
-                    except Exception as e:
-                        logging.error(f"[MONITOR] Ошибка при получении сообщений бота из БД: {e}")
-
-                    # Удаление записей из dialog_log
-                    try:
-                        await delete_bot_messages_for_user(user_id)
-                        logging.info(f"[MONITOR] Удалены сообщения бота из БД для {user_id}")
-                    except Exception as e:
-                        logging.error(f"[MONITOR] Ошибка удаления из БД сообщений бота: {e}")
-
-                    # Очистка кэша пользовательских сообщений
-                    user_messages.pop(user_id, None)
+                    logging.error(f"[MONITOR] Не удалось продолжить незавершённые очистки: {e}")
+                interval = ROLE_MONITOR_SWEEP_SECONDS if is_listening() else ROLE_MONITOR_POLL_SECONDS
+                next_sweep = loop.time() + interval
+
+            try:
+                change = await asyncio.wait_for(role_changes.get(), next_sweep - loop.time())
+            except asyncio.TimeoutError:
+                continue
+
+            if change is None:
+                next_sweep = loop.time()
+                continue
+
+            user_id, role = change
+            await apply_role_change(bot, user_id, role)
 
         except Exception:
             logging.critical("[MONITOR] Глобальная ошибка", exc_info=True)
-
-        await asyncio.sleep(10)
+            await asyncio.sleep(10)
@@ -8,11 +8,10 @@ admin_utils.py
 """
 import logging
 import pytz
-from typing import List
 from datetime import datetime, timedelta, timezone
 from telegram.ext import ContextTypes
 
-from db.users import get_users_by_role
+from db.users import get_user_role
 
 # Устанавливаем московский часовой пояс
 MSK = pytz.timezone('Europe/Moscow')
@@ -51,8 +50,7 @@ async def is_admin(user_id: int) -> bool:
         bool: True, если пользователь — админ, иначе False.
     """
     try:
-        admins: List[int] = await get_users_by_role("admin")
-        return user_id in admins
+        return await get_user_role(user_id) == "admin"
     except Exception as e:
         logging.error(f"Ошибка при проверке прав администратора: {e}")
         return False
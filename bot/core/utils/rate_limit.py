@@ -0,0 +1,63 @@
+"""
+rate_limit.py
+
+Ограничение частоты вызовов Telegram Bot API:
+- TokenBucket: асинхронный «бакет токенов» (N вызовов в секунду с запасом на всплеск)
+- retry_after_seconds: сколько ждать после RetryAfter (429 Too Many Requests)
+"""
+
+import asyncio
+from datetime import timedelta
+from telegram.error import RetryAfter
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket: `acquire()` ждёт, пока не накопится токен.
+
+    Args:
+        rate (float): Скорость пополнения, токенов в секунду.
+        capacity (float | None): Размер бакета (допустимый всплеск), по умолчанию равен rate.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self._rate = rate
+        self._capacity = capacity if capacity is not None else rate
+        self._tokens = self._capacity
+        self._updated: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """Забирает `tokens` токенов, при необходимости дожидаясь пополнения."""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self._rate)
+
+    def pause(self, seconds: float) -> None:
+        """Опустошает бакет так, чтобы следующий токен появился не раньше чем через `seconds`."""
+        self._updated = asyncio.get_running_loop().time()
+        self._tokens = -seconds * self._rate
+
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    """
+    Возвращает паузу из RetryAfter в секундах (в разных версиях PTB это int или timedelta).
+
+    Args:
+        error (RetryAfter): Исключение Telegram о превышении лимита.
+
+    Returns:
+        float: Сколько секунд нужно подождать.
+    """
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
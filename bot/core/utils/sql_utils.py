@@ -34,7 +34,7 @@ async def reply_with_log(
     Returns:
         Message: Отправленное сообщение.
     """
-    await log_user_question(update, context, point=point)
+    question_id = await log_user_question(update, context, point=point)
 
     target = (
         update.callback_query.message
@@ -43,5 +43,5 @@ async def reply_with_log(
     )
 
     msg = await target.reply_text(text=text, reply_markup=reply_markup)
-    await log_bot_answer(update, context, msg, text)
+    await log_bot_answer(update, context, msg, text, question_id)
     return msg
@@ -4,26 +4,52 @@ admins.py
 Модуль для административных действий с базой данных PostgreSQL.
 Содержит функции:
 - Просмотр таблиц и колонок
-- Выполнение произвольных SQL-запросов
+- Выполнение произвольных SQL-запросов (отдельный пул, таймаут и предел строк по роли, оценка через EXPLAIN)
 - Экспорт результата в Excel
+- Потоковая выгрузка результата запроса в файлы выбранного формата (db.export)
+
+Фиксированные запросы к основному пулу объявлены в реестре db.statements;
+произвольный SQL администратора выполняется в аналитическом пуле как есть.
 """
 
+import asyncio
+import json
 import logging
-from typing import List, Tuple
-import pandas as pd
-from io import BytesIO
-from openpyxl import Workbook
-from openpyxl.styles import Alignment
-from openpyxl.utils import get_column_letter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+import asyncpg
 from os import getenv
 from dotenv import load_dotenv
 
-from db.connection import get_db_connection
+from db.connection import get_db_connection, get_analytics_connection
+from db.export import DEFAULT_EXPORT_FORMAT, QueryExport, df_to_excel_bytes, export_query  # df_to_excel_bytes — реэкспорт
+from db.statements import statements
+from db.users import get_user_role
 
 
 load_dotenv()
 ADMIN_CHAT_ID = int(getenv("ADMIN_CHAT_ID", "0"))
 
+TABLE_NAMES = statements.register(
+    "admins.table_names",
+    """
+    SELECT table_name
+    FROM information_schema.tables
+    WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
+    ORDER BY table_name
+    """,
+)
+TABLE_COLUMNS = statements.register(
+    "admins.table_columns",
+    """
+    SELECT column_name, data_type
+    FROM information_schema.columns
+    WHERE table_name = $1
+    ORDER BY ordinal_position
+    """,
+)
+
 
 async def get_all_table_names(user_id: int) -> List[str]:
     """
@@ -36,15 +62,9 @@ async def get_all_table_names(user_id: int) -> List[str]:
     Returns:
         List[str]: Список названий таблиц.
     """
-    query = """
-        SELECT table_name
-        FROM information_schema.tables
-        WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
-        ORDER BY table_name
-    """
     try:
         async with get_db_connection() as conn:
-            records = await conn.fetch(query)
+            records = await TABLE_NAMES.fetch(conn)
             tables = [r['table_name'] for r in records]
 
             # Фильтрация по роли
@@ -67,97 +87,170 @@ async def get_table_columns(table: str) -> List[Tuple[str, str]]:
     Returns:
         List[Tuple[str, str]]: Кортежи (имя колонки, тип данных).
     """
-    query = """
-        SELECT column_name, data_type
-        FROM information_schema.columns
-        WHERE table_name = $1
-        ORDER BY ordinal_position
-    """
     try:
         async with get_db_connection() as conn:
-            records = await conn.fetch(query, table)
+            records = await TABLE_COLUMNS.fetch(conn, table)
             return [(r['column_name'], r['data_type']) for r in records]
     except Exception as e:
         logging.error(f"Не удалось получить колонки таблицы '{table}': {e}")
         return []
 
 
-async def execute_custom_sql_query(query: str, user_id: int) -> pd.DataFrame:
+@dataclass(frozen=True)
+class SqlLimits:
+    """
+    Ограничения произвольных SQL-запросов для роли.
+
+    Attributes:
+        statement_timeout_ms (int): statement_timeout для запроса.
+        max_rows (int): Максимум строк в результате (остальное обрезается).
+        warn_rows (int): Порог оценки EXPLAIN, выше которого нужно подтверждение.
+    """
+    statement_timeout_ms: int
+    max_rows: int
+    warn_rows: int
+
+
+SQL_LIMITS = {
+    "admin": SqlLimits(
+        statement_timeout_ms=int(getenv("SQL_TIMEOUT_ADMIN_MS", 60_000)),
+        max_rows=int(getenv("SQL_MAX_ROWS_ADMIN", 200_000)),
+        warn_rows=int(getenv("SQL_WARN_ROWS_ADMIN", 100_000)),
+    ),
+}
+DEFAULT_SQL_LIMITS = SqlLimits(
+    statement_timeout_ms=int(getenv("SQL_TIMEOUT_DEFAULT_MS", 15_000)),
+    max_rows=int(getenv("SQL_MAX_ROWS_DEFAULT", 50_000)),
+    warn_rows=int(getenv("SQL_WARN_ROWS_DEFAULT", 20_000)),
+)
+
+
+async def get_sql_limits(user_id: int) -> SqlLimits:
     """
-    Выполняет произвольный SQL-запрос и возвращает результат как DataFrame.
-    Только SELECT доступен для не-админов. Остальным — предупреждение.
+    Возвращает ограничения SQL-запросов по роли пользователя.
 
     Args:
-        query (str): SQL-запрос.
         user_id (int): Telegram user_id, инициатор запроса.
 
     Returns:
-        pd.DataFrame: Результат запроса или сообщение об ограничении.
+        SqlLimits: Ограничения роли (для неизвестных ролей — DEFAULT_SQL_LIMITS).
     """
-    try:
-        async with get_db_connection() as conn:
-            sql = query.strip().lower()
+    role = "admin" if user_id == ADMIN_CHAT_ID else await get_user_role(user_id)
+    return SQL_LIMITS.get(role, DEFAULT_SQL_LIMITS)
 
-            if user_id != ADMIN_CHAT_ID and not sql.startswith('select'):
-                logging.warning(f"⛔ Пользователь {user_id} пытался выполнить запрещённый запрос: {sql}")
-                return pd.DataFrame({"Ошибка": ["Не наглей, тебе доступен только SELECT"]})
 
-            if sql.startswith('select'):
-                records = await conn.fetch(query)
-                if records:
-                    columns = list(records[0].keys())
-                    data = [tuple(r) for r in records]
-                    return pd.DataFrame(data, columns=columns)
-                else:
-                    return pd.DataFrame()
-            else:
-                # Админу можно всё
-                await conn.execute(query)
-                return pd.DataFrame()
+@asynccontextmanager
+async def governed_connection(limits: SqlLimits) -> AsyncIterator[asyncpg.Connection]:
+    """
+    Соединение аналитического пула с statement_timeout роли.
+    Настройка сессионная: пул сбрасывает её (RESET ALL) при возврате соединения.
+
+    Args:
+        limits (SqlLimits): Ограничения роли.
+
+    Yields:
+        asyncpg.Connection: Соединение для запроса.
+    """
+    async with get_analytics_connection() as conn:
+        await conn.execute(
+            "SELECT set_config('statement_timeout', $1, false)", str(limits.statement_timeout_ms)
+        )
+        yield conn
+
+
+def _describe_sql_error(e: Exception) -> str:
+    """Текст ошибки SQL-запроса для администратора."""
+    if isinstance(e, asyncpg.QueryCanceledError):
+        return "Запрос прерван по таймауту (statement_timeout)"
+    if isinstance(e, asyncio.TimeoutError):
+        return "Все соединения для SQL-запросов заняты, попробуйте позже"
+    return str(e)
+
 
+@dataclass(frozen=True)
+class QueryPlan:
+    """
+    Оценка SELECT по плану EXPLAIN.
+
+    Attributes:
+        rows (int): Оценка числа строк результата.
+        relations (Tuple[str, ...]): Таблицы, которые читает план (представления раскрыты).
+    """
+    rows: int
+    relations: Tuple[str, ...]
+
+
+def _plan_relations(node: dict) -> set:
+    relations = {node["Relation Name"]} if "Relation Name" in node else set()
+    for child in node.get("Plans", []):
+        relations |= _plan_relations(child)
+    return relations
+
+
+async def explain_query(query: str, user_id: int) -> Optional[QueryPlan]:
+    """
+    Строит план SELECT через EXPLAIN (без выполнения запроса).
+
+    Args:
+        query (str): SQL-запрос.
+        user_id (int): Telegram user_id, инициатор запроса.
+
+    Returns:
+        Optional[QueryPlan]: Оценка строк и таблицы запроса или None, если оценить не удалось.
+    """
+    if not query.strip().lower().startswith('select'):
+        return None
+    try:
+        limits = await get_sql_limits(user_id)
+        async with governed_connection(limits) as conn:
+            plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}")
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]["Plan"]
+        return QueryPlan(rows=int(root["Plan Rows"]), relations=tuple(sorted(_plan_relations(root))))
     except Exception as e:
-        logging.error(f"Ошибка выполнения SQL-запроса: {e}")
-        return pd.DataFrame({"Ошибка": [str(e)]})
+        logging.warning(f"Не удалось оценить SQL-запрос: {e}")
+        return None
 
 
-def df_to_excel_bytes(df: pd.DataFrame) -> BytesIO:
+async def export_custom_sql_query(
+    query: str,
+    user_id: int,
+    fmt: str = DEFAULT_EXPORT_FORMAT,
+    filename: str = "result",
+    progress: Optional[Callable[[int], Awaitable[None]]] = None
+) -> QueryExport:
     """
-    Преобразует DataFrame в Excel-файл и возвращает его в виде байтового потока.
+    Выполняет произвольный SQL-запрос в аналитическом пуле с ограничениями роли (SqlLimits).
+    Только SELECT доступен для не-админов; результат SELECT потоково выгружается в файл.
 
     Args:
-        df (pd.DataFrame): Табличные данные.
+        query (str): SQL-запрос.
+        user_id (int): Telegram user_id, инициатор запроса.
+        fmt (str): Ключ экспортёра (db.export.EXPORTERS).
+        filename (str): Имя файла без расширения.
+        progress (Optional[Callable]): Колбэк хода сборки файла (см. export_query).
 
     Returns:
-        BytesIO: Поток с Excel-файлом.
-    """
-    wb = Workbook()
-    ws = wb.active
-
-    # Заголовки
-    for col_num, column in enumerate(df.columns, 1):
-        cell = ws.cell(row=1, column=col_num, value=column)
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    # Данные
-    for row_num, row in enumerate(df.itertuples(index=False), 2):
-        for col_num, value in enumerate(row, 1):
-            val = str(value)
-            if len(val) > 40:
-                val = val[:40]
-            cell = ws.cell(row=row_num, column=col_num, value=val)
-            cell.alignment = Alignment(wrap_text=True, horizontal="center", vertical="center")
-
-    # Автоширина
-    for col_num, column in enumerate(df.columns, 1):
-        col_letter = get_column_letter(col_num)
-        max_len = max(
-            [len(str(df.columns[col_num - 1]))]
-            + [len(str(val)) for val in df.iloc[:, col_num - 1].astype(str).values]
-        )
-        ws.column_dimensions[col_letter].width = min(max_len + 2, 40)
+        QueryExport: Результат выгрузки; ошибка или ограничение — в поле error,
+            обрезка по SqlLimits.max_rows — в поле truncated.
+    """
+    sql = query.strip().lower()
 
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+    if user_id != ADMIN_CHAT_ID and not sql.startswith('select'):
+        logging.warning(f"⛔ Пользователь {user_id} пытался выполнить запрещённый запрос: {sql}")
+        return QueryExport(error="Не наглей, тебе доступен только SELECT")
 
+    try:
+        limits = await get_sql_limits(user_id)
+        async with governed_connection(limits) as conn:
+            if sql.startswith('select'):
+                return await export_query(
+                    conn, query, fmt=fmt, filename=filename, max_rows=limits.max_rows, progress=progress
+                )
+            # Админу можно всё
+            await conn.execute(query)
+            return QueryExport()
+    except Exception as e:
+        logging.error(f"Ошибка выполнения SQL-запроса: {e}")
+        return QueryExport(error=_describe_sql_error(e))
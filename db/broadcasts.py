@@ -0,0 +1,363 @@
+import logging
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence
+from db.connection import get_db_connection
+from db.statements import statements
+
+"""
+Модуль для работы с рассылками: задания (broadcast_job) и доставка по получателям (broadcast_delivery).
+
+Статусы задания: scheduled → running → done.
+Статусы доставки: pending → sending → sent | failed.
+Строка в статусе sending после перезапуска означает, что сообщение могло уйти,
+но результат не записан: такие получатели помечаются unknown и повторно не получают рассылку.
+Запросы объявлены в реестре db.statements.
+"""
+
+# Размер страницы получателей, читаемой одним коротким запросом
+RECIPIENT_CHUNK_SIZE = 500
+# Роли, которым рассылка не отправляется никогда
+DEFAULT_EXCLUDED_ROLES = ("rejected",)
+
+# $1 — роли получателей (NULL — все роли), $2 — исключаемые роли.
+# Отказавшиеся от рассылок (broadcast_opt_out) не попадают в выборку.
+RECIPIENTS_QUERY = """
+    SELECT u.user_id
+    FROM User_Contacts_VBA u
+    WHERE ($1::text[] IS NULL OR u.role = ANY($1::text[]))
+      AND u.role <> ALL($2::text[])
+      AND NOT EXISTS (SELECT 1 FROM broadcast_opt_out o WHERE o.user_id = u.user_id)
+"""
+
+JOB_COLUMNS = (
+    "id, target_role, text, photo_file_id, scheduled_at, status, created_by, "
+    "progress_chat_id, progress_message_id, progress_with_caption, total, "
+    "created_at, started_at, finished_at"
+)
+
+CREATE_JOB = statements.register(
+    "broadcasts.create_job",
+    """
+    INSERT INTO broadcast_job (
+        target_role, text, photo_file_id, scheduled_at, created_by,
+        progress_chat_id, progress_message_id, progress_with_caption
+    )
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    RETURNING id
+    """,
+)
+JOB_BY_ID = statements.register("broadcasts.job_by_id", f"SELECT {JOB_COLUMNS} FROM broadcast_job WHERE id = $1")
+ACTIVE_JOBS = statements.register(
+    "broadcasts.active_jobs",
+    f"""
+    SELECT {JOB_COLUMNS} FROM broadcast_job
+    WHERE status IN ('scheduled', 'running')
+    ORDER BY scheduled_at
+    """,
+)
+LOCK_JOB_STATUS = statements.register(
+    "broadcasts.lock_job_status", "SELECT status FROM broadcast_job WHERE id = $1 FOR UPDATE"
+)
+INSERT_RECIPIENTS = statements.register(
+    "broadcasts.insert_recipients",
+    f"""
+    INSERT INTO broadcast_delivery (job_id, user_id)
+    SELECT $3, r.user_id FROM ({RECIPIENTS_QUERY}) r
+    ON CONFLICT DO NOTHING
+    """,
+)
+START_JOB = statements.register(
+    "broadcasts.start_job",
+    "UPDATE broadcast_job SET status = 'running', started_at = now(), total = $2 WHERE id = $1",
+)
+MARK_SENDING_UNKNOWN = statements.register(
+    "broadcasts.mark_sending_unknown",
+    "UPDATE broadcast_delivery SET status = 'unknown', updated_at = now() "
+    "WHERE job_id = $1 AND status = 'sending'",
+)
+PENDING_PAGE = statements.register(
+    "broadcasts.pending_page",
+    """
+    SELECT user_id FROM broadcast_delivery
+    WHERE job_id = $1 AND status = 'pending' AND user_id > $2
+    ORDER BY user_id
+    LIMIT $3
+    """,
+    hot=True,
+)
+CLAIM_DELIVERY = statements.register(
+    "broadcasts.claim_delivery",
+    """
+    UPDATE broadcast_delivery SET status = 'sending', updated_at = now()
+    WHERE job_id = $1 AND user_id = $2 AND status = 'pending'
+    RETURNING 1
+    """,
+    hot=True,
+)
+COMPLETE_DELIVERY = statements.register(
+    "broadcasts.complete_delivery",
+    """
+    UPDATE broadcast_delivery SET status = $3, updated_at = now()
+    WHERE job_id = $1 AND user_id = $2
+    """,
+    hot=True,
+)
+FINISH_JOB = statements.register(
+    "broadcasts.finish_job",
+    """
+    UPDATE broadcast_job SET status = 'done', finished_at = now()
+    WHERE id = $1
+      AND NOT EXISTS (
+          SELECT 1 FROM broadcast_delivery WHERE job_id = $1 AND status = 'pending'
+      )
+    RETURNING 1
+    """,
+)
+DELIVERY_COUNTS = statements.register(
+    "broadcasts.delivery_counts",
+    "SELECT status, count(*) AS cnt FROM broadcast_delivery WHERE job_id = $1 GROUP BY status",
+)
+RECENT_JOBS = statements.register(
+    "broadcasts.recent_jobs",
+    """
+    SELECT j.id, j.target_role, j.scheduled_at, j.status, j.total,
+           count(*) FILTER (WHERE d.status = 'sent') AS sent,
+           count(*) FILTER (WHERE d.status IN ('failed', 'unknown')) AS failed,
+           count(*) FILTER (WHERE d.status IN ('pending', 'sending')) AS pending
+    FROM broadcast_job j
+    LEFT JOIN broadcast_delivery d ON d.job_id = j.id
+    GROUP BY j.id
+    ORDER BY j.id DESC
+    LIMIT $1
+    """,
+)
+
+
+async def create_broadcast_job(
+    target_role: str,
+    text: str,
+    photo_file_id: Optional[str],
+    scheduled_at: datetime,
+    created_by: int,
+    progress_chat_id: Optional[int] = None,
+    progress_message_id: Optional[int] = None,
+    progress_with_caption: bool = False
+) -> Optional[int]:
+    """
+    Создаёт задание рассылки.
+
+    Args:
+        target_role (str): Роль получателей ("all" — все роли).
+        text (str): Текст рассылки (HTML).
+        photo_file_id (Optional[str]): file_id фото.
+        scheduled_at (datetime): Время запуска (aware).
+        created_by (int): Telegram ID администратора.
+        progress_chat_id (Optional[int]): Чат сообщения с прогрессом.
+        progress_message_id (Optional[int]): ID сообщения с прогрессом.
+        progress_with_caption (bool): Сообщение с прогрессом — фото с подписью.
+
+    Returns:
+        Optional[int]: ID задания или None при ошибке.
+    """
+    try:
+        async with get_db_connection() as conn:
+            return await CREATE_JOB.fetchval(
+                conn, target_role, text, photo_file_id, scheduled_at, created_by,
+                progress_chat_id, progress_message_id, progress_with_caption
+            )
+    except Exception as e:
+        logging.error(f"Ошибка при создании рассылки: {e}")
+        return None
+
+
+async def get_broadcast_job(job_id: int) -> Optional[dict]:
+    """
+    Возвращает задание рассылки по ID.
+
+    Args:
+        job_id (int): ID задания.
+
+    Returns:
+        Optional[dict]: Поля задания или None.
+    """
+    try:
+        async with get_db_connection() as conn:
+            record = await JOB_BY_ID.fetchrow(conn, job_id)
+            return dict(record) if record else None
+    except Exception as e:
+        logging.error(f"Ошибка при получении рассылки {job_id}: {e}")
+        return None
+
+
+async def get_active_broadcast_jobs() -> List[dict]:
+    """
+    Возвращает запланированные и незавершённые рассылки (для планирования после запуска бота).
+
+    Returns:
+        List[dict]: Задания в порядке времени запуска.
+    """
+    try:
+        async with get_db_connection() as conn:
+            return [dict(r) for r in await ACTIVE_JOBS.fetch(conn)]
+    except Exception as e:
+        logging.error(f"Ошибка при получении активных рассылок: {e}")
+        return []
+
+
+def recipient_roles(target_role: str) -> Optional[List[str]]:
+    """
+    Преобразует выбор администратора в фильтр ролей RECIPIENTS_QUERY.
+
+    Args:
+        target_role (str): Роль или "all".
+
+    Returns:
+        Optional[List[str]]: Список ролей или None (все роли).
+    """
+    return None if target_role == "all" else [target_role]
+
+
+async def begin_broadcast_job(
+    job_id: int,
+    roles: Optional[Sequence[str]],
+    exclude_roles: Sequence[str] = DEFAULT_EXCLUDED_ROLES
+) -> None:
+    """
+    Переводит задание в running и фиксирует получателей — в одной транзакции.
+    Получатели выбираются одним INSERT ... SELECT по RECIPIENTS_QUERY, без передачи в Python.
+    Для уже запущенного задания список получателей не пересобирается,
+    а доставки, застрявшие в sending, помечаются unknown.
+
+    Args:
+        job_id (int): ID задания.
+        roles (Optional[Sequence[str]]): Роли получателей (None — все).
+        exclude_roles (Sequence[str]): Исключаемые роли.
+    """
+    async with get_db_connection() as conn:
+        async with conn.transaction():
+            status = await LOCK_JOB_STATUS.fetchval(conn, job_id)
+            if status == "scheduled":
+                inserted = await INSERT_RECIPIENTS.execute(conn, roles, list(exclude_roles), job_id)
+                await START_JOB.execute(conn, job_id, int(inserted.split()[-1]))
+            else:
+                await MARK_SENDING_UNKNOWN.execute(conn, job_id)
+
+
+async def iter_pending_deliveries(job_id: int, chunk_size: int = RECIPIENT_CHUNK_SIZE) -> AsyncIterator[List[int]]:
+    """
+    Отдаёт пачками получателей, которым рассылка ещё не отправлялась.
+
+    Страницы читаются keyset-запросом по первичному ключу (job_id, user_id),
+    каждая — на своём коротком соединении: рассылка может идти часами, и держать
+    всё это время соединение пула и открытую транзакцию (старый снимок мешает
+    VACUUM) нельзя.
+
+    Args:
+        job_id (int): ID задания.
+        chunk_size (int): Размер пачки.
+
+    Yields:
+        List[int]: Очередная пачка Telegram ID.
+    """
+    last_user_id = -1
+    while True:
+        async with get_db_connection() as conn:
+            records = await PENDING_PAGE.fetch(conn, job_id, last_user_id, chunk_size)
+        if not records:
+            return
+        batch = [r['user_id'] for r in records]
+        last_user_id = batch[-1]
+        yield batch
+        if len(batch) < chunk_size:
+            return
+
+
+async def claim_delivery(job_id: int, user_id: int) -> bool:
+    """
+    Помечает доставку как sending перед отправкой.
+
+    Args:
+        job_id (int): ID задания.
+        user_id (int): Получатель.
+
+    Returns:
+        bool: True, если получатель ещё ожидал отправки (иначе отправлять нельзя).
+    """
+    try:
+        async with get_db_connection() as conn:
+            return await CLAIM_DELIVERY.fetchval(conn, job_id, user_id) is not None
+    except Exception as e:
+        logging.error(f"Ошибка при резервировании доставки {job_id}/{user_id}: {e}")
+        return False
+
+
+async def complete_delivery(job_id: int, user_id: int, success: bool) -> None:
+    """
+    Записывает результат отправки получателю.
+
+    Args:
+        job_id (int): ID задания.
+        user_id (int): Получатель.
+        success (bool): Сообщение доставлено.
+    """
+    try:
+        async with get_db_connection() as conn:
+            await COMPLETE_DELIVERY.execute(conn, job_id, user_id, "sent" if success else "failed")
+    except Exception as e:
+        logging.error(f"Ошибка при записи доставки {job_id}/{user_id}: {e}")
+
+
+async def finish_broadcast_job(job_id: int) -> bool:
+    """
+    Отмечает задание рассылки завершённым, если не осталось получателей в статусе pending
+    (например, не зарезервированных из-за ошибки БД). Иначе задание остаётся running
+    и продолжится при следующем запуске бота.
+
+    Args:
+        job_id (int): ID задания.
+
+    Returns:
+        bool: True, если задание завершено.
+    """
+    try:
+        async with get_db_connection() as conn:
+            return await FINISH_JOB.fetchval(conn, job_id) is not None
+    except Exception as e:
+        logging.error(f"Ошибка при завершении рассылки {job_id}: {e}")
+        return False
+
+
+async def get_delivery_counts(job_id: int) -> dict:
+    """
+    Возвращает число доставок задания по статусам.
+
+    Args:
+        job_id (int): ID задания.
+
+    Returns:
+        dict: {статус: количество}.
+    """
+    try:
+        async with get_db_connection() as conn:
+            return {r['status']: r['cnt'] for r in await DELIVERY_COUNTS.fetch(conn, job_id)}
+    except Exception as e:
+        logging.error(f"Ошибка при подсчёте доставок рассылки {job_id}: {e}")
+        return {}
+
+
+async def get_recent_broadcast_jobs(limit: int = 5) -> List[dict]:
+    """
+    Возвращает последние рассылки со счётчиками доставки.
+
+    Args:
+        limit (int): Количество рассылок.
+
+    Returns:
+        List[dict]: id, target_role, scheduled_at, status, total, sent, failed, pending.
+    """
+    try:
+        async with get_db_connection() as conn:
+            return [dict(r) for r in await RECENT_JOBS.fetch(conn, limit)]
+    except Exception as e:
+        logging.error(f"Ошибка при получении списка рассылок: {e}")
+        return []
@@ -1,41 +1,143 @@
 """
 Модуль для асинхронного управления соединением к PostgreSQL через asyncpg.
 Содержит функции инициализации пула, получения и закрытия соединений.
+
+Соединения основного пула — db.statements.StatementConnection: горячие запросы
+реестра db.statements подготавливаются на каждом новом соединении (init-колбэк).
+
+Помимо основного пула есть отдельный маленький пул для аналитики
+(админские SQL-запросы и выгрузки): тяжёлые запросы занимают только его
+соединения и не отнимают их у обработки апдейтов.
+
+Размеры основного пула задаются через env (DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE).
+Пул растёт до максимума по требованию, а соединения, простаивающие дольше
+DB_POOL_MAX_INACTIVE_LIFETIME секунд, закрываются. Каждое получение соединения
+измеряется (db.pool_metrics): ожидание, таймауты, занятые/свободные соединения —
+см. get_pool_stats().
 """
 
+import asyncio
 import logging
+import os
+import time
 import asyncpg
-from .db_config import DB_SETTINGS, get_working_host
+from .db_config import DB_SETTINGS, discover_db_host, get_working_host
+from .pool_metrics import PoolMetrics
+from .statements import StatementConnection, prepare_hot_statements
 
-__all__ = ("init_db_pool", "close_db_pool", "get_db_connection")
+__all__ = (
+    "init_db_pool", "close_db_pool", "get_db_connection", "get_connect_settings",
+    "get_analytics_connection", "get_pool_stats",
+)
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+# Простаивающее дольше соединение закрывается (0 — никогда)
+DB_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", 300))
+# Сколько ждать свободное соединение основного пула, прежде чем выбросить asyncio.TimeoutError
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", 30))
+
+ANALYTICS_POOL_SIZE = int(os.getenv("ANALYTICS_POOL_SIZE", 2))
+# Сколько ждать свободное соединение аналитического пула, прежде чем отказать
+ANALYTICS_ACQUIRE_TIMEOUT = float(os.getenv("ANALYTICS_ACQUIRE_TIMEOUT", 10))
 
 _db_pool: asyncpg.pool.Pool | None = None
+_analytics_pool: asyncpg.pool.Pool | None = None
+
+db_pool_metrics = PoolMetrics("main")
+analytics_pool_metrics = PoolMetrics("analytics")
+
+
+class MeasuredAcquire:
+    """
+    Контекстный менеджер `async with`, выдающий соединение пула
+    и записывающий время ожидания в PoolMetrics.
+    """
+
+    def __init__(self, pool: asyncpg.pool.Pool, metrics: PoolMetrics, timeout: float | None) -> None:
+        self._pool = pool
+        self._metrics = metrics
+        self._timeout = timeout
+        self._conn = None
+
+    async def __aenter__(self) -> asyncpg.Connection:
+        self._metrics.start_wait()
+        started = time.perf_counter()
+        try:
+            self._conn = await self._pool.acquire(timeout=self._timeout)
+        except asyncio.TimeoutError:
+            self._metrics.record_timeout()
+            logging.warning(
+                f"[DB_POOL] Таймаут ожидания соединения пула {self._metrics.name} ({self._timeout} с)"
+            )
+            raise
+        except BaseException:
+            self._metrics.record_failure()
+            raise
+        self._metrics.record_acquire(time.perf_counter() - started)
+        return self._conn
+
+    async def __aexit__(self, *exc) -> None:
+        conn, self._conn = self._conn, None
+        await self._pool.release(conn)
+
+
+def get_connect_settings() -> dict:
+    """
+    Возвращает параметры подключения в формате asyncpg.connect / create_pool.
+    Хост должен быть уже найден (discover_db_host в init_db_pool).
+
+    Returns:
+        dict: host, port, user, password, database.
+    """
+    settings = {**DB_SETTINGS, "host": get_working_host()}
+    if "dbname" in settings:
+        settings["database"] = settings.pop("dbname")
+    return settings
 
 
-async def init_db_pool(min_size: int = 1, max_size: int = 10) -> None:
+async def init_db_pool(min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE) -> None:
     """
     Инициализирует глобальный пул соединений к базе данных PostgreSQL.
+    Перед созданием пула выбирает рабочий хост из DB_HOSTS (discover_db_host).
 
     Args:
-        min_size (int): Минимальное число соединений в пуле (по умолчанию 1).
-        max_size (int): Максимальное число соединений в пуле (по умолчанию 10).
+        min_size (int): Минимальное число соединений в пуле (DB_POOL_MIN_SIZE, по умолчанию 1).
+        max_size (int): Максимальное число соединений в пуле (DB_POOL_MAX_SIZE, по умолчанию 10).
 
     Raises:
+        ConnectionError: Если ни один хост из DB_HOSTS не доступен.
         asyncpg.PostgresError: В случае ошибки при создании пула.
     """
-    global _db_pool
+    global _db_pool, _analytics_pool
     if _db_pool is None:
-        host = get_working_host()
-        settings = {**DB_SETTINGS, "host": host}
-        if "dbname" in settings:
-            settings["database"] = settings.pop("dbname")
+        try:
+            await discover_db_host()
+        except ConnectionError as e:
+            logging.critical(f"[DB] {e}")
+            raise
+        settings = get_connect_settings()
+        host = settings["host"]
         try:
             _db_pool = await asyncpg.create_pool(
                 **settings,
                 min_size=min_size,
                 max_size=max_size,
+                max_inactive_connection_lifetime=DB_POOL_MAX_INACTIVE_LIFETIME,
+                connection_class=StatementConnection,
+                init=prepare_hot_statements,
+            )
+            # Аналитический пул создаёт соединения по требованию
+            _analytics_pool = await asyncpg.create_pool(
+                **settings,
+                min_size=0,
+                max_size=ANALYTICS_POOL_SIZE,
+            )
+            logging.info(
+                f"AsyncPG pool initialized on host={host} "
+                f"(min_size={min_size}, max_size={max_size}, "
+                f"max_inactive_lifetime={DB_POOL_MAX_INACTIVE_LIFETIME}s)"
             )
-            logging.info(f"AsyncPG pool initialized on host={host}")
         except Exception as e:
             logging.critical(f"Не удалось инициализировать пул БД: {e}")
             raise
@@ -48,23 +150,27 @@ async def close_db_pool() -> None:
     Raises:
         asyncpg.PostgresError: Если при закрытии пула произошла ошибка.
     """
-    global _db_pool
+    global _db_pool, _analytics_pool
+    if _analytics_pool is not None:
+        await _analytics_pool.close()
+        _analytics_pool = None
     if _db_pool is not None:
         await _db_pool.close()
         logging.info("AsyncPG pool closed")
         _db_pool = None
 
 
-def get_db_connection() -> asyncpg.pool.PoolAcquireContext:
+def get_db_connection() -> MeasuredAcquire:
     """
     Возвращает контекстный менеджер для работы с одним соединением из пула.
+    Если все соединения заняты дольше DB_POOL_ACQUIRE_TIMEOUT, выбрасывается asyncio.TimeoutError.
 
     Usage:
         async with get_db_connection() as conn:
             await conn.execute(...)
 
     Returns:
-        asyncpg.pool.PoolAcquireContext: Контекст, дающий asyncpg.Connection.
+        MeasuredAcquire: Контекст, дающий asyncpg.Connection.
 
     Raises:
         RuntimeError: Если пул еще не инициализирован.
@@ -72,4 +178,38 @@ def get_db_connection() -> asyncpg.pool.PoolAcquireContext:
     global _db_pool
     if _db_pool is None:
         raise RuntimeError("Database pool is not initialized. Call init_db_pool() first.")
-    return _db_pool.acquire()
+    return MeasuredAcquire(_db_pool, db_pool_metrics, DB_POOL_ACQUIRE_TIMEOUT or None)
+
+
+def get_analytics_connection() -> MeasuredAcquire:
+    """
+    Возвращает контекстный менеджер для соединения из аналитического пула.
+    Если все ANALYTICS_POOL_SIZE соединений заняты дольше ANALYTICS_ACQUIRE_TIMEOUT,
+    выбрасывается asyncio.TimeoutError.
+
+    Usage:
+        async with get_analytics_connection() as conn:
+            await conn.fetch(...)
+
+    Returns:
+        MeasuredAcquire: Контекст, дающий asyncpg.Connection.
+
+    Raises:
+        RuntimeError: Если пул еще не инициализирован.
+    """
+    if _analytics_pool is None:
+        raise RuntimeError("Database pool is not initialized. Call init_db_pool() first.")
+    return MeasuredAcquire(_analytics_pool, analytics_pool_metrics, ANALYTICS_ACQUIRE_TIMEOUT)
+
+
+def get_pool_stats() -> list[dict]:
+    """
+    Возвращает метрики основного и аналитического пулов (см. PoolMetrics.snapshot).
+
+    Returns:
+        list[dict]: Снимок метрик каждого пула.
+    """
+    return [
+        db_pool_metrics.snapshot(_db_pool),
+        analytics_pool_metrics.snapshot(_analytics_pool),
+    ]
@@ -1,6 +1,21 @@
-import os
+"""
+db_config.py
+
+Параметры подключения к PostgreSQL и выбор рабочего хоста.
+
+Хосты-кандидаты задаются в DB_HOSTS через запятую (по умолчанию
+"localhost,postgres_db" — локальный запуск и docker-compose). При старте
+бота (init_db_pool внутри post_init) discover_db_host() параллельно пробует
+подключиться ко всем кандидатам с таймаутом DB_HOST_PROBE_TIMEOUT и запоминает
+первый доступный хост в порядке DB_HOSTS; дальше get_working_host() отдаёт его без новых проверок.
+"""
+
+import asyncio
 import logging
-import psycopg2
+import os
+from typing import List, Optional
+
+import asyncpg
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,10 +27,30 @@ DB_SETTINGS = {
     "port": int(os.getenv("DB_PORT", 5432)),
 }
 
+DB_HOSTS: List[str] = [h.strip() for h in os.getenv("DB_HOSTS", "localhost,postgres_db").split(",") if h.strip()]
+DB_HOST_PROBE_TIMEOUT = float(os.getenv("DB_HOST_PROBE_TIMEOUT", 3))
 
-def get_working_host() -> str:
+_working_host: Optional[str] = None
+
+
+async def _probe_host(host: str) -> str:
+    conn = await asyncpg.connect(
+        host=host,
+        port=DB_SETTINGS["port"],
+        user=DB_SETTINGS["user"],
+        password=DB_SETTINGS["password"],
+        database=DB_SETTINGS["dbname"],
+        timeout=DB_HOST_PROBE_TIMEOUT,
+    )
+    await conn.close()
+    return host
+
+
+async def discover_db_host() -> str:
     """
-    Пробует подключиться к доступным хостам и возвращает первый рабочий.
+    Параллельно проверяет хосты из DB_HOSTS и запоминает первый доступный в порядке
+    DB_HOSTS (как раньше: сначала localhost, потом postgres_db), а не первый ответивший.
+    Повторные вызовы возвращают запомненный хост.
 
     Returns:
         str: Рабочий хост (например, 'localhost' или 'postgres_db').
@@ -23,24 +58,32 @@ def get_working_host() -> str:
     Raises:
         ConnectionError: Если не удалось подключиться ни к одному хосту.
     """
-    # Пробуем сначала localhost, а потом postgres_db
-    for host in ["localhost", "postgres_db"]:
-        try:
-            test_settings = DB_SETTINGS.copy()
-            test_settings["host"] = host
-            conn = psycopg2.connect(**test_settings)
-            conn.close()
-            logging.info(f"[DB] Успешное подключение через {host}")
-            return host
-        except psycopg2.OperationalError:
-            logging.warning(f"[DB] {host} недоступен, пробуем другой...")
-
-    raise ConnectionError("❌ Не удалось подключиться ни через localhost, ни через postgres_db")
-
-
-# Определяем рабочий хост и сразу подставляем его в настройки
-try:
-    DB_SETTINGS["host"] = get_working_host()
-except ConnectionError as e:
-    logging.critical(f"[DB] {e}")
-    raise
+    global _working_host
+    if _working_host is not None:
+        return _working_host
+
+    results = await asyncio.gather(*(_probe_host(host) for host in DB_HOSTS), return_exceptions=True)
+    for host, result in zip(DB_HOSTS, results):
+        if isinstance(result, BaseException):
+            logging.warning(f"[DB] {host} недоступен: {result!r}")
+            continue
+        logging.info(f"[DB] Успешное подключение через {host}")
+        _working_host = host
+        return host
+
+    raise ConnectionError(f"❌ Не удалось подключиться ни к одному из хостов: {', '.join(DB_HOSTS)}")
+
+
+def get_working_host() -> str:
+    """
+    Возвращает хост, найденный discover_db_host().
+
+    Returns:
+        str: Рабочий хост.
+
+    Raises:
+        RuntimeError: Если discover_db_host() ещё не выполнялся.
+    """
+    if _working_host is None:
+        raise RuntimeError("DB host is not discovered. Call discover_db_host() first.")
+    return _working_host
@@ -1,13 +1,57 @@
 import uuid
 import logging
 from datetime import datetime
+from typing import List, Optional
 import pytz
 from db.connection import get_db_connection
+from db.statements import statements
 
 logger = logging.getLogger(__name__)
 moscow = pytz.timezone("Europe/Moscow")
 SESSION_TIMEOUT_MINUTES = 15
 
+# Запросы объявлены в реестре db.statements
+
+# $9 — заранее зарезервированный id строки (см. reserve_dialog_ids) или NULL
+INSERT_QUESTION_QUERY = statements.register("dialog_log.insert_question", """
+    INSERT INTO dialog_log (
+        session_id, step, user_id, username,
+        id_question, question, time_question, point, id
+    )
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, COALESCE($9, nextval('dialog_log_id_seq')))
+    RETURNING id
+""", hot=True)
+
+UPDATE_ANSWER_BY_ID_QUERY = statements.register("dialog_log.update_answer_by_id", """
+    UPDATE dialog_log
+    SET id_answer = $1, answer = $2, time_answer = $3
+    WHERE id = $4 AND id_answer IS NULL
+""", hot=True)
+
+# Запасной вариант для вызовов без id вопроса: последняя неотвеченная строка пользователя
+UPDATE_ANSWER_QUERY = statements.register("dialog_log.update_answer_latest", """
+    UPDATE dialog_log
+    SET id_answer = $1, answer = $2, time_answer = $3
+    WHERE user_id = $4 AND id_answer IS NULL
+    AND step = (
+        SELECT MAX(step)
+        FROM dialog_log
+        WHERE user_id = $4 AND id_answer IS NULL
+    )
+""", hot=True)
+
+LAST_SESSION_QUERY = statements.register("dialog_log.last_session", """
+    SELECT session_id, step, time_question
+    FROM dialog_log
+    WHERE user_id = $1
+    ORDER BY time_question DESC
+    LIMIT 1
+""")
+
+RESERVE_IDS_QUERY = statements.register(
+    "dialog_log.reserve_ids", "SELECT nextval('dialog_log_id_seq') FROM generate_series(1, $1)", hot=True
+)
+
 
 async def get_last_session(user_id: int):
     """
@@ -19,16 +63,9 @@ async def get_last_session(user_id: int):
     Returns:
         tuple | None: (session_id, step, time_question) или None при ошибке.
     """
-    query = """
-        SELECT session_id, step, time_question
-        FROM dialog_log
-        WHERE user_id = $1
-        ORDER BY time_question DESC
-        LIMIT 1
-    """
     try:
         async with get_db_connection() as conn:
-            record = await conn.fetchrow(query, user_id)
+            record = await LAST_SESSION_QUERY.fetchrow(conn, user_id)
             if record:
                 return (record['session_id'], record['step'], record['time_question'])
             return None
@@ -37,6 +74,26 @@ async def get_last_session(user_id: int):
         return None
 
 
+async def reserve_dialog_ids(count: int) -> List[int]:
+    """
+    Резервирует пачку значений dialog_log.id из последовательности за один запрос.
+    Нужна, чтобы id вопроса был известен до того, как строка записана в БД.
+
+    Args:
+        count (int): Сколько id зарезервировать.
+
+    Returns:
+        List[int]: Зарезервированные id или пустой список при ошибке.
+    """
+    try:
+        async with get_db_connection() as conn:
+            records = await RESERVE_IDS_QUERY.fetch(conn, count)
+            return [r[0] for r in records]
+    except Exception as e:
+        logger.error("Ошибка в reserve_dialog_ids: %s", e)
+        return []
+
+
 def start_new_session() -> str:
     """
     Генерирует новый UUID для сессии.
@@ -55,8 +112,9 @@ async def insert_question(
     message_id: int,
     question: str,
     point: str,
-    time_question: datetime
-) -> None:
+    time_question: datetime,
+    row_id: Optional[int] = None
+) -> Optional[int]:
     """
     Сохраняет сообщение пользователя в таблицу dialog_log.
 
@@ -69,55 +127,85 @@ async def insert_question(
         question (str): Текст вопроса.
         point (str): Точка сценария (например, "CONTACT").
         time_question (datetime): Время вопроса.
-    """
-    query = """
-        INSERT INTO dialog_log (
-            session_id, step, user_id, username,
-            id_question, question, time_question, point
-        )
-        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        row_id (Optional[int]): Зарезервированный id строки (иначе берётся из последовательности).
+
+    Returns:
+        Optional[int]: id вставленной строки или None при ошибке.
     """
     try:
         async with get_db_connection() as conn:
-            await conn.execute(
-                query,
+            return await INSERT_QUESTION_QUERY.fetchval(
+                conn,
                 session_id, step, user_id, username,
-                message_id, question, time_question, point
+                message_id, question, time_question, point, row_id
             )
     except Exception as e:
         logger.error("Ошибка в insert_question: %s", e)
+        return None
 
 
 async def insert_answer(
     user_id: int,
     message_id: int,
     answer: str,
-    time_answer: datetime
+    time_answer: datetime,
+    question_id: Optional[int] = None
 ) -> None:
     """
-    Обновляет последнюю строку пользователя в dialog_log, добавляя ответ.
+    Добавляет ответ к строке вопроса в dialog_log.
+
+    Если известен id строки вопроса — обновляет ровно её по первичному ключу.
+    Иначе обновляет последнюю неотвеченную строку пользователя.
 
     Args:
         user_id (int): Telegram ID пользователя.
         message_id (int): ID ответа бота.
         answer (str): Текст ответа.
         time_answer (datetime): Время ответа.
+        question_id (Optional[int]): id строки вопроса (dialog_log.id).
     """
-    query = """
-        UPDATE dialog_log
-        SET id_answer = $1, answer = $2, time_answer = $3
-        WHERE user_id = $4 AND id_answer IS NULL
-        AND step = (
-            SELECT MAX(step)
-            FROM dialog_log
-            WHERE user_id = $4 AND id_answer IS NULL
-        )
-    """
+    if question_id is not None:
+        statement, args = UPDATE_ANSWER_BY_ID_QUERY, (message_id, answer, time_answer, question_id)
+    else:
+        statement, args = UPDATE_ANSWER_QUERY, (message_id, answer, time_answer, user_id)
     try:
         async with get_db_connection() as conn:
-            await conn.execute(
-                query,
-                message_id, answer, time_answer, user_id
-            )
+            await statement.execute(conn, *args)
     except Exception as e:
         logger.error("Ошибка в insert_answer: %s", e)
+
+
+async def write_dialog_batch(events: list[tuple[str, tuple]]) -> None:
+    """
+    Записывает пачку накопленных событий диалога за одну транзакцию.
+
+    События применяются строго в порядке поступления: подряд идущие события
+    одного типа объединяются в один `executemany`, чтобы ответ не привязался
+    к вопросу, который ещё не вставлен.
+
+    Args:
+        events (list[tuple[str, tuple]]): Пары (тип, аргументы), где тип —
+            "question" (аргументы INSERT_QUESTION_QUERY),
+            "answer" (аргументы UPDATE_ANSWER_BY_ID_QUERY) или
+            "answer_latest" (аргументы UPDATE_ANSWER_QUERY).
+
+    Raises:
+        asyncpg.PostgresError: Если пачку не удалось записать.
+    """
+    queries = {
+        "question": INSERT_QUESTION_QUERY,
+        "answer": UPDATE_ANSWER_BY_ID_QUERY,
+        "answer_latest": UPDATE_ANSWER_QUERY,
+    }
+
+    async with get_db_connection() as conn:
+        async with conn.transaction():
+            run_kind, run_args = None, []
+            for kind, args in events:
+                if kind != run_kind and run_args:
+                    await queries[run_kind].executemany(conn, run_args)
+                    run_args = []
+                run_kind = kind
+                run_args.append(args)
+            if run_args:
+                await queries[run_kind].executemany(conn, run_args)
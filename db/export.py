@@ -0,0 +1,534 @@
+"""
+export.py
+
+Потоковая выгрузка результата SQL-запроса в файл:
+- Строки читаются серверным курсором asyncpg пачками по EXPORT_CHUNK_SIZE.
+- Каждая пачка сразу пишется выбранным экспортёром: xlsx (openpyxl write_only),
+  CSV, CSV.gz или Parquet (если установлен pyarrow).
+- Файл собирается в SpooledTemporaryFile: небольшие выгрузки остаются в памяти,
+  большие уходят на диск.
+- Когда файл дорастает до EXPORT_PART_MAX_BYTES, он закрывается и выгрузка
+  продолжается в следующий — каждая часть укладывается в лимит загрузки Telegram.
+
+Пиковое потребление памяти пропорционально размеру пачки, а не таблицы.
+
+Экспортёры регистрируются в EXPORTERS декоратором register_exporter; у каждого
+есть format (ключ для выбора), extension, label и методы write_columns/size/finish.
+
+Кодирование пачек и сохранение книги — CPU-работа, поэтому она выполняется
+в пуле потоков экспорта (EXPORT_WORKERS потоков), а event loop в это время
+продолжает обрабатывать апдейты остальных пользователей. В поток передаётся
+не список asyncpg.Record, а пачка по колонкам (кортеж значений на колонку):
+транспонирование — один проход zip на C, и Record пачки освобождаются сразу.
+
+Тот же XlsxChunkWriter используется в df_to_excel_bytes для готовых DataFrame.
+
+openpyxl и pyarrow импортируются при создании экспортёра, pandas — только
+для аннотаций: модуль импортирует main.py, и процесс бота не должен платить
+временем старта и памятью за библиотеки, нужные лишь админской выгрузке.
+"""
+
+import asyncio
+import codecs
+import csv
+import gzip
+import importlib.util
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, TypeVar
+
+import asyncpg
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Parquet-выгрузка доступна только с pyarrow; сам pyarrow импортируется при выгрузке
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+# Сколько байт выгрузки держать в памяти, прежде чем SpooledTemporaryFile уйдёт на диск
+EXPORT_SPOOL_MAX_SIZE = int(os.getenv("EXPORT_SPOOL_MAX_SIZE", 8 * 1024 * 1024))
+# Результат не больше этого размера отправляется текстом, а не файлом
+PREVIEW_MAX_ROWS = 10
+PREVIEW_MAX_COLUMNS = 5
+# Ячейки Excel обрезаются до этой длины, ширина колонки ограничена ею же
+EXCEL_CELL_MAX_LENGTH = 40
+# Сжатая служебная разметка ячейки xlsx, байт (для оценки размера файла)
+XLSX_CELL_OVERHEAD = 8
+# Лимит Telegram на файл от бота — 50 МБ; части выгрузки держим ниже с запасом
+# на ещё не сброшенный буфер сжатия и оценку размера xlsx
+EXPORT_PART_MAX_BYTES = int(os.getenv("EXPORT_PART_MAX_BYTES", 45 * 1024 * 1024))
+DEFAULT_EXPORT_FORMAT = "xlsx"
+# Сколько выгрузок одновременно кодируется в файлы; остальные ждут свободный поток
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 2))
+
+T = TypeVar("T")
+
+_export_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_export_executor() -> ThreadPoolExecutor:
+    global _export_executor
+    if _export_executor is None:
+        _export_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+    return _export_executor
+
+
+async def run_in_export_pool(func: Callable[..., T], *args: Any) -> T:
+    """
+    Выполняет CPU-работу выгрузки (кодирование пачки, сохранение книги) в пуле потоков экспорта,
+    не блокируя event loop.
+
+    Args:
+        func (Callable): Синхронная функция.
+        *args: Аргументы функции.
+
+    Returns:
+        Результат func.
+    """
+    return await asyncio.get_running_loop().run_in_executor(_get_export_executor(), func, *args)
+
+
+def shutdown_export_pool() -> None:
+    """Дожидается текущих выгрузок и останавливает пул потоков экспорта."""
+    global _export_executor
+    if _export_executor is not None:
+        _export_executor.shutdown(wait=True)
+        _export_executor = None
+
+
+@dataclass
+class ExportPart:
+    """
+    Один файл выгрузки.
+
+    Attributes:
+        file (Optional[SpooledTemporaryFile]): Файл (позиция — в начале); None у частей из кэша.
+        filename (str): Имя файла для отправки.
+        row_count (int): Число строк в файле.
+        size (int): Размер файла в байтах.
+        file_id (Optional[str]): file_id документа в Telegram после отправки.
+    """
+    file: Optional[SpooledTemporaryFile]
+    filename: str
+    row_count: int = 0
+    size: int = 0
+    file_id: Optional[str] = None
+
+
+@dataclass
+class QueryExport:
+    """
+    Результат выгрузки запроса.
+
+    Attributes:
+        columns (List[str]): Имена колонок.
+        row_count (int): Число строк.
+        rows (Optional[List[tuple]]): Все строки, если результат маленький (для ответа текстом).
+        parts (List[ExportPart]): Файлы выгрузки; больше одного, если результат
+            не уместился в EXPORT_PART_MAX_BYTES.
+        error (Optional[str]): Текст ошибки, если запрос не выполнен.
+        truncated (bool): Результат обрезан по пределу строк.
+        estimated_rows (Optional[int]): Оценка числа строк планировщиком (EXPLAIN).
+    """
+    columns: List[str] = field(default_factory=list)
+    row_count: int = 0
+    rows: Optional[List[tuple]] = None
+    parts: List[ExportPart] = field(default_factory=list)
+    error: Optional[str] = None
+    truncated: bool = False
+    estimated_rows: Optional[int] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return self.error is None and self.row_count == 0
+
+    def close(self) -> None:
+        """Закрывает (и удаляет) временные файлы выгрузки."""
+        for part in self.parts:
+            if part.file is not None:
+                part.file.close()
+                part.file = None
+
+
+EXPORTERS: Dict[str, type] = {}
+
+
+def register_exporter(cls: type) -> type:
+    """
+    Регистрирует класс-экспортёр под ключом cls.format.
+    Класс создаётся как cls(columns, fileobj) и реализует write_columns(columns), size() и finish().
+    """
+    EXPORTERS[cls.format] = cls
+    return cls
+
+
+def get_exporter(fmt: str) -> type:
+    """
+    Возвращает класс-экспортёр формата.
+
+    Raises:
+        ValueError: Формат не зарегистрирован (например, Parquet без pyarrow).
+    """
+    try:
+        return EXPORTERS[fmt]
+    except KeyError:
+        raise ValueError(f"Формат выгрузки «{fmt}» недоступен") from None
+
+
+@register_exporter
+class XlsxChunkWriter:
+    """
+    Пишет строки в openpyxl write_only-книгу: ячейки по центру с переносом,
+    значения обрезаются до EXCEL_CELL_MAX_LENGTH символов.
+
+    Книга сжимается только при finish(), поэтому size() — оценка сверху:
+    суммарная длина значений в UTF-8 плюс несколько байт на ячейку.
+
+    Оформление задано двумя именованными стилями книги, ячейке назначается
+    только имя стиля — без отдельного объекта Alignment на каждую ячейку.
+    Ширина колонок задаётся до записи данных (этого требует write_only-лист):
+    явно через `widths` либо по заголовку и первой пачке строк.
+    """
+
+    format = "xlsx"
+    extension = "xlsx"
+    label = "Excel"
+    HEADER_STYLE = "export_header"
+    CELL_STYLE = "export_cell"
+
+    def __init__(self, columns: Sequence[str], fileobj, widths: Optional[Sequence[int]] = None) -> None:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, NamedStyle
+
+        self._fileobj = fileobj
+        self._cell_class = WriteOnlyCell
+        self._wb = Workbook(write_only=True)
+        self._wb.add_named_style(NamedStyle(
+            name=self.HEADER_STYLE,
+            alignment=Alignment(horizontal="center", vertical="center"),
+        ))
+        self._wb.add_named_style(NamedStyle(
+            name=self.CELL_STYLE,
+            alignment=Alignment(wrap_text=True, horizontal="center", vertical="center"),
+        ))
+        self._ws = self._wb.create_sheet()
+        self._columns = list(columns)
+        self._header_written = False
+        self._size = 0
+        if widths is not None:
+            self._write_header(widths)
+
+    def _cell(self, value: Any, style: str):
+        cell = self._cell_class(self._ws, value=value)
+        cell.style = style
+        return cell
+
+    def _write_header(self, widths: Sequence[int]) -> None:
+        from openpyxl.utils import get_column_letter
+
+        for col_num, width in enumerate(widths, 1):
+            self._ws.column_dimensions[get_column_letter(col_num)].width = width
+        self._ws.append([self._cell(column, self.HEADER_STYLE) for column in self._columns])
+        self._header_written = True
+
+    def _widths_from_columns(self, columns: Sequence[Sequence[str]]) -> List[int]:
+        values = list(columns) or [() for _ in self._columns]
+        return [
+            min(max([len(str(name))] + [len(value) for value in column]) + 2, EXCEL_CELL_MAX_LENGTH)
+            for name, column in zip(self._columns, values)
+        ]
+
+    def write_columns(self, columns: Sequence[Sequence[Any]]) -> None:
+        """Пишет пачку по колонкам с произвольными значениями (приводятся к str и обрезаются)."""
+        values = [[str(value)[:EXCEL_CELL_MAX_LENGTH] for value in column] for column in columns]
+        if not self._header_written:
+            self._write_header(self._widths_from_columns(values))
+        self.write_prepared_rows(zip(*values))
+
+    def write_prepared_rows(self, rows: Iterable[Sequence[str]]) -> None:
+        """Пишет строки, уже приведённые к str и обрезанные до EXCEL_CELL_MAX_LENGTH."""
+        if not self._header_written:
+            self._write_header(self._widths_from_columns([]))
+        cell, style, append = self._cell, self.CELL_STYLE, self._ws.append
+        size = 0
+        for row in rows:
+            append([cell(value, style) for value in row])
+            size += sum(len(value.encode("utf-8")) for value in row) + XLSX_CELL_OVERHEAD * len(row)
+        self._size += size
+
+    def size(self) -> int:
+        return self._size
+
+    def finish(self) -> None:
+        if not self._header_written:
+            self._write_header(self._widths_from_columns([]))
+        self._wb.save(self._fileobj)
+
+
+@register_exporter
+class CsvChunkWriter:
+    """
+    Пишет строки в CSV (UTF-8 с BOM, чтобы Excel правильно открыл кириллицу).
+    Значения не обрезаются, NULL выгружается пустой строкой.
+    Каждая пачка форматируется в памяти и дописывается в файл байтами.
+    """
+
+    format = "csv"
+    extension = "csv"
+    label = "CSV"
+
+    def __init__(self, columns: Sequence[str], fileobj) -> None:
+        self._fileobj = fileobj
+        self._out = self._open(fileobj)
+        self._out.write(codecs.BOM_UTF8)
+        self._write([columns])
+
+    def _open(self, fileobj):
+        return fileobj
+
+    def _write(self, rows) -> None:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        self._out.write(buffer.getvalue().encode("utf-8"))
+
+    def write_columns(self, columns: Sequence[Sequence[Any]]) -> None:
+        self._write(["" if value is None else value for value in row] for row in zip(*columns))
+
+    def size(self) -> int:
+        return self._fileobj.tell()
+
+    def finish(self) -> None:
+        pass
+
+
+@register_exporter
+class GzipCsvChunkWriter(CsvChunkWriter):
+    """
+    CSV, сжатый gzip на лету. size() считает уже сжатые байты; в буфере
+    компрессора может оставаться несколько десятков КБ до finish().
+    """
+
+    format = "csv.gz"
+    extension = "csv.gz"
+    label = "CSV.gz"
+
+    def _open(self, fileobj):
+        return gzip.GzipFile(fileobj=fileobj, mode="wb")
+
+    def finish(self) -> None:
+        self._out.close()
+
+
+if HAS_PYARROW:
+    @register_exporter
+    class ParquetChunkWriter:
+        """
+        Пишет строки в Parquet: каждая пачка — отдельная row group.
+        Типы колонок определяются по первой пачке; колонки, которые pyarrow
+        не смог типизировать (или в первой пачке только NULL), пишутся строками.
+        """
+
+        format = "parquet"
+        extension = "parquet"
+        label = "Parquet"
+
+        def __init__(self, columns: Sequence[str], fileobj) -> None:
+            import pyarrow
+            import pyarrow.parquet
+
+            self._pa = pyarrow
+            self._pq = pyarrow.parquet
+            self._fileobj = fileobj
+            self._columns = list(columns)
+            self._writer = None
+            self._schema = None
+            self._as_text: List[bool] = []
+
+        def _column_arrays(self, columns: Sequence[Sequence[Any]]) -> list:
+            pa = self._pa
+            values = [list(column) for column in columns] if columns else [[] for _ in self._columns]
+            if self._schema is None:
+                fields = []
+                for name, column in zip(self._columns, values):
+                    try:
+                        array_type = pa.array(column).type
+                    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                        array_type = pa.null()
+                    as_text = pa.types.is_null(array_type)
+                    self._as_text.append(as_text)
+                    fields.append(pa.field(name, pa.string() if as_text else array_type))
+                self._schema = pa.schema(fields)
+            return [
+                pa.array([None if v is None else str(v) for v in column] if as_text else column, type=f.type)
+                for column, as_text, f in zip(values, self._as_text, self._schema)
+            ]
+
+        def write_columns(self, columns: Sequence[Sequence[Any]]) -> None:
+            table = self._pa.Table.from_arrays(self._column_arrays(columns), schema=self._schema)
+            if self._writer is None:
+                self._writer = self._pq.ParquetWriter(self._fileobj, self._schema, compression="zstd")
+            self._writer.write_table(table)
+
+        def size(self) -> int:
+            return self._fileobj.tell()
+
+        def finish(self) -> None:
+            if self._writer is None:
+                self.write_columns([])
+            self._writer.close()
+
+
+def df_to_excel_bytes(df: "pd.DataFrame") -> BytesIO:
+    """
+    Преобразует DataFrame в Excel-файл и возвращает его в виде байтового потока.
+
+    Значения приводятся к строкам и обрезаются до 40 символов один раз для всей
+    колонки средствами pandas, там же считается ширина колонок; запись идёт
+    в write_only-книгу с общим именованным стилем (XlsxChunkWriter).
+
+    Args:
+        df (pd.DataFrame): Табличные данные.
+
+    Returns:
+        BytesIO: Поток с Excel-файлом.
+    """
+    columns = list(df.columns)
+    truncated = {}
+    widths = []
+    for i, column in enumerate(columns):
+        values = df.iloc[:, i].astype(str).str.slice(0, EXCEL_CELL_MAX_LENGTH)
+        max_len = max(len(str(column)), int(values.str.len().max()) if len(values) else 0)
+        widths.append(min(max_len + 2, EXCEL_CELL_MAX_LENGTH))
+        truncated[i] = values.to_numpy()
+
+    output = BytesIO()
+    writer = XlsxChunkWriter(columns, output, widths=widths)
+    writer.write_prepared_rows(zip(*truncated.values()))
+    writer.finish()
+    output.seek(0)
+    return output
+
+
+def format_rows_as_text(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    """
+    Форматирует небольшой результат запроса как выровненную текстовую таблицу.
+
+    Args:
+        columns (Sequence[str]): Имена колонок.
+        rows (Sequence[Sequence[Any]]): Строки.
+
+    Returns:
+        str: Таблица для вывода в <pre>.
+    """
+    table = [list(map(str, columns))] + [[str(value) for value in row] for row in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(columns))]
+    return "\n".join(
+        " ".join(value.rjust(width) for value, width in zip(row, widths))
+        for row in table
+    )
+
+
+async def export_query(
+    conn: asyncpg.Connection,
+    query: str,
+    fmt: str = "xlsx",
+    filename: str = "result",
+    max_rows: Optional[int] = None,
+    progress: Optional[Callable[[int], Awaitable[None]]] = None
+) -> QueryExport:
+    """
+    Выполняет SELECT в read-only транзакции и потоково выгружает результат в файл.
+    Маленький результат (до PREVIEW_MAX_ROWS строк и PREVIEW_MAX_COLUMNS колонок)
+    возвращается строками без файла — для ответа текстом.
+    Пачки пишутся в файл в пуле потоков экспорта (run_in_export_pool); когда файл
+    достигает EXPORT_PART_MAX_BYTES, следующие строки идут в новую часть.
+
+    Args:
+        conn (asyncpg.Connection): Соединение (таймауты уже настроены вызывающим кодом).
+        query (str): SQL-запрос (SELECT).
+        fmt (str): Ключ экспортёра из EXPORTERS ("xlsx", "csv", "csv.gz", "parquet").
+        filename (str): Имя файла без расширения.
+        max_rows (Optional[int]): Предел числа строк; остальные не читаются, выставляется truncated.
+        progress (Optional[Callable]): Вызывается с числом записанных строк, когда начинается
+            сборка файла и после каждой пачки.
+
+    Returns:
+        QueryExport: Результат выгрузки.
+
+    Raises:
+        asyncpg.PostgresError: Ошибка выполнения запроса (в т.ч. statement_timeout).
+        ValueError: Формат не зарегистрирован.
+    """
+    writer_cls = get_exporter(fmt)
+    result = QueryExport()
+
+    def next_chunk_size() -> int:
+        if max_rows is None:
+            return EXPORT_CHUNK_SIZE
+        # +1 строка, чтобы отличить «ровно max_rows» от «больше»
+        return min(EXPORT_CHUNK_SIZE, max_rows - result.row_count + 1)
+
+    async with conn.transaction(readonly=True):
+        cursor = await conn.cursor(query)
+        records = await cursor.fetch(next_chunk_size())
+        if not records:
+            return result
+
+        result.columns = list(records[0].keys())
+        if len(records) <= PREVIEW_MAX_ROWS and len(result.columns) <= PREVIEW_MAX_COLUMNS:
+            result.rows = [tuple(r) for r in records]
+            result.row_count = len(records)
+            return result
+
+        def open_part():
+            part = ExportPart(
+                file=SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE, mode="w+b"),
+                filename=f"{filename}.{writer_cls.extension}",
+            )
+            result.parts.append(part)
+            return part, writer_cls(result.columns, part.file)
+
+        async def close_part(part: ExportPart, writer) -> None:
+            await run_in_export_pool(writer.finish)
+            part.size = part.file.tell()
+            part.file.seek(0)
+
+        try:
+            part, writer = open_part()
+            if progress is not None:
+                await progress(0)
+
+            while records:
+                if max_rows is not None and result.row_count + len(records) > max_rows:
+                    records = records[:max_rows - result.row_count]
+                    result.truncated = True
+                count = len(records)
+                columns = list(zip(*records))
+                records = None
+                await run_in_export_pool(writer.write_columns, columns)
+                part.row_count += count
+                result.row_count += count
+                if progress is not None:
+                    await progress(result.row_count)
+                if result.truncated:
+                    break
+                records = await cursor.fetch(next_chunk_size())
+                if records and writer.size() >= EXPORT_PART_MAX_BYTES:
+                    await close_part(part, writer)
+                    part, writer = open_part()
+
+            await close_part(part, writer)
+            if len(result.parts) > 1:
+                total = len(result.parts)
+                for number, part in enumerate(result.parts, 1):
+                    part.filename = f"{filename}_{number}of{total}.{writer_cls.extension}"
+        except BaseException:
+            result.close()
+            raise
+        return result
@@ -1,13 +1,34 @@
 import logging
 from typing import Optional, List, Tuple
 from db.connection import get_db_connection
+from db.statements import statements
 
 
 """
 Модуль для работы с таблицей обратной связи `feedback` в базе данных PostgreSQL.
 Позволяет добавлять, извлекать, помечать прочитанными отзывы, а также загружать вложения.
+Запросы объявлены в реестре db.statements.
 """
 
+ADD_FEEDBACK = statements.register("feedback.add", """
+    INSERT INTO feedback (user_id, theme, message, is_read, attachment, attachment_type)
+    VALUES ($1, $2, $3, $4, $5, $6)
+""")
+UNREAD_FEEDBACK = statements.register("feedback.unread", """
+    SELECT id, user_id, theme, message, attachment, attachment_type, created_at
+    FROM feedback
+    WHERE is_read = false
+    ORDER BY created_at DESC
+    LIMIT $1 OFFSET $2
+""")
+MARK_FEEDBACK_READ = statements.register("feedback.mark_read", "UPDATE feedback SET is_read = true WHERE id = $1")
+FEEDBACK_BY_ID = statements.register("feedback.by_id", """
+    SELECT id, user_id, theme, message, attachment, attachment_type, created_at
+    FROM feedback
+    WHERE id = $1
+    LIMIT 1
+""")
+
 
 async def add_feedback(
     user_id: int,
@@ -31,13 +52,9 @@ async def add_feedback(
     """
     message = message[:5000]  # Безопасный лимит по длине текста
 
-    query = """
-        INSERT INTO feedback (user_id, theme, message, is_read, attachment, attachment_type)
-        VALUES ($1, $2, $3, $4, $5, $6)
-    """
     try:
         async with get_db_connection() as conn:
-            await conn.execute(query, user_id, theme, message, False, attachment, attachment_type)
+            await ADD_FEEDBACK.execute(conn, user_id, theme, message, False, attachment, attachment_type)
         logging.debug(f"[DB] Обратная связь от {user_id} успешно добавлена.")
     except Exception as e:
         logging.error(f"Ошибка при добавлении обратной связи от {user_id}: {e}")
@@ -55,16 +72,9 @@ async def fetch_unread_feedback(limit: int = 5, offset: int = 0) -> List[Tuple]:
     Returns:
         List[Tuple]: Список отзывов как кортежей.
     """
-    query = """
-        SELECT id, user_id, theme, message, attachment, attachment_type, created_at
-        FROM feedback
-        WHERE is_read = false
-        ORDER BY created_at DESC
-        LIMIT $1 OFFSET $2
-    """
     try:
         async with get_db_connection() as conn:
-            records = await conn.fetch(query, limit, offset)
+            records = await UNREAD_FEEDBACK.fetch(conn, limit, offset)
             return [tuple(r) for r in records]
     except Exception as e:
         logging.error(f"Ошибка при извлечении непрочитанных отзывов: {e}")
@@ -78,10 +88,9 @@ async def mark_feedback_as_read(feedback_id: int) -> None:
     Args:
         feedback_id (int): Идентификатор записи обратной связи.
     """
-    query = "UPDATE feedback SET is_read = true WHERE id = $1"
     try:
         async with get_db_connection() as conn:
-            await conn.execute(query, feedback_id)
+            await MARK_FEEDBACK_READ.execute(conn, feedback_id)
     except Exception as e:
         logging.error(f"Ошибка при обновлении статуса отзыва {feedback_id}: {e}")
 
@@ -96,15 +105,9 @@ async def fetch_feedback_by_id(feedback_id: int) -> Optional[Tuple]:
     Returns:
         Optional[Tuple]: Кортеж с данными отзыва или None.
     """
-    query = """
-        SELECT id, user_id, theme, message, attachment, attachment_type, created_at
-        FROM feedback
-        WHERE id = $1
-        LIMIT 1
-    """
     try:
         async with get_db_connection() as conn:
-            record = await conn.fetchrow(query, feedback_id)
+            record = await FEEDBACK_BY_ID.fetchrow(conn, feedback_id)
             return tuple(record) if record else None
     except Exception as e:
         logging.error(f"Ошибка при получении отзыва с ID={feedback_id}: {e}")
@@ -1,8 +1,14 @@
 import logging
 import json
 import asyncio
+import hashlib
 from pathlib import Path
+from typing import Awaitable, Callable
+
+import asyncpg
+
 from db.connection import init_db_pool, close_db_pool, get_db_connection
+from db.migrations import apply_migrations
 
 logging.basicConfig(level=logging.INFO)
 
@@ -65,6 +71,30 @@ async def create_tables() -> None:
             time_answer TIMESTAMP,
             point TEXT
         );
+        """,
+        # Уведомление об изменении роли: payload {"user_id", "old_role", "new_role"}
+        """
+        CREATE OR REPLACE FUNCTION notify_user_role_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM pg_notify('user_role_changed', json_build_object(
+                    'user_id', NEW.user_id, 'old_role', NULL, 'new_role', NEW.role)::text);
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('user_role_changed', json_build_object(
+                    'user_id', OLD.user_id, 'old_role', OLD.role, 'new_role', NULL)::text);
+            ELSIF NEW.role IS DISTINCT FROM OLD.role THEN
+                PERFORM pg_notify('user_role_changed', json_build_object(
+                    'user_id', NEW.user_id, 'old_role', OLD.role, 'new_role', NEW.role)::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+        """
+        DROP TRIGGER IF EXISTS trg_user_role_change ON User_Contacts_VBA;
+        CREATE TRIGGER trg_user_role_change
+            AFTER INSERT OR UPDATE OF role OR DELETE ON User_Contacts_VBA
+            FOR EACH ROW EXECUTE FUNCTION notify_user_role_change();
         """
     ]
     async with get_db_connection() as conn:
@@ -72,96 +102,168 @@ async def create_tables() -> None:
             await conn.execute(sql)
 
 
-async def load_initial_macros(path: Path) -> None:
+async def load_initial_macros(conn: asyncpg.Connection, data: dict) -> int:
     """
-    Загружает макросы из JSON в таблицу vba_unit.
+    Загружает макросы из сида в таблицу vba_unit (существующие не меняются).
 
     Args:
-        path (Path): Путь до JSON-файла с макросами.
+        conn (asyncpg.Connection): Соединение внутри транзакции загрузки сида.
+        data (dict): Содержимое macros.json.
+
+    Returns:
+        int: Число макросов в сиде.
     """
-    logging.info(f"Загружаем макросы из {path}...")
-    data = json.loads(path.read_text(encoding="utf-8"))
     macros = data.get("macros", [])
-    async with get_db_connection() as conn:
-        for macro in macros:
-            sql = """
-            INSERT INTO vba_unit (vba_name, vba_code)
-            VALUES ($1, $2)
-            ON CONFLICT (vba_name) DO NOTHING
-            """
-            await conn.execute(sql, macro["vba_name"], macro["vba_code"])
-    logging.info(f"✅ Загружено макросов: {len(macros)}")
+    await conn.execute("CREATE TEMP TABLE seed_vba_unit (vba_name TEXT, vba_code TEXT) ON COMMIT DROP")
+    await conn.copy_records_to_table(
+        "seed_vba_unit",
+        records=[(m["vba_name"], m["vba_code"]) for m in macros],
+        columns=["vba_name", "vba_code"],
+    )
+    await conn.execute(
+        """
+        INSERT INTO vba_unit (vba_name, vba_code)
+        SELECT vba_name, vba_code FROM seed_vba_unit
+        ON CONFLICT (vba_name) DO NOTHING
+        """
+    )
+    return len(macros)
 
 
-async def load_initial_formules(path: Path) -> None:
+async def load_initial_formules(conn: asyncpg.Connection, data: dict) -> int:
     """
-    Загружает формулы из JSON в таблицу vba_formule.
+    Загружает формулы из сида в таблицу vba_formule (существующие не меняются).
 
     Args:
-        path (Path): Путь до JSON-файла с формулами.
+        conn (asyncpg.Connection): Соединение внутри транзакции загрузки сида.
+        data (dict): Содержимое formules.json.
+
+    Returns:
+        int: Число формул в сиде.
     """
-    logging.info(f"Загружаем формулы из {path}...")
-    data = json.loads(path.read_text(encoding="utf-8"))
     formules = data.get("formule", [])
-    async with get_db_connection() as conn:
-        for fml in formules:
-            sql = """
-            INSERT INTO vba_formule (vba_formule_name, vba_formule_code, comment_vba_formule)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (vba_formule_name) DO NOTHING
-            """
-            await conn.execute(sql, fml["vba_name"], fml["vba_code"], fml.get("comment", ""))
-    logging.info(f"✅ Загружено формул: {len(formules)}")
+    await conn.execute(
+        "CREATE TEMP TABLE seed_vba_formule (name TEXT, code TEXT, comment TEXT) ON COMMIT DROP"
+    )
+    await conn.copy_records_to_table(
+        "seed_vba_formule",
+        records=[(f["vba_name"], f["vba_code"], f.get("comment", "")) for f in formules],
+        columns=["name", "code", "comment"],
+    )
+    await conn.execute(
+        """
+        INSERT INTO vba_formule (vba_formule_name, vba_formule_code, comment_vba_formule)
+        SELECT name, code, comment FROM seed_vba_formule
+        ON CONFLICT (vba_formule_name) DO NOTHING
+        """
+    )
+    return len(formules)
 
 
-async def load_initial_admins(path: Path) -> None:
+async def load_initial_admins(conn: asyncpg.Connection, data: dict) -> int:
     """
-    Загружает администраторов из JSON в таблицу User_Contacts_VBA.
+    Загружает администраторов из сида в таблицу User_Contacts_VBA
+    (имя, комментарий и роль существующих записей обновляются).
 
     Args:
-        path (Path): Путь до JSON-файла с данными администраторов.
+        conn (asyncpg.Connection): Соединение внутри транзакции загрузки сида.
+        data (dict): Содержимое admin_users.json.
+
+    Returns:
+        int: Число администраторов в сиде.
     """
-    logging.info(f"Загружаем администраторов из {path}...")
-    data = json.loads(path.read_text(encoding="utf-8"))
     admins = data.get("admins", [])
-    async with get_db_connection() as conn:
-        for admin in admins:
-            sql = """
-            INSERT INTO User_Contacts_VBA (user_id, username, phone_number, timestamp, comment, role)
-            VALUES ($1, $2, $3, CURRENT_TIMESTAMP AT TIME ZONE 'Europe/Moscow', $4, $5)
-            ON CONFLICT (user_id) DO UPDATE
-            SET username = EXCLUDED.username,
-                phone_number = COALESCE(EXCLUDED.phone_number, User_Contacts_VBA.phone_number),
-                comment = EXCLUDED.comment,
-                role = EXCLUDED.role
-            """
-            await conn.execute(
-                sql,
+    await conn.execute(
+        """
+        CREATE TEMP TABLE seed_admins (
+            ord INT, user_id BIGINT, username TEXT, phone_number TEXT, comment TEXT, role TEXT
+        ) ON COMMIT DROP
+        """
+    )
+    await conn.copy_records_to_table(
+        "seed_admins",
+        records=[
+            (
+                i,
                 admin["user_id"],
                 admin.get("username"),
                 admin.get("phone_number"),
                 admin.get("comment", ""),
                 admin.get("role", "admin"),
             )
-    logging.info(f"✅ Загружено администраторов: {len(admins)}")
+            for i, admin in enumerate(admins)
+        ],
+        columns=["ord", "user_id", "username", "phone_number", "comment", "role"],
+    )
+    # При повторе user_id в сиде побеждает последняя запись, как при построчной вставке
+    await conn.execute(
+        """
+        INSERT INTO User_Contacts_VBA (user_id, username, phone_number, timestamp, comment, role)
+        SELECT DISTINCT ON (user_id)
+               user_id, username, phone_number,
+               CURRENT_TIMESTAMP AT TIME ZONE 'Europe/Moscow', comment, role
+        FROM seed_admins
+        ORDER BY user_id, ord DESC
+        ON CONFLICT (user_id) DO UPDATE
+        SET username = EXCLUDED.username,
+            phone_number = COALESCE(EXCLUDED.phone_number, User_Contacts_VBA.phone_number),
+            comment = EXCLUDED.comment,
+            role = EXCLUDED.role
+        """
+    )
+    return len(admins)
+
+
+SeedLoader = Callable[[asyncpg.Connection, dict], Awaitable[int]]
+
+# Имя сида (ключ в seed_checksum) -> (файл в db/seeds, загрузчик)
+SEEDS: dict[str, tuple[str, SeedLoader]] = {
+    "macros": ("macros.json", load_initial_macros),
+    "formules": ("formules.json", load_initial_formules),
+    "admins": ("admin_users.json", load_initial_admins),
+}
 
 
 async def populate_initial_data() -> None:
     """
-    Запускает загрузку всех начальных данных из директории seeds.
+    Загружает начальные данные из директории seeds.
+
+    Хэш каждого файла (SHA-256) сравнивается с сохранённым в seed_checksum:
+    неизменившиеся сиды пропускаются без обращений к их таблицам. Изменившийся
+    сид применяется одной транзакцией — COPY во временную таблицу и один
+    INSERT … ON CONFLICT — вместе с записью нового хэша.
     """
     seeds_dir = Path(__file__).parent / "seeds"
-    await load_initial_macros(seeds_dir / "macros.json")
-    await load_initial_formules(seeds_dir / "formules.json")
-    await load_initial_admins(seeds_dir / "admin_users.json")
+    async with get_db_connection() as conn:
+        applied = {r["name"]: r["checksum"] for r in await conn.fetch("SELECT name, checksum FROM seed_checksum")}
+        for name, (filename, loader) in SEEDS.items():
+            raw = (seeds_dir / filename).read_bytes()
+            checksum = hashlib.sha256(raw).hexdigest()
+            if applied.get(name) == checksum:
+                logging.info(f"Сид {filename} не изменился, пропускаем")
+                continue
+
+            logging.info(f"Загружаем {filename}...")
+            async with conn.transaction():
+                count = await loader(conn, json.loads(raw.decode("utf-8")))
+                await conn.execute(
+                    """
+                    INSERT INTO seed_checksum (name, checksum, row_count) VALUES ($1, $2, $3)
+                    ON CONFLICT (name) DO UPDATE
+                    SET checksum = EXCLUDED.checksum, row_count = EXCLUDED.row_count, applied_at = now()
+                    """,
+                    name, checksum, count,
+                )
+            logging.info(f"✅ {filename}: загружено записей: {count}")
 
 
 async def main() -> None:
     """
-    Основная точка входа: инициализация пула, создание таблиц и наполнение данными.
+    Основная точка входа: инициализация пула, создание таблиц, миграции и наполнение данными.
     """
     await init_db_pool()
     await create_tables()
+    await apply_migrations()
     await populate_initial_data()
     await close_db_pool()
 
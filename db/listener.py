@@ -0,0 +1,113 @@
+"""
+listener.py
+
+Выделенное соединение asyncpg для PostgreSQL LISTEN/NOTIFY.
+
+Соединения из пула для LISTEN не подходят: при возврате в пул подписки
+сбрасываются. Поэтому здесь держится одно отдельное соединение, на которое
+подписываются все каналы, зарегистрированные через `add_notify_handler`.
+Если соединение обрывается, оно переподключается, а каждый обработчик
+получает `None` вместо payload — признак того, что уведомления могли быть
+пропущены и кэш нужно сбросить целиком.
+"""
+
+import asyncio
+import logging
+from typing import Callable, Optional
+
+import asyncpg
+
+from db.connection import get_connect_settings
+
+__all__ = ("add_notify_handler", "start_notify_listener", "stop_notify_listener", "is_listening")
+
+RECONNECT_DELAY_SECONDS = 5
+
+NotifyHandler = Callable[[Optional[str]], None]
+
+_handlers: dict[str, list[NotifyHandler]] = {}
+_conn: asyncpg.Connection | None = None
+_watchdog: asyncio.Task | None = None
+
+
+def add_notify_handler(channel: str, handler: NotifyHandler) -> None:
+    """
+    Регистрирует обработчик уведомлений канала.
+    Обработчики, добавленные после запуска, начнут работать после переподключения,
+    поэтому регистрировать их нужно до `start_notify_listener`.
+
+    Args:
+        channel (str): Имя канала NOTIFY.
+        handler (Callable[[str | None], None]): Синхронный обработчик payload.
+    """
+    _handlers.setdefault(channel, []).append(handler)
+
+
+def is_listening() -> bool:
+    """
+    Проверяет, открыто ли LISTEN-соединение (уведомления доставляются).
+
+    Returns:
+        bool: True, если соединение активно.
+    """
+    return _conn is not None and not _conn.is_closed()
+
+
+def _dispatch(channel: str, payload: Optional[str]) -> None:
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(payload)
+        except Exception as e:
+            logging.error(f"[NOTIFY] Ошибка обработчика канала {channel}: {e}")
+
+
+def _on_notify(connection, pid: int, channel: str, payload: str) -> None:
+    _dispatch(channel, payload)
+
+
+async def _connect() -> None:
+    global _conn
+    _conn = await asyncpg.connect(**get_connect_settings())
+    for channel in _handlers:
+        await _conn.add_listener(channel, _on_notify)
+    logging.info(f"[NOTIFY] Подписка на каналы: {', '.join(_handlers) or '—'}")
+
+
+async def _watch() -> None:
+    while True:
+        await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+        if is_listening():
+            continue
+        try:
+            await _connect()
+        except Exception as e:
+            logging.warning(f"[NOTIFY] Не удалось переподключиться: {e}")
+            continue
+        for channel in _handlers:
+            _dispatch(channel, None)
+
+
+async def start_notify_listener() -> None:
+    """
+    Открывает соединение для LISTEN и запускает сторожевую задачу переподключения.
+    Ошибка подключения не фатальна: сторож будет пытаться подключиться в фоне.
+    """
+    global _watchdog
+    if _watchdog is not None:
+        return
+    try:
+        await _connect()
+    except Exception as e:
+        logging.warning(f"[NOTIFY] LISTEN-соединение недоступно, повторим позже: {e}")
+    _watchdog = asyncio.create_task(_watch())
+
+
+async def stop_notify_listener() -> None:
+    """Останавливает сторожевую задачу и закрывает соединение LISTEN."""
+    global _conn, _watchdog
+    if _watchdog is not None:
+        _watchdog.cancel()
+        _watchdog = None
+    if _conn is not None and not _conn.is_closed():
+        await _conn.close()
+    _conn = None
@@ -1,14 +1,59 @@
 import logging
 from typing import Optional, List
 from db.connection import get_db_connection
+from db.statements import statements
 import pytz
 from datetime import datetime
 
 """
 Модуль для работы с логами взаимодействия пользователя и бота.
 Использует таблицу dialog_log для хранения и анализа данных.
+Запросы объявлены в реестре db.statements.
 """
 
+BOT_MESSAGES = statements.register("logs.bot_messages", """
+    SELECT id_answer FROM dialog_log
+    WHERE user_id = $1 AND id_answer IS NOT NULL
+""")
+DELETE_BOT_MESSAGES = statements.register("logs.delete_bot_messages", """
+    DELETE FROM dialog_log
+    WHERE user_id = $1 AND id_answer IS NOT NULL
+""")
+CREATE_PURGE_JOB = statements.register(
+    "logs.create_purge_job",
+    "INSERT INTO message_purge (user_id) VALUES ($1) ON CONFLICT (user_id) DO NOTHING",
+)
+PENDING_PURGE_JOBS = statements.register(
+    "logs.pending_purge_jobs", "SELECT user_id FROM message_purge ORDER BY started_at"
+)
+PURGE_CHUNK = statements.register("logs.purge_chunk", """
+    SELECT DISTINCT id_answer FROM dialog_log
+    WHERE user_id = $1 AND id_answer IS NOT NULL
+    ORDER BY id_answer
+    LIMIT $2
+""")
+DELETE_PURGED_MESSAGES = statements.register(
+    "logs.delete_purged_messages",
+    "DELETE FROM dialog_log WHERE user_id = $1 AND id_answer = ANY($2::int[])",
+)
+ADVANCE_PURGE_JOB = statements.register(
+    "logs.advance_purge_job",
+    "UPDATE message_purge SET deleted_count = deleted_count + $2 WHERE user_id = $1",
+)
+FINISH_PURGE_JOB = statements.register("logs.finish_purge_job", "DELETE FROM message_purge WHERE user_id = $1")
+AVG_RESPONSE_TIME = statements.register("logs.avg_response_time", """
+    SELECT AVG(EXTRACT(EPOCH FROM (time_answer - time_question)))
+    FROM dialog_log
+    WHERE time_answer IS NOT NULL AND time_question IS NOT NULL
+""")
+AVG_RESPONSE_TIME_SINCE = statements.register("logs.avg_response_time_since", """
+    SELECT AVG(EXTRACT(EPOCH FROM (time_answer - time_question)))
+    FROM dialog_log
+    WHERE time_answer IS NOT NULL
+      AND time_question IS NOT NULL
+      AND time_answer > $1
+""")
+
 # Устанавливаем московский часовой пояс
 MSK = pytz.timezone('Europe/Moscow')
 UTC = pytz.utc  # Временная зона UTC
@@ -24,13 +69,9 @@ async def get_bot_messages_for_user(user_id: int) -> List[int]:
     Returns:
         List[int]: Список ID сообщений от бота (id_answer).
     """
-    query = """
-        SELECT id_answer FROM dialog_log
-        WHERE user_id = $1 AND id_answer IS NOT NULL
-    """
     try:
         async with get_db_connection() as conn:
-            records = await conn.fetch(query, user_id)
+            records = await BOT_MESSAGES.fetch(conn, user_id)
             return [r['id_answer'] for r in records]
     except Exception as e:
         logging.error(f"Ошибка при получении сообщений бота для user_id={user_id}: {e}")
@@ -44,18 +85,91 @@ async def delete_bot_messages_for_user(user_id: int) -> None:
     Args:
         user_id (int): Telegram ID пользователя.
     """
-    query = """
-        DELETE FROM dialog_log
-        WHERE user_id = $1 AND id_answer IS NOT NULL
-    """
     try:
         async with get_db_connection() as conn:
-            await conn.execute(query, user_id)
+            await DELETE_BOT_MESSAGES.execute(conn, user_id)
         logging.debug(f"Удалены сообщения бота для пользователя {user_id}")
     except Exception as e:
         logging.error(f"Ошибка при удалении сообщений бота для user_id={user_id}: {e}")
 
 
+async def create_purge_job(user_id: int) -> None:
+    """
+    Регистрирует задание на удаление сообщений бота у пользователя (если его ещё нет).
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+    """
+    try:
+        async with get_db_connection() as conn:
+            await CREATE_PURGE_JOB.execute(conn, user_id)
+    except Exception as e:
+        logging.error(f"Ошибка при создании задания очистки для user_id={user_id}: {e}")
+
+
+async def get_pending_purge_jobs() -> List[int]:
+    """
+    Возвращает пользователей с незавершённой очисткой сообщений.
+
+    Returns:
+        List[int]: Telegram ID пользователей.
+    """
+    try:
+        async with get_db_connection() as conn:
+            records = await PENDING_PURGE_JOBS.fetch(conn)
+            return [r['user_id'] for r in records]
+    except Exception as e:
+        logging.error(f"Ошибка при получении заданий очистки: {e}")
+        return []
+
+
+async def fetch_purge_chunk(user_id: int, limit: int) -> List[int]:
+    """
+    Возвращает очередную пачку id сообщений бота для удаления.
+    В отличие от get_bot_messages_for_user, ошибки БД пробрасываются,
+    чтобы задание не считалось выполненным при сбое.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        limit (int): Размер пачки.
+
+    Returns:
+        List[int]: ID сообщений (id_answer).
+    """
+    async with get_db_connection() as conn:
+        records = await PURGE_CHUNK.fetch(conn, user_id, limit)
+        return [r['id_answer'] for r in records]
+
+
+async def complete_purge_chunk(user_id: int, message_ids: List[int]) -> None:
+    """
+    Фиксирует прогресс очистки: удаляет строки dialog_log с уже удалёнными
+    сообщениями и увеличивает счётчик задания — в одной транзакции.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+        message_ids (List[int]): ID удалённых сообщений.
+    """
+    async with get_db_connection() as conn:
+        async with conn.transaction():
+            await DELETE_PURGED_MESSAGES.execute(conn, user_id, message_ids)
+            await ADVANCE_PURGE_JOB.execute(conn, user_id, len(message_ids))
+
+
+async def finish_purge_job(user_id: int) -> None:
+    """
+    Удаляет завершённое задание очистки.
+
+    Args:
+        user_id (int): Telegram ID пользователя.
+    """
+    try:
+        async with get_db_connection() as conn:
+            await FINISH_PURGE_JOB.execute(conn, user_id)
+    except Exception as e:
+        logging.error(f"Ошибка при завершении задания очистки для user_id={user_id}: {e}")
+
+
 async def get_average_response_time(since: Optional[str] = None) -> Optional[float]:
     """
     Вычисляет среднее время ответа бота на сообщения пользователей.
@@ -94,25 +208,13 @@ async def get_average_response_time(since: Optional[str] = None) -> Optional[flo
         since_dt = since_dt.replace(tzinfo=None)
         logging.info(f"Дата 'since_dt' в МСК (naive): {since_dt}")
 
-        query = """
-            SELECT AVG(EXTRACT(EPOCH FROM (time_answer - time_question)))
-            FROM dialog_log
-            WHERE time_answer IS NOT NULL
-              AND time_question IS NOT NULL
-              AND time_answer > $1
-        """
-        params = (since_dt,)
+        statement, params = AVG_RESPONSE_TIME_SINCE, (since_dt,)
     else:
-        query = """
-            SELECT AVG(EXTRACT(EPOCH FROM (time_answer - time_question)))
-            FROM dialog_log
-            WHERE time_answer IS NOT NULL AND time_question IS NOT NULL
-        """
-        params = ()
+        statement, params = AVG_RESPONSE_TIME, ()
 
     try:
         async with get_db_connection() as conn:
-            result = await conn.fetchrow(query, *params)
+            result = await statement.fetchrow(conn, *params)
             logging.info(f"Результат запроса: {result}")
             return result[0] if result and result[0] is not None else None
     except Exception as e:
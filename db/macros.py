@@ -1,12 +1,38 @@
 import logging
 from typing import Optional, List, Tuple
 from db.connection import get_db_connection
+from db.statements import statements
 
 """
 Модуль для работы с макросами Excel, хранимыми в таблицах vba_unit и vba_formule.
 Позволяет загружать макросы по имени и получать списки доступных макросов и формул.
+Запросы объявлены в реестре db.statements.
+
+Изменения vba_unit и vba_formule триггеры trg_vba_catalog_* объявляют
+через NOTIFY на канал CATALOG_CHANNEL (см. macro.catalog).
 """
 
+CATALOG_CHANNEL = "vba_catalog_changed"
+
+MACRO_BY_NAME = statements.register(
+    "macros.by_name", "SELECT vba_code FROM vba_unit WHERE vba_name = $1 LIMIT 1", hot=True
+)
+ALL_MACROS = statements.register(
+    "macros.all", "SELECT id, vba_name, vba_code FROM vba_unit ORDER BY id ASC", hot=True
+)
+FORMULA_BY_NAME = statements.register(
+    "formulas.by_name",
+    "SELECT id, vba_formule_name, vba_formule_code, comment_vba_formule "
+    "FROM vba_formule WHERE vba_formule_name = $1 LIMIT 1",
+    hot=True,
+)
+ALL_FORMULAS = statements.register(
+    "formulas.all",
+    "SELECT id, vba_formule_name, vba_formule_code, comment_vba_formule "
+    "FROM vba_formule ORDER BY id ASC",
+    hot=True,
+)
+
 
 async def fetch_macro_by_name(vba_name: str) -> Optional[str]:
     """
@@ -18,10 +44,9 @@ async def fetch_macro_by_name(vba_name: str) -> Optional[str]:
     Returns:
         Optional[str]: Текст макроса или None, если не найден.
     """
-    query = "SELECT vba_code FROM vba_unit WHERE vba_name = $1 LIMIT 1"
     try:
         async with get_db_connection() as conn:
-            record = await conn.fetchrow(query, vba_name)
+            record = await MACRO_BY_NAME.fetchrow(conn, vba_name)
             return record['vba_code'] if record else None
     except Exception as e:
         logging.error(f"Ошибка при получении макроса '{vba_name}': {e}")
@@ -35,10 +60,9 @@ async def fetch_all_macros() -> List[Tuple[int, str, str]]:
     Returns:
         List[Tuple[int, str, str]]: Список кортежей (id, vba_name, vba_code).
     """
-    query = "SELECT id, vba_name, vba_code FROM vba_unit ORDER BY id ASC"
     try:
         async with get_db_connection() as conn:
-            records = await conn.fetch(query)
+            records = await ALL_MACROS.fetch(conn)
             return [(r['id'], r['vba_name'], r['vba_code']) for r in records]
     except Exception as e:
         logging.error(f"Ошибка при извлечении всех макросов: {e}")
@@ -55,13 +79,9 @@ async def fetch_formula_by_name(vba_name: str) -> Optional[Tuple[int, str, str,
     Returns:
         Optional[Tuple]: Кортеж (id, имя, код, комментарий), либо None.
     """
-    query = (
-        "SELECT id, vba_formule_name, vba_formule_code, comment_vba_formule "
-        "FROM vba_formule WHERE vba_formule_name = $1 LIMIT 1"
-    )
     try:
         async with get_db_connection() as conn:
-            record = await conn.fetchrow(query, vba_name)
+            record = await FORMULA_BY_NAME.fetchrow(conn, vba_name)
             return (record['id'], record['vba_formule_name'], record['vba_formule_code'], record['comment_vba_formule']) if record else None
     except Exception as e:
         logging.error(f"Ошибка при извлечении формулы '{vba_name}': {e}")
@@ -75,13 +95,9 @@ async def fetch_all_formul_macros() -> List[Tuple[int, str, str, str]]:
     Returns:
         List[Tuple[int, str, str, str]]: Кортежи (id, имя, код, комментарий).
     """
-    query = (
-        "SELECT id, vba_formule_name, vba_formule_code, comment_vba_formule "
-        "FROM vba_formule ORDER BY id ASC"
-    )
     try:
         async with get_db_connection() as conn:
-            records = await conn.fetch(query)
+            records = await ALL_FORMULAS.fetch(conn)
             return [
                 (r['id'], r['vba_formule_name'], r['vba_formule_code'], r['comment_vba_formule'])
                 for r in records
@@ -89,3 +105,24 @@ async def fetch_all_formul_macros() -> List[Tuple[int, str, str, str]]:
     except Exception as e:
         logging.error(f"Ошибка при извлечении всех формул: {e}")
         return []
+
+
+async def fetch_vba_catalog() -> Tuple[List[Tuple[int, str, str]], List[Tuple[int, str, str, str]]]:
+    """
+    Загружает все макросы и формулы одним соединением.
+    В отличие от fetch_all_* ошибки не скрываются: вызывающий решает,
+    оставить ли прежние данные.
+
+    Returns:
+        Tuple[List, List]: Макросы (id, vba_name, vba_code) и формулы (id, имя, код, комментарий).
+    """
+    async with get_db_connection() as conn:
+        macros = await ALL_MACROS.fetch(conn)
+        formulas = await ALL_FORMULAS.fetch(conn)
+    return (
+        [(r['id'], r['vba_name'], r['vba_code']) for r in macros],
+        [
+            (r['id'], r['vba_formule_name'], r['vba_formule_code'], r['comment_vba_formule'])
+            for r in formulas
+        ],
+    )
@@ -0,0 +1 @@
+from db.migrations.runner import apply_migrations
@@ -0,0 +1,63 @@
+"""
+Суррогатный первичный ключ dialog_log.id.
+
+Колонка добавляется без перезаписи таблицы: сначала nullable-колонка с DEFAULT
+из последовательности (действует только для новых строк), затем старые строки
+заполняются пачками, уникальный индекс строится CONCURRENTLY и превращается
+в PRIMARY KEY. NOT NULL выставляется через предварительно проверенный CHECK,
+чтобы ALTER не сканировал таблицу под эксклюзивной блокировкой.
+"""
+
+import asyncpg
+
+from db.migrations.runner import create_index_concurrently
+
+DESCRIPTION = "dialog_log: суррогатный ключ id"
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+async def upgrade(conn: asyncpg.Connection) -> None:
+    await conn.execute(
+        """
+        CREATE SEQUENCE IF NOT EXISTS dialog_log_id_seq;
+        ALTER TABLE dialog_log ADD COLUMN IF NOT EXISTS id BIGINT;
+        ALTER TABLE dialog_log ALTER COLUMN id SET DEFAULT nextval('dialog_log_id_seq');
+        ALTER SEQUENCE dialog_log_id_seq OWNED BY dialog_log.id;
+        """
+    )
+
+    # Заполняем id у старых строк пачками, чтобы не держать долгую блокировку
+    while True:
+        status = await conn.execute(
+            """
+            UPDATE dialog_log SET id = nextval('dialog_log_id_seq')
+            WHERE ctid IN (SELECT ctid FROM dialog_log WHERE id IS NULL LIMIT $1)
+            """,
+            BACKFILL_BATCH_SIZE,
+        )
+        if int(status.split()[-1]) == 0:
+            break
+
+    has_pkey = await conn.fetchval(
+        "SELECT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'dialog_log_pkey')"
+    )
+    if has_pkey:
+        return
+
+    await create_index_concurrently(conn, "dialog_log_pkey", "ON dialog_log (id)", unique=True)
+
+    await conn.execute(
+        """
+        ALTER TABLE dialog_log DROP CONSTRAINT IF EXISTS dialog_log_id_not_null;
+        ALTER TABLE dialog_log ADD CONSTRAINT dialog_log_id_not_null CHECK (id IS NOT NULL) NOT VALID;
+        """
+    )
+    await conn.execute("ALTER TABLE dialog_log VALIDATE CONSTRAINT dialog_log_id_not_null")
+    await conn.execute(
+        """
+        ALTER TABLE dialog_log ALTER COLUMN id SET NOT NULL;
+        ALTER TABLE dialog_log ADD CONSTRAINT dialog_log_pkey PRIMARY KEY USING INDEX dialog_log_pkey;
+        ALTER TABLE dialog_log DROP CONSTRAINT dialog_log_id_not_null;
+        """
+    )
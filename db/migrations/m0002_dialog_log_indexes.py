@@ -0,0 +1,21 @@
+"""
+Индексы горячего пути dialog_log.
+
+- (user_id, time_question DESC): последняя сессия пользователя (get_last_session).
+- (user_id) WHERE id_answer IS NULL: поиск последнего неотвеченного вопроса (insert_answer).
+"""
+
+import asyncpg
+
+from db.migrations.runner import create_index_concurrently
+
+DESCRIPTION = "dialog_log: индексы по user_id"
+
+
+async def upgrade(conn: asyncpg.Connection) -> None:
+    await create_index_concurrently(
+        conn, "idx_dialog_log_user_time", "ON dialog_log (user_id, time_question DESC)"
+    )
+    await create_index_concurrently(
+        conn, "idx_dialog_log_user_unanswered", "ON dialog_log (user_id) WHERE id_answer IS NULL"
+    )
@@ -0,0 +1,15 @@
+"""
+Индекс для выборки непрочитанных отзывов (fetch_unread_feedback).
+"""
+
+import asyncpg
+
+from db.migrations.runner import create_index_concurrently
+
+DESCRIPTION = "feedback: индекс (is_read, created_at)"
+
+
+async def upgrade(conn: asyncpg.Connection) -> None:
+    await create_index_concurrently(
+        conn, "idx_feedback_is_read_created_at", "ON feedback (is_read, created_at)"
+    )
@@ -0,0 +1,15 @@
+"""
+Индекс по роли для выборок пользователей по роли (get_users_by_role, fetch_users_by_role).
+"""
+
+import asyncpg
+
+from db.migrations.runner import create_index_concurrently
+
+DESCRIPTION = "User_Contacts_VBA: индекс по role"
+
+
+async def upgrade(conn: asyncpg.Connection) -> None:
+    await create_index_concurrently(
+        conn, "idx_user_contacts_vba_role", "ON User_Contacts_VBA (role)"
+    )
@@ -0,0 +1,45 @@
+"""
+Колонка User_Contacts_VBA.updated_at для инкрементального опроса изменений ролей
+и таблица bot_state для хранения служебного состояния (водяные знаки и т.п.).
+
+updated_at поддерживается триггером. Значение по умолчанию now() не волатильно,
+поэтому ADD COLUMN не перезаписывает таблицу; индекс строится CONCURRENTLY.
+"""
+
+import asyncpg
+
+from db.migrations.runner import create_index_concurrently
+
+DESCRIPTION = "User_Contacts_VBA: updated_at + триггер, таблица bot_state"
+
+
+async def upgrade(conn: asyncpg.Connection) -> None:
+    await conn.execute(
+        """
+        ALTER TABLE User_Contacts_VBA
+            ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+        CREATE OR REPLACE FUNCTION touch_user_contacts_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at := now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_user_contacts_updated_at ON User_Contacts_VBA;
+        CREATE TRIGGER trg_user_contacts_updated_at
+            BEFORE UPDATE ON User_Contacts_VBA
+            FOR EACH ROW
+            WHEN (OLD.* IS DISTINCT FROM NEW.*)
+            EXECUTE FUNCTION touch_user_contacts_updated_at();
+
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """
+    )
+    await create_index_concurrently(
+        conn, "idx_user_contacts_vba_updated_at", "ON User_Contacts_VBA (updated_at)"
+    )
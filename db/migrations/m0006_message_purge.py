@@ -0,0 +1,23 @@
+"""
+Таблица заданий на удаление сообщений бота у отклонённых пользователей.
+
+Строка существует, пока очистка не завершена: после перезапуска незавершённые
+задания возобновляются. Прогресс — сами строки dialog_log: они удаляются
+пачками сразу после удаления соответствующих сообщений в Telegram.
+"""
+
+import asyncpg
+
+DESCRIPTION = "message_purge: задания очистки сообщений бота"
+
+
+async def upgrade(conn: asyncpg.Connection) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS message_purge (
+            user_id BIGINT PRIMARY KEY,
+            started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            deleted_count INT NOT NULL DEFAULT 0
+        );
+        """
+    )
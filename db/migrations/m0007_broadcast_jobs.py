@@ -0,0 +1,46 @@
+"""
+Таблицы рассылок: broadcast_job (задание) и broadcast_delivery (получатели).
+
+Получатели фиксируются в broadcast_delivery при старте рассылки, статус каждого
+обновляется сразу после отправки, поэтому после перезапуска рассылка
+продолжается только по тем, кому ещё ничего не отправлялось.
+"""
+
+import asyncpg
+
+DESCRIPTION = "broadcast_job, broadcast_delivery: сохраняемые рассылки"
+
+
+async def upgrade(conn: asyncpg.Connection) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_job (
+            id SERIAL PRIMARY KEY,
+            target_role TEXT NOT NULL,
+            text TEXT NOT NULL,
+            photo_file_id TEXT,
+            scheduled_at TIMESTAMPTZ NOT NULL,
+            status TEXT NOT NULL DEFAULT 'scheduled',
+            created_by BIGINT,
+            progress_chat_id BIGINT,
+            progress_message_id BIGINT,
+            progress_with_caption BOOLEAN NOT NULL DEFAULT FALSE,
+            total INT NOT NULL DEFAULT 0,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ
+        );
+
+        CREATE TABLE IF NOT EXISTS broadcast_delivery (
+            job_id INT NOT NULL REFERENCES broadcast_job(id) ON DELETE CASCADE,
+            user_id BIGINT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (job_id, user_id)
+        );
+
+        -- Таблицы новые и пустые, CONCURRENTLY не нужен
+        CREATE INDEX IF NOT EXISTS idx_broadcast_job_active
+            ON broadcast_job (scheduled_at) WHERE status IN ('scheduled', 'running');
+        """
+    )
@@ -0,0 +1,19 @@
+"""
+Таблица broadcast_opt_out: пользователи, отказавшиеся от рассылок.
+Учитывается запросом получателей рассылки (db.broadcasts.RECIPIENTS_QUERY).
+"""
+
+import asyncpg
+
+DESCRIPTION = "broadcast_opt_out: отказ от рассылок"
+
+
+async def upgrade(conn: asyncpg.Connection) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_opt_out (
+            user_id BIGINT PRIMARY KEY,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """
+    )
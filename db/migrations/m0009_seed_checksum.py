@@ -0,0 +1,21 @@
+"""
+Таблица seed_checksum: SHA-256 применённых файлов db/seeds.
+populate_initial_data пропускает файл, если его хэш не изменился.
+"""
+
+import asyncpg
+
+DESCRIPTION = "seed_checksum: хэши применённых сидов"
+
+
+async def upgrade(conn: asyncpg.Connection) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS seed_checksum (
+            name TEXT PRIMARY KEY,
+            checksum TEXT NOT NULL,
+            row_count INT NOT NULL DEFAULT 0,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """
+    )
@@ -0,0 +1,35 @@
+"""
+Триггеры trg_vba_catalog_unit и trg_vba_catalog_formule: любое изменение
+vba_unit или vba_formule (включая TRUNCATE) отправляет NOTIFY на канал
+vba_catalog_changed с именем таблицы. По нему бот сбрасывает каталог
+макросов и формул (macro.catalog).
+
+Триггеры уровня оператора: массовая правка шлёт одно уведомление, а не по строке.
+"""
+
+import asyncpg
+
+DESCRIPTION = "vba_unit, vba_formule: NOTIFY об изменении каталога"
+
+
+async def upgrade(conn: asyncpg.Connection) -> None:
+    await conn.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_vba_catalog_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('vba_catalog_changed', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_vba_catalog_unit ON vba_unit;
+        CREATE TRIGGER trg_vba_catalog_unit
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON vba_unit
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_vba_catalog_change();
+
+        DROP TRIGGER IF EXISTS trg_vba_catalog_formule ON vba_formule;
+        CREATE TRIGGER trg_vba_catalog_formule
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON vba_formule
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_vba_catalog_change();
+        """
+    )
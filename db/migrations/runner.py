@@ -0,0 +1,118 @@
+"""
+runner.py
+
+Версионные миграции схемы БД.
+
+Миграции — модули `mNNNN_<name>.py` в этом пакете, где NNNN — номер версии.
+Каждый модуль объявляет `DESCRIPTION` и корутину `upgrade(conn)`.
+Применённые версии записываются в таблицу `schema_migrations`.
+
+Миграции выполняются вне транзакции, чтобы можно было использовать
+`CREATE INDEX CONCURRENTLY`, поэтому каждый шаг должен быть идемпотентным:
+если процесс упадёт посередине, при следующем старте миграция повторится целиком.
+"""
+
+import importlib
+import logging
+import pkgutil
+import re
+from pathlib import Path
+
+import asyncpg
+
+from db.connection import get_db_connection
+
+__all__ = ("apply_migrations", "create_index_concurrently")
+
+# Ключ pg_advisory_lock: одновременно миграции применяет только один процесс
+MIGRATIONS_LOCK_KEY = 7_340_001
+
+_MODULE_PATTERN = re.compile(r"^m(\d{4})_\w+$")
+
+
+def _discover() -> list[tuple[int, str]]:
+    """
+    Находит модули миграций пакета и сортирует их по номеру версии.
+
+    Returns:
+        list[tuple[int, str]]: Пары (версия, имя модуля).
+    """
+    found = []
+    for module in pkgutil.iter_modules([str(Path(__file__).parent)]):
+        match = _MODULE_PATTERN.match(module.name)
+        if match:
+            found.append((int(match.group(1)), module.name))
+    return sorted(found)
+
+
+async def create_index_concurrently(
+    conn: asyncpg.Connection,
+    name: str,
+    definition: str,
+    unique: bool = False,
+) -> None:
+    """
+    Создаёт индекс через CREATE INDEX CONCURRENTLY без блокировки записи в таблицу.
+
+    Если предыдущая попытка оставила невалидный индекс (прерванный CONCURRENTLY),
+    он удаляется и создаётся заново.
+
+    Args:
+        conn (asyncpg.Connection): Соединение вне транзакции.
+        name (str): Имя индекса.
+        definition (str): Часть после имени, например "ON dialog_log (user_id)".
+        unique (bool): Создать UNIQUE-индекс.
+    """
+    valid = await conn.fetchval(
+        """
+        SELECT i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = $1
+        """,
+        name.lower(),
+    )
+    if valid:
+        return
+    if valid is False:
+        logging.warning(f"[MIGRATIONS] Индекс {name} невалиден, пересоздаём")
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    await conn.execute(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} {definition}")
+
+
+async def apply_migrations() -> None:
+    """
+    Применяет все ещё не применённые миграции по порядку номеров.
+
+    Raises:
+        asyncpg.PostgresError: Если миграция завершилась ошибкой
+            (последующие миграции не применяются).
+    """
+    async with get_db_connection() as conn:
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+                           DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'Europe/Moscow')
+            );
+            """
+        )
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATIONS_LOCK_KEY)
+        try:
+            applied = {r["version"] for r in await conn.fetch("SELECT version FROM schema_migrations")}
+            for version, module_name in _discover():
+                if version in applied:
+                    continue
+                module = importlib.import_module(f"{__package__}.{module_name}")
+                logging.info(f"[MIGRATIONS] Применяем {module_name}: {module.DESCRIPTION}")
+                await module.upgrade(conn)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                    version, module_name,
+                )
+                logging.info(f"[MIGRATIONS] ✅ {module_name} применена")
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATIONS_LOCK_KEY)
@@ -0,0 +1,111 @@
+"""
+pool_metrics.py
+
+Метрики пулов соединений asyncpg.
+
+- Гистограмма времени ожидания соединения (acquire) по корзинам ACQUIRE_BUCKETS_MS.
+- Число выдач, таймаутов ожидания и задач, ждущих соединение прямо сейчас.
+- Размер пула, занятые и простаивающие соединения берутся из самого пула в `snapshot()`.
+
+Метрики пишет db.connection при каждом get_db_connection() / get_analytics_connection().
+"""
+
+from bisect import bisect_left
+from typing import Dict, Optional
+
+import asyncpg
+
+# Верхние границы корзин гистограммы ожидания, мс; последняя корзина — «больше»
+ACQUIRE_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    """
+    Счётчики ожидания соединения одного пула.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.buckets = [0] * (len(ACQUIRE_BUCKETS_MS) + 1)
+        self.acquires = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def start_wait(self) -> None:
+        self.waiting += 1
+
+    def record_acquire(self, wait: float) -> None:
+        """
+        Учитывает выданное соединение.
+
+        Args:
+            wait (float): Время ожидания, с.
+        """
+        self.waiting -= 1
+        self.acquires += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.buckets[bisect_left(ACQUIRE_BUCKETS_MS, wait * 1000)] += 1
+
+    def record_timeout(self) -> None:
+        self.waiting -= 1
+        self.timeouts += 1
+
+    def record_failure(self) -> None:
+        """Ожидание прервано не таймаутом (ошибка соединения, отмена задачи)."""
+        self.waiting -= 1
+
+    def percentile_ms(self, q: float) -> Optional[float]:
+        """
+        Верхняя граница корзины, в которую попадает q-квантиль ожидания.
+
+        Args:
+            q (float): Квантиль от 0 до 1.
+
+        Returns:
+            Optional[float]: Граница в мс, inf для последней корзины, None без данных.
+        """
+        if not self.acquires:
+            return None
+        rank = q * self.acquires
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return float(ACQUIRE_BUCKETS_MS[i]) if i < len(ACQUIRE_BUCKETS_MS) else float("inf")
+        return float("inf")
+
+    def snapshot(self, pool: Optional[asyncpg.pool.Pool]) -> Dict[str, object]:
+        """
+        Возвращает текущие метрики пула.
+
+        Args:
+            pool (Optional[asyncpg.pool.Pool]): Пул (None — ещё не создан).
+
+        Returns:
+            dict: size, min_size, max_size, in_use, idle, waiting, acquires, timeouts,
+                avg_wait_ms, max_wait_ms, p50_ms, p95_ms, p99_ms и histogram
+                (граница корзины в мс -> число выдач).
+        """
+        size = pool.get_size() if pool is not None else 0
+        idle = pool.get_idle_size() if pool is not None else 0
+        labels = [f"≤{b}" for b in ACQUIRE_BUCKETS_MS] + [f">{ACQUIRE_BUCKETS_MS[-1]}"]
+        return {
+            "name": self.name,
+            "size": size,
+            "min_size": pool.get_min_size() if pool is not None else 0,
+            "max_size": pool.get_max_size() if pool is not None else 0,
+            "in_use": size - idle,
+            "idle": idle,
+            "waiting": self.waiting,
+            "acquires": self.acquires,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait * 1000 / self.acquires, 2) if self.acquires else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "p50_ms": self.percentile_ms(0.5),
+            "p95_ms": self.percentile_ms(0.95),
+            "p99_ms": self.percentile_ms(0.99),
+            "histogram": dict(zip(labels, self.buckets)),
+        }
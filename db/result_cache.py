@@ -0,0 +1,213 @@
+"""
+result_cache.py
+
+Кэш результатов админских SQL-запросов.
+
+- Ключ — нормализованный текст запроса (регистр и пробелы вне строковых литералов
+  не важны), формат выгрузки и предел строк роли.
+- Запись действительна, пока не изменились таблицы, которые читает запрос.
+  Версия таблицы — сумма счётчиков модификаций из pg_stat_user_tables
+  (n_tup_ins + n_tup_upd + n_tup_del), она растёт при любом изменении;
+  таблицы берутся из плана EXPLAIN.
+- Вместо файлов хранятся file_id уже отправленных в Telegram документов,
+  а маленькие результаты — строками; повторный запрос не выполняется и не кодируется.
+- Кэш — LRU, ограниченный суммарным размером записей (QUERY_CACHE_MAX_BYTES).
+
+Статистика PostgreSQL обновляется с задержкой до секунды, поэтому изменения,
+сделанные в последнюю секунду перед запросом, кэш может не заметить.
+Запросы с изменчивыми функциями (now(), random(), nextval() …) не кэшируются.
+"""
+
+import copy
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+from db.connection import get_db_connection
+from db.export import QueryExport
+from db.statements import statements
+
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+_LITERAL = re.compile(r"('(?:[^']|'')*')")
+_WHITESPACE = re.compile(r"\s+")
+_VOLATILE = re.compile(
+    r"\b(now|random|clock_timestamp|statement_timestamp|transaction_timestamp|timeofday"
+    r"|current_date|current_time|current_timestamp|localtime|localtimestamp"
+    r"|nextval|currval|setval|gen_random_uuid|uuid_generate_v\d)\b"
+)
+
+TableVersions = Tuple[Tuple[str, int], ...]
+
+TABLE_VERSIONS = statements.register(
+    "result_cache.table_versions",
+    """
+    SELECT relname, n_tup_ins + n_tup_upd + n_tup_del AS version
+    FROM pg_stat_user_tables
+    WHERE schemaname = 'public' AND relname = ANY($1::text[])
+    ORDER BY relname
+    """,
+)
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Приводит SQL к каноническому виду: нижний регистр и одиночные пробелы
+    вне строковых литералов, без завершающей точки с запятой.
+
+    Args:
+        query (str): SQL-запрос.
+
+    Returns:
+        str: Нормализованный текст.
+    """
+    parts = _LITERAL.split(query.strip().rstrip(";"))
+    return "".join(
+        part if i % 2 else _WHITESPACE.sub(" ", part.lower())
+        for i, part in enumerate(parts)
+    ).strip()
+
+
+def is_cacheable_sql(normalized: str) -> bool:
+    """Можно ли кэшировать запрос: только SELECT без изменчивых функций."""
+    if not normalized.startswith("select"):
+        return False
+    code = "".join(part for i, part in enumerate(_LITERAL.split(normalized)) if i % 2 == 0)
+    return _VOLATILE.search(code) is None
+
+
+async def get_table_versions(relations: Sequence[str]) -> Optional[TableVersions]:
+    """
+    Возвращает версии таблиц по счётчикам pg_stat_user_tables.
+
+    Args:
+        relations (Sequence[str]): Имена таблиц схемы public.
+
+    Returns:
+        Optional[TableVersions]: Пары (таблица, версия) или None, если какой-то
+            таблицы нет в pg_stat_user_tables (системный каталог и т.п.).
+    """
+    names = sorted(set(relations))
+    if not names:
+        return None
+    async with get_db_connection() as conn:
+        records = await TABLE_VERSIONS.fetch(conn, names)
+    if len(records) != len(names):
+        return None
+    return tuple((r["relname"], r["version"]) for r in records)
+
+
+def _entry_size(export: QueryExport) -> int:
+    size = 256 + sum(len(str(c)) for c in export.columns)
+    if export.rows is not None:
+        size += sum(len(str(value)) + 16 for row in export.rows for value in row)
+    size += sum(len(part.filename) + len(part.file_id or "") + 64 for part in export.parts)
+    return size
+
+
+class QueryResultCache:
+    """
+    LRU-кэш `ключ запроса -> (версии таблиц, результат)` с ограничением по байтам.
+    Результат хранится как QueryExport без файлов: строки или части с file_id.
+    """
+
+    def __init__(self, max_bytes: int = QUERY_CACHE_MAX_BYTES) -> None:
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Tuple[TableVersions, QueryExport, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, fmt: str, max_rows: int) -> Optional[tuple]:
+        """
+        Ключ кэша или None, если запрос кэшировать нельзя.
+
+        Args:
+            query (str): SQL-запрос.
+            fmt (str): Формат выгрузки.
+            max_rows (int): Предел строк роли.
+        """
+        normalized = normalize_sql(query)
+        if not is_cacheable_sql(normalized):
+            return None
+        return normalized, fmt, max_rows
+
+    def get(self, key: tuple, versions: TableVersions) -> Optional[QueryExport]:
+        """
+        Возвращает копию результата, если таблицы с тех пор не менялись.
+
+        Args:
+            key (tuple): Ключ из make_key.
+            versions (TableVersions): Текущие версии таблиц запроса.
+
+        Returns:
+            Optional[QueryExport]: Результат без файлов (строки или file_id) или None.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == versions:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+        if entry is not None:
+            self._remove(key)
+        self.misses += 1
+        return None
+
+    def put(self, key: tuple, versions: TableVersions, export: QueryExport) -> None:
+        """
+        Сохраняет результат. Части без file_id (не отправленные) не кэшируются.
+
+        Args:
+            key (tuple): Ключ из make_key.
+            versions (TableVersions): Версии таблиц, снятые до выполнения запроса.
+            export (QueryExport): Отправленный результат.
+        """
+        if export.error is not None or any(part.file_id is None for part in export.parts):
+            return
+        stored = QueryExport(
+            columns=list(export.columns),
+            row_count=export.row_count,
+            rows=list(export.rows) if export.rows is not None else None,
+            parts=[copy.copy(part) for part in export.parts],
+            truncated=export.truncated,
+        )
+        for part in stored.parts:
+            part.file = None
+        size = _entry_size(stored)
+        if size > self._max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (versions, stored, size)
+        self._bytes += size
+        while self._bytes > self._max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: tuple) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Возвращает счётчики кэша.
+
+        Returns:
+            dict: hits, misses, size, bytes и hit_ratio.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+query_result_cache = QueryResultCache()
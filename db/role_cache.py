@@ -0,0 +1,120 @@
+"""
+role_cache.py
+
+Общий кэш ролей пользователей из User_Contacts_VBA.
+
+- Записи живут ROLE_CACHE_TTL секунд.
+- Изменения внутри процесса (save_user, update_user_role) сбрасывают запись сразу.
+- Изменения из других процессов приходят через NOTIFY на канал ROLE_CHANNEL,
+  который отправляет триггер trg_user_role_change.
+- Счётчики попаданий/промахов доступны через `stats()`.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+ROLE_CACHE_TTL = float(os.getenv("ROLE_CACHE_TTL", 60))
+ROLE_CHANNEL = "user_role_changed"
+
+
+class RoleCache:
+    """
+    Кэш `user_id -> role` с TTL и явной инвалидацией.
+    """
+
+    def __init__(self, ttl: float = ROLE_CACHE_TTL) -> None:
+        self._ttl = ttl
+        self._entries: dict[int, tuple[str, float]] = {}
+        # Растёт при каждой инвалидации: чтение из БД, начатое до неё, не попадёт в кэш
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[str]:
+        """
+        Возвращает роль из кэша или None, если записи нет или она устарела.
+
+        Args:
+            user_id (int): Telegram ID пользователя.
+
+        Returns:
+            Optional[str]: Роль пользователя.
+        """
+        entry = self._entries.get(user_id)
+        if entry and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry[0]
+        if entry:
+            del self._entries[user_id]
+        self.misses += 1
+        return None
+
+    def set(self, user_id: int, role: str, generation: Optional[int] = None) -> None:
+        """
+        Сохраняет роль пользователя на ROLE_CACHE_TTL секунд.
+
+        Args:
+            user_id (int): Telegram ID пользователя.
+            role (str): Роль.
+            generation (Optional[int]): Значение `generation` на момент начала чтения из БД.
+                Если с тех пор была инвалидация, значение не сохраняется.
+        """
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[user_id] = (role, time.monotonic() + self._ttl)
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """
+        Сбрасывает запись пользователя, либо весь кэш, если user_id не указан.
+
+        Args:
+            user_id (Optional[int]): Telegram ID пользователя.
+        """
+        self.generation += 1
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+    def on_notify(self, payload: Optional[str]) -> None:
+        """
+        Обработчик NOTIFY канала ROLE_CHANNEL.
+
+        Payload — JSON вида {"user_id": ..., "old_role": ..., "new_role": ...}.
+        `None` означает, что уведомления могли быть потеряны, — кэш сбрасывается целиком.
+        """
+        if payload is None:
+            self.invalidate()
+            return
+        try:
+            data = json.loads(payload)
+            user_id = int(data["user_id"])
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning(f"[ROLE_CACHE] Некорректный payload '{payload}': {e}")
+            self.invalidate()
+            return
+
+        self.invalidate(user_id)
+        if data.get("new_role") is not None:
+            self.set(user_id, data["new_role"])
+
+    def stats(self) -> dict:
+        """
+        Возвращает счётчики кэша.
+
+        Returns:
+            dict: hits, misses, size и hit_ratio.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+role_cache = RoleCache()
@@ -0,0 +1,54 @@
+import logging
+from typing import Optional
+from db.connection import get_db_connection
+from db.statements import statements
+
+"""
+Модуль для работы с таблицей служебного состояния `bot_state` (ключ → значение).
+Используется для данных, которые должны переживать перезапуск бота.
+Запросы объявлены в реестре db.statements.
+"""
+
+GET_STATE = statements.register("state.get", "SELECT value FROM bot_state WHERE key = $1")
+SET_STATE = statements.register(
+    "state.set",
+    "INSERT INTO bot_state (key, value) VALUES ($1, $2) "
+    "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = now()",
+)
+
+
+async def get_state(key: str) -> Optional[str]:
+    """
+    Возвращает сохранённое значение по ключу.
+
+    Args:
+        key (str): Ключ состояния.
+
+    Returns:
+        Optional[str]: Значение или None, если ключа нет.
+
+    Raises:
+        Exception: Ошибка БД. None здесь не возвращается: вызывающий код принял бы
+            его за отсутствие ключа (для водяного знака ролей — за полную пересинхронизацию).
+    """
+    try:
+        async with get_db_connection() as conn:
+            return await GET_STATE.fetchval(conn, key)
+    except Exception as e:
+        logging.error(f"Ошибка при чтении состояния '{key}': {e}")
+        raise
+
+
+async def set_state(key: str, value: str) -> None:
+    """
+    Сохраняет значение по ключу (вставка или обновление).
+
+    Args:
+        key (str): Ключ состояния.
+        value (str): Значение.
+    """
+    try:
+        async with get_db_connection() as conn:
+            await SET_STATE.execute(conn, key, value)
+    except Exception as e:
+        logging.error(f"Ошибка при сохранении состояния '{key}': {e}")
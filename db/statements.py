@@ -0,0 +1,204 @@
+"""
+statements.py
+
+Реестр именованных SQL-запросов пакета db.
+
+- Каждый запрос объявляется один раз: `statements.register(имя, sql, hot=...)`
+  рядом с функцией, которая его выполняет, и вызывается через методы Statement
+  (fetch, fetchrow, fetchval, execute, executemany).
+- Соединения основного пула — StatementConnection: подготовленные запросы
+  хранятся в самом соединении и переиспользуются без повторного Parse/Describe.
+- Запросы с hot=True подготавливаются в init-колбэке пула
+  (prepare_hot_statements), поэтому новое соединение приходит «тёплым».
+- По каждому запросу считаются вызовы, ошибки, подготовки и время (`stats()`).
+
+В реестре объявлены все фиксированные запросы пакета db к основному пулу.
+Вне реестра остаются DDL (initialize_db, миграции, загрузка сидов), служебные
+запросы соединений (LISTEN, настройка сессии) и произвольный SQL администратора
+в аналитическом пуле. На соединениях другого класса (аналитический пул, LISTEN)
+запросы реестра выполняются обычным conn.fetch(sql) с неявным кэшем asyncpg.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+
+__all__ = ("Statement", "StatementRegistry", "StatementConnection", "statements", "prepare_hot_statements")
+
+
+class StatementConnection(asyncpg.Connection):
+    """Соединение asyncpg, хранящее подготовленные запросы реестра по имени."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: Dict[str, PreparedStatement] = {}
+
+
+@dataclass(eq=False)
+class Statement:
+    """
+    Именованный SQL-запрос со счётчиками.
+
+    Attributes:
+        name (str): Имя запроса, например "users.get_role".
+        sql (str): Текст запроса.
+        hot (bool): Подготавливать на каждом новом соединении пула.
+        calls (int): Число выполнений.
+        errors (int): Число выполнений с ошибкой.
+        prepares (int): Сколько раз запрос подготавливался на соединениях.
+        total_time (float): Суммарное время выполнений, с.
+        max_time (float): Самое долгое выполнение, с.
+    """
+    name: str
+    sql: str
+    hot: bool = False
+    calls: int = 0
+    errors: int = 0
+    prepares: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    async def prepare(self, conn) -> Optional[PreparedStatement]:
+        """
+        Возвращает подготовленный запрос соединения, подготавливая его при первом обращении.
+        None — соединение не хранит подготовленные запросы (не StatementConnection).
+        """
+        cache = getattr(conn, "prepared_statements", None)
+        if cache is None:
+            return None
+        stmt = cache.get(self.name)
+        if stmt is None:
+            stmt = await conn.prepare(self.sql)
+            cache[self.name] = stmt
+            self.prepares += 1
+        return stmt
+
+    async def _run(self, conn, method: str, args: Sequence[Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            try:
+                return await self._call(conn, method, args)
+            except asyncpg.FeatureNotSupportedError:
+                # «cached plan must not change result type»: схема изменилась после подготовки
+                cache = getattr(conn, "prepared_statements", None)
+                if cache is None or cache.pop(self.name, None) is None or conn.is_in_transaction():
+                    raise
+                return await self._call(conn, method, args)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.calls += 1
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+
+    async def _call(self, conn, method: str, args: Sequence[Any]) -> Any:
+        stmt = await self.prepare(conn)
+        if stmt is None:
+            return await getattr(conn, method)(self.sql, *args)
+        if method == "execute":
+            await stmt.fetch(*args)
+            return stmt.get_statusmsg()
+        if method == "executemany":
+            return await stmt.executemany(*args)
+        return await getattr(stmt, method)(*args)
+
+    async def fetch(self, conn, *args) -> List[asyncpg.Record]:
+        return await self._run(conn, "fetch", args)
+
+    async def fetchrow(self, conn, *args) -> Optional[asyncpg.Record]:
+        return await self._run(conn, "fetchrow", args)
+
+    async def fetchval(self, conn, *args) -> Any:
+        return await self._run(conn, "fetchval", args)
+
+    async def execute(self, conn, *args) -> str:
+        """Выполняет запрос и возвращает статус команды (как conn.execute)."""
+        return await self._run(conn, "execute", args)
+
+    async def executemany(self, conn, args: Sequence[Sequence[Any]]) -> None:
+        await self._run(conn, "executemany", (args,))
+
+
+class StatementRegistry:
+    """
+    Реестр именованных запросов: объявление, подготовка горячих запросов и статистика.
+    """
+
+    def __init__(self) -> None:
+        self._statements: Dict[str, Statement] = {}
+
+    def register(self, name: str, sql: str, hot: bool = False) -> Statement:
+        """
+        Объявляет запрос.
+
+        Args:
+            name (str): Уникальное имя ("<модуль>.<действие>").
+            sql (str): Текст запроса.
+            hot (bool): Подготавливать на каждом новом соединении пула.
+
+        Returns:
+            Statement: Объект запроса для вызова.
+
+        Raises:
+            ValueError: Имя уже занято другим запросом.
+        """
+        existing = self._statements.get(name)
+        if existing is not None:
+            if existing.sql != sql:
+                raise ValueError(f"Запрос '{name}' уже объявлен с другим текстом")
+            return existing
+        statement = Statement(name=name, sql=sql, hot=hot)
+        self._statements[name] = statement
+        return statement
+
+    def __getitem__(self, name: str) -> Statement:
+        return self._statements[name]
+
+    def hot(self) -> List[Statement]:
+        return [s for s in self._statements.values() if s.hot]
+
+    def stats(self) -> List[dict]:
+        """
+        Возвращает статистику выполнявшихся запросов, самые затратные — первыми.
+
+        Returns:
+            List[dict]: name, calls, errors, prepares, total_ms, avg_ms, max_ms.
+        """
+        rows = [
+            {
+                "name": s.name,
+                "calls": s.calls,
+                "errors": s.errors,
+                "prepares": s.prepares,
+                "total_ms": round(s.total_time * 1000, 1),
+                "avg_ms": round(s.total_time * 1000 / s.calls, 2) if s.calls else 0.0,
+                "max_ms": round(s.max_time * 1000, 1),
+            }
+            for s in self._statements.values() if s.calls or s.prepares
+        ]
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+
+statements = StatementRegistry()
+
+
+async def prepare_hot_statements(conn: StatementConnection) -> None:
+    """
+    init-колбэк пула: подготавливает горячие запросы на новом соединении.
+    Запрос, который пока не готовится (таблица ещё не создана или не мигрирована),
+    пропускается и будет подготовлен при первом вызове.
+
+    Args:
+        conn (StatementConnection): Новое соединение пула.
+    """
+    for statement in statements.hot():
+        try:
+            await statement.prepare(conn)
+        except asyncpg.PostgresError as e:
+            logging.debug(f"[STATEMENTS] {statement.name} не подготовлен при init: {e}")
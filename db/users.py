@@ -1,16 +1,72 @@
 import logging
+from datetime import datetime
 from typing import Optional, List, Tuple
 from db.connection import get_db_connection
+from db.role_cache import role_cache
+from db.statements import statements
 
 """
 Модуль для работы с таблицей пользователей User_Contacts_VBA в базе данных PostgreSQL.
 Включает функции для получения, обновления и добавления пользователей, а также работы с ролями.
+Запросы объявлены в реестре db.statements.
 """
 
+GET_ROLE = statements.register(
+    "users.get_role", "SELECT role FROM User_Contacts_VBA WHERE user_id = $1", hot=True
+)
+ALL_ROLES = statements.register("users.all_roles", "SELECT user_id, role FROM User_Contacts_VBA")
+ROLES_CHANGED_ALL = statements.register(
+    "users.roles_changed_all", "SELECT user_id, role, updated_at FROM User_Contacts_VBA ORDER BY updated_at"
+)
+ROLES_CHANGED_SINCE = statements.register(
+    "users.roles_changed_since",
+    "SELECT user_id, role, updated_at FROM User_Contacts_VBA WHERE updated_at > $1 ORDER BY updated_at",
+    hot=True,
+)
+DISTINCT_ROLES = statements.register(
+    "users.distinct_roles", "SELECT DISTINCT role FROM User_Contacts_VBA WHERE role IS NOT NULL"
+)
+USERS_BY_ROLE = statements.register(
+    "users.by_role",
+    "SELECT user_id, username, phone_number FROM User_Contacts_VBA WHERE role = $1 ORDER BY user_id",
+)
+USERS_BY_ROLE_PAGE = statements.register(
+    "users.by_role_page",
+    "SELECT user_id, username, phone_number FROM User_Contacts_VBA WHERE role = $1 ORDER BY user_id "
+    "LIMIT $2 OFFSET $3",
+)
+USER_IDS_BY_ROLE = statements.register("users.ids_by_role", "SELECT user_id FROM User_Contacts_VBA WHERE role = $1")
+USER_BY_ID = statements.register(
+    "users.by_id",
+    "SELECT user_id, username, phone_number FROM User_Contacts_VBA WHERE user_id = $1 LIMIT 1",
+)
+ALL_USERS = statements.register(
+    "users.all",
+    "SELECT user_id, username, phone_number, timestamp, comment, role "
+    "FROM User_Contacts_VBA ORDER BY timestamp ASC",
+)
+SAVE_USER = statements.register(
+    "users.save",
+    "INSERT INTO User_Contacts_VBA (user_id, username, phone_number) "
+    "VALUES ($1, $2, $3) "
+    "ON CONFLICT (user_id) DO UPDATE SET username = EXCLUDED.username, "
+    "phone_number = CASE WHEN EXCLUDED.phone_number IS NULL THEN User_Contacts_VBA.phone_number ELSE EXCLUDED.phone_number END",
+    hot=True,
+)
+UPDATE_ROLE = statements.register("users.update_role", "UPDATE User_Contacts_VBA SET role = $1 WHERE user_id = $2")
+UPDATE_ROLE_AND_PHONE = statements.register(
+    "users.update_role_and_phone",
+    "UPDATE User_Contacts_VBA SET role = $1, phone_number = $2 WHERE user_id = $3",
+)
+UPDATE_COMMENT = statements.register(
+    "users.update_comment", "UPDATE User_Contacts_VBA SET comment = $1 WHERE user_id = $2"
+)
+
 
 async def get_user_role_by_id(user_id: int) -> str:
     """
     Асинхронная функция для получения роли пользователя.
+    Сначала проверяет общий кэш ролей (`db.role_cache`), затем БД.
 
     Args:
         user_id (int): Telegram ID пользователя.
@@ -18,19 +74,26 @@ async def get_user_role_by_id(user_id: int) -> str:
     Returns:
         str: Роль пользователя или 'noauth', если не найден.
     """
-    query = "SELECT role FROM User_Contacts_VBA WHERE user_id = $1"
+    cached = role_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    generation = role_cache.generation
     try:
         async with get_db_connection() as conn:
-            record = await conn.fetchrow(query, user_id)
-            return record['role'] if record else 'noauth'
+            record = await GET_ROLE.fetchrow(conn, user_id)
     except Exception as e:
         logging.error(f"Ошибка при получении роли пользователя {user_id}: {e}")
         return 'noauth'
 
+    role = record['role'] if record else 'noauth'
+    role_cache.set(user_id, role, generation)
+    return role
+
 
 async def get_user_role(user_id: int) -> str:
     """
-    Получает роль пользователя по его идентификатору.
+    Получает роль пользователя по его идентификатору (через кэш ролей).
 
     Args:
         user_id (int): Telegram ID пользователя.
@@ -38,14 +101,7 @@ async def get_user_role(user_id: int) -> str:
     Returns:
         str: Роль пользователя, либо "noauth", если не найден или при ошибке.
     """
-    query = "SELECT role FROM User_Contacts_VBA WHERE user_id = $1"
-    try:
-        async with get_db_connection() as conn:
-            record = await conn.fetchrow(query, user_id)
-            return record['role'] if record else "noauth"
-    except Exception as e:
-        logging.error(f"Ошибка при получении роли пользователя {user_id}: {e}")
-        return "noauth"
+    return await get_user_role_by_id(user_id)
 
 
 async def get_all_user_roles() -> List[Tuple[int, str]]:
@@ -55,16 +111,37 @@ async def get_all_user_roles() -> List[Tuple[int, str]]:
     Returns:
         List[Tuple[int, str]]: Список кортежей (user_id, role).
     """
-    query = "SELECT user_id, role FROM User_Contacts_VBA"
     try:
         async with get_db_connection() as conn:
-            records = await conn.fetch(query)
+            records = await ALL_ROLES.fetch(conn)
             return [(r['user_id'], r['role']) for r in records]
     except Exception as e:
         logging.error(f"Ошибка при получении всех ролей: {e}")
         return []
 
 
+async def get_user_roles_changed_since(since: Optional[datetime]) -> List[Tuple[int, str, datetime]]:
+    """
+    Возвращает пользователей, чья запись менялась после указанного момента.
+
+    Args:
+        since (Optional[datetime]): Водяной знак; None — все пользователи.
+
+    Returns:
+        List[Tuple[int, str, datetime]]: Кортежи (user_id, role, updated_at) по возрастанию updated_at.
+    """
+    try:
+        async with get_db_connection() as conn:
+            if since is None:
+                records = await ROLES_CHANGED_ALL.fetch(conn)
+            else:
+                records = await ROLES_CHANGED_SINCE.fetch(conn, since)
+            return [(r['user_id'], r['role'], r['updated_at']) for r in records]
+    except Exception as e:
+        logging.error(f"Ошибка при получении изменённых ролей: {e}")
+        return []
+
+
 async def get_all_roles_from_db() -> List[str]:
     """
     Возвращает уникальные роли пользователей из таблицы.
@@ -72,10 +149,9 @@ async def get_all_roles_from_db() -> List[str]:
     Returns:
         List[str]: Список уникальных ролей.
     """
-    query = "SELECT DISTINCT role FROM User_Contacts_VBA WHERE role IS NOT NULL"
     try:
         async with get_db_connection() as conn:
-            records = await conn.fetch(query)
+            records = await DISTINCT_ROLES.fetch(conn)
             return [r['role'] for r in records]
     except Exception as e:
         logging.error(f"Ошибка при получении списка ролей: {e}")
@@ -94,13 +170,12 @@ async def fetch_users_by_role(role: str, limit: Optional[int] = None, offset: in
     Returns:
         List[Tuple[int, str, str]]: Список кортежей (user_id, username, phone_number).
     """
-    base_query = "SELECT user_id, username, phone_number FROM User_Contacts_VBA WHERE role = $1 ORDER BY user_id"
     try:
         async with get_db_connection() as conn:
             if limit is not None:
-                records = await conn.fetch(base_query + " LIMIT $2 OFFSET $3", role, limit, offset)
+                records = await USERS_BY_ROLE_PAGE.fetch(conn, role, limit, offset)
             else:
-                records = await conn.fetch(base_query, role)
+                records = await USERS_BY_ROLE.fetch(conn, role)
             return [(r['user_id'], r['username'], r['phone_number']) for r in records]
     except Exception as e:
         logging.error(f"Ошибка при получении пользователей с ролью '{role}': {e}")
@@ -117,10 +192,9 @@ async def get_users_by_role(role: str) -> List[int]:
     Returns:
         List[int]: Список Telegram ID пользователей.
     """
-    query = "SELECT user_id FROM User_Contacts_VBA WHERE role = $1"
     try:
         async with get_db_connection() as conn:
-            records = await conn.fetch(query, role)
+            records = await USER_IDS_BY_ROLE.fetch(conn, role)
             return [r['user_id'] for r in records]
     except Exception as e:
         logging.error(f"Ошибка при получении пользователей по роли '{role}': {e}")
@@ -137,15 +211,9 @@ async def fetch_user_by_user_id(user_id: int) -> Optional[Tuple[int, str, str, s
     Returns:
         Optional[Tuple]: Кортеж (user_id, username, phone_number, timestamp, comment, role).
     """
-    query = (
-        "SELECT user_id, username, phone_number "
-        "FROM User_Contacts_VBA WHERE user_id = $1 LIMIT 1"
-    )
-    print(query)
-    logging.error(f"Запрос {query}")
     try:
         async with get_db_connection() as conn:
-            record = await conn.fetchrow(query, user_id)
+            record = await USER_BY_ID.fetchrow(conn, user_id)
             return tuple(record) if record else None
     except Exception as e:
         logging.error(f"Ошибка при получении пользователя {user_id}: {e}")
@@ -159,13 +227,9 @@ async def fetch_all_users() -> List[Tuple]:
     Returns:
         List[Tuple]: Кортежи (user_id, username, phone_number, timestamp, comment, role).
     """
-    query = (
-        "SELECT user_id, username, phone_number, timestamp, comment, role "
-        "FROM User_Contacts_VBA ORDER BY timestamp ASC"
-    )
     try:
         async with get_db_connection() as conn:
-            records = await conn.fetch(query)
+            records = await ALL_USERS.fetch(conn)
             return [tuple(r) for r in records]
     except Exception as e:
         logging.error(f"Ошибка при извлечении пользователей: {e}")
@@ -184,17 +248,13 @@ async def save_user(user_id: int, username: Optional[str] = None, phone_number:
     Note:
         Роль пользователя не обновляется — используется отдельная функция.
     """
-    query = (
-        "INSERT INTO User_Contacts_VBA (user_id, username, phone_number) "
-        "VALUES ($1, $2, $3) "
-        "ON CONFLICT (user_id) DO UPDATE SET username = EXCLUDED.username, "
-        "phone_number = CASE WHEN EXCLUDED.phone_number IS NULL THEN User_Contacts_VBA.phone_number ELSE EXCLUDED.phone_number END"
-    )
     try:
         async with get_db_connection() as conn:
-            await conn.execute(query, user_id, username, phone_number)
+            await SAVE_USER.execute(conn, user_id, username, phone_number)
     except Exception as e:
         logging.error(f"Ошибка при сохранении пользователя {user_id}: {e}")
+    finally:
+        role_cache.invalidate(user_id)
 
 
 async def update_user_role(user_id: int, new_role: str, phone_number: Optional[str] = None) -> bool:
@@ -210,19 +270,19 @@ async def update_user_role(user_id: int, new_role: str, phone_number: Optional[s
         bool: True, если было обновлено >=1 строк, иначе False.
     """
     if phone_number is None:
-        query = "UPDATE User_Contacts_VBA SET role = $1 WHERE user_id = $2"
-        params = (new_role, user_id)
+        statement, params = UPDATE_ROLE, (new_role, user_id)
     else:
-        query = "UPDATE User_Contacts_VBA SET role = $1, phone_number = $2 WHERE user_id = $3"
-        params = (new_role, phone_number, user_id)
+        statement, params = UPDATE_ROLE_AND_PHONE, (new_role, phone_number, user_id)
     try:
         async with get_db_connection() as conn:
-            status = await conn.execute(query, *params)
+            status = await statement.execute(conn, *params)
             updated = int(status.split()[-1])
             return updated > 0
     except Exception as e:
         logging.error(f"Ошибка обновления роли пользователя {user_id}: {e}")
         return False
+    finally:
+        role_cache.invalidate(user_id)
 
 
 async def update_comment(user_id: int, comment: str) -> None:
@@ -233,9 +293,8 @@ async def update_comment(user_id: int, comment: str) -> None:
         user_id (int): Telegram ID пользователя.
         comment (str): Новый комментарий.
     """
-    query = "UPDATE User_Contacts_VBA SET comment = $1 WHERE user_id = $2"
     try:
         async with get_db_connection() as conn:
-            await conn.execute(query, comment, user_id)
+            await UPDATE_COMMENT.execute(conn, comment, user_id)
     except Exception as e:
         logging.error(f"Ошибка при обновлении комментария пользователя {user_id}: {e}")
@@ -4,15 +4,20 @@ handlers_diag.py
 Логирование вопросов и ответов пользователей:
 - Логирование вопросов пользователей (для ролей "auth", "noauth", "preauth").
 - Логирование ответов бота.
+- Контекст логирования апдейта (DialogScope): роль, вопрос и ответы фиксируются один раз на апдейт.
 - Обработка ошибок и хранение логов в файле `bot_errors.log`.
 """
 
 import functools
 import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
 from telegram import Update, Message
 from telegram.ext import ContextTypes
 
-from log_dialog.logger import log_question, log_answer
+from log_dialog.logger import log_question, log_answer, moscow
 from log_dialog.models_daig import Point
 from db.users import get_user_role_by_id
 
@@ -35,11 +40,74 @@ async def log_error(user_id: str, error: str):
     logger.error(f"Ошибка у пользователя {user_id}: {error}")
 
 
+LOGGED_ROLES = ("auth", "noauth", "preauth")
+
+
+@dataclass
+class DialogScope:
+    """
+    Контекст логирования одного апдейта.
+
+    Создаётся самым внешним `log_step` и хранится в contextvar, поэтому вложенные
+    декорированные хендлеры (например, handle_macro_detail → run_macro_scenario →
+    handle_macro_code → show_instruction_options) не запрашивают роль повторно
+    и не пишут тот же вопрос ещё раз. Ответы, отправленные за время апдейта,
+    копятся здесь и записываются одним обновлением строки вопроса.
+    """
+    update_id: Optional[int]
+    user_id: int
+    role: str
+    question_id: Optional[int] = None
+    question_logged: bool = False
+    answers: dict[int, tuple[str, datetime]] = field(default_factory=dict)
+
+    @property
+    def should_log(self) -> bool:
+        return self.role in LOGGED_ROLES
+
+    def add_answer(self, message_id: int, answer_text: str) -> None:
+        """Запоминает ответ бота (повторно возвращённое сообщение не дублируется)."""
+        if message_id not in self.answers:
+            self.answers[message_id] = (answer_text, datetime.now(moscow).replace(tzinfo=None))
+
+
+_current_scope: ContextVar[Optional[DialogScope]] = ContextVar("dialog_scope", default=None)
+
+
+def _active_scope(update) -> Optional[DialogScope]:
+    """Возвращает контекст логирования, если он открыт для этого же апдейта."""
+    scope = _current_scope.get()
+    if scope is not None and scope.update_id == getattr(update, "update_id", None):
+        return scope
+    return None
+
+
+async def _flush_scope_answers(scope: DialogScope) -> None:
+    """
+    Записывает все ответы апдейта одним обновлением строки вопроса:
+    id и время — первого ответа, текст — все ответы по порядку.
+    """
+    if not scope.answers:
+        return
+    message_ids = sorted(scope.answers)
+    first_time = scope.answers[message_ids[0]][1]
+    answer_text = "\n\n".join(scope.answers[mid][0] for mid in message_ids)
+    await log_answer(
+        user_id=scope.user_id,
+        message_id=message_ids[0],
+        answer_text=answer_text,
+        question_id=scope.question_id,
+        answered_at=first_time
+    )
+
+
 def log_step(question_point: str = Point.TEXT, answer_text_getter=lambda msg: getattr(msg, 'text', '')):
     """
     Декоратор для логирования вопросов и ответов в процессе выполнения функции.
 
     Логирует входящее сообщение пользователя, выполняет основную функцию и логирует её ответ.
+    Во вложенных вызовах (в рамках того же апдейта) вопрос повторно не пишется,
+    а ответ добавляется к общему контексту `DialogScope`.
 
     Args:
         question_point (str): Точка сценария, для которой будет зафиксирован вопрос.
@@ -51,57 +119,59 @@ def log_step(question_point: str = Point.TEXT, answer_text_getter=lambda msg: ge
     def decorator(func):
         @functools.wraps(func)
         async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
-            user_id = None
-            try:
-                message = (
-                    update.message
-                    or update.edited_message
-                    or (update.callback_query.message if update.callback_query else None)
-                )
-                text = (
-                    (update.message.text if update.message else '')
-                    or (update.callback_query.data if update.callback_query else '')
-                )
-
-                user_id = update.effective_user.id if update.effective_user else "unknown"
-                username = update.effective_user.username if update.effective_user else "unknown"
-
-                role = await get_user_role_by_id(user_id)
-                should_log = role in ("auth", "noauth", "preauth")
-
-                if message and text and should_log:
-                    await log_question(
-                        user_id=user_id,
-                        username=username,
-                        message_id=message.message_id,
-                        message_text=text,
-                        point=question_point
-                    )
-
+            scope = _active_scope(update)
+            if scope is not None:
                 result = await func(update, context, *args, **kwargs)
+                if isinstance(result, Message) and scope.should_log:
+                    scope.add_answer(result.message_id, answer_text_getter(result) or "Ответ без текста")
+                return result
 
-                if isinstance(result, Message) and should_log:
-                    answer_text = answer_text_getter(result) or "Ответ без текста"
-                    await log_answer(
-                        user_id=user_id,
-                        message_id=result.message_id,
-                        answer_text=answer_text
-                    )
+            message = (
+                update.message
+                or update.edited_message
+                or (update.callback_query.message if update.callback_query else None)
+            )
+            text = (
+                (update.message.text if update.message else '')
+                or (update.callback_query.data if update.callback_query else '')
+            )
+
+            user_id = update.effective_user.id if update.effective_user else "unknown"
+            username = update.effective_user.username if update.effective_user else "unknown"
+
+            role = await get_user_role_by_id(user_id)
+            scope = DialogScope(update_id=update.update_id, user_id=user_id, role=role)
+
+            if message and text and scope.should_log:
+                scope.question_id = await log_question(
+                    user_id=user_id,
+                    username=username,
+                    message_id=message.message_id,
+                    message_text=text,
+                    point=question_point
+                )
+                scope.question_logged = True
 
+            token = _current_scope.set(scope)
+            try:
+                result = await func(update, context, *args, **kwargs)
+                if isinstance(result, Message) and scope.should_log:
+                    scope.add_answer(result.message_id, answer_text_getter(result) or "Ответ без текста")
                 return result
-
-            except Exception as e:
-                raise
+            finally:
+                _current_scope.reset(token)
+                await _flush_scope_answers(scope)
 
         return wrapper
     return decorator
 
 
-async def log_user_question(update: Update, context: ContextTypes.DEFAULT_TYPE, point: str = Point.TEXT):
+async def log_user_question(update: Update, context: ContextTypes.DEFAULT_TYPE, point: str = Point.TEXT) -> Optional[int]:
     """
     Логирует входящее сообщение пользователя как вопрос (только если его роль — auth или noauth).
 
     Функция сохраняет вопрос пользователя в лог, если его роль соответствует одной из разрешённых (auth, noauth, preauth).
+    Внутри `log_step` вопрос апдейта пишется только один раз.
 
     Args:
         update (Update): Объект обновления Telegram, содержащий информацию о сообщении.
@@ -109,42 +179,61 @@ async def log_user_question(update: Update, context: ContextTypes.DEFAULT_TYPE,
         point (str): Точка сценария для логирования (по умолчанию Point.TEXT).
 
     Returns:
-        None: Функция ничего не возвращает, но выполняет логирование вопроса.
+        Optional[int]: id строки вопроса в dialog_log (для `log_bot_answer`) или None, если вопрос не записан.
     """
     user = update.effective_user
     if not user:
-        return
+        return None
 
-    role = await get_user_role_by_id(user.id)
-    if role not in ("auth", "noauth", "preauth"):
-        return
+    scope = _active_scope(update)
+    if scope is not None and (scope.question_logged or not scope.should_log):
+        return scope.question_id
+
+    role = scope.role if scope is not None else await get_user_role_by_id(user.id)
+    if role not in LOGGED_ROLES:
+        return None
 
     message = update.message or (update.callback_query.message if update.callback_query else None)
     text = update.message.text if update.message else (
         update.callback_query.data if update.callback_query else ''
     )
 
-    if message and text:
-        await log_question(
-            user_id=user.id,
-            username=user.username,
-            message_id=message.message_id,
-            message_text=text,
-            point=point
-        )
-
+    if not (message and text):
+        return None
 
-async def log_bot_answer(update: Update, context: ContextTypes.DEFAULT_TYPE, msg_obj: Message, answer_text: str):
+    question_id = await log_question(
+        user_id=user.id,
+        username=user.username,
+        message_id=message.message_id,
+        message_text=text,
+        point=point
+    )
+    if scope is not None:
+        scope.question_id = question_id
+        scope.question_logged = True
+    return question_id
+
+
+async def log_bot_answer(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    msg_obj: Message,
+    answer_text: str,
+    question_id: Optional[int] = None
+):
     """
     Логирует ответ бота (msg_obj — это объект Message, возвращённый send/reply), только для auth и noauth.
 
     Функция сохраняет ответ бота в лог, если роль пользователя соответствует одной из разрешённых (auth, noauth, preauth).
+    Внутри `log_step` ответ копится в контексте апдейта и пишется вместе с остальными.
 
     Args:
         update (Update): Объект обновления Telegram, содержащий информацию о сообщении.
         context (ContextTypes.DEFAULT_TYPE): Контекст выполнения, содержащий данные пользователя.
         msg_obj (Message): Объект сообщения от бота, который нужно залогировать.
         answer_text (str): Текст ответа бота для логирования.
+        question_id (Optional[int]): id строки вопроса (результат `log_user_question`/`log_question`).
+            Если не передан — ответ привязывается к последнему неотвеченному вопросу.
 
     Returns:
         None: Функция ничего не возвращает, но выполняет логирование ответа.
@@ -154,8 +243,14 @@ async def log_bot_answer(update: Update, context: ContextTypes.DEFAULT_TYPE, msg
         logging.error(f"Ошибка логирования: не удалось получить пользователя или сообщение.")
         return
 
+    scope = _active_scope(update)
+    if scope is not None:
+        if scope.should_log:
+            scope.add_answer(msg_obj.message_id, answer_text)
+        return
+
     role = await get_user_role_by_id(user.id)
-    if role not in ("auth", "noauth", "preauth"):
+    if role not in LOGGED_ROLES:
         logging.warning(f"Роль пользователя {user.id} не позволяет логировать сообщение.")
         return
 
@@ -163,7 +258,8 @@ async def log_bot_answer(update: Update, context: ContextTypes.DEFAULT_TYPE, msg
         await log_answer(
             user_id=user.id,
             message_id=msg_obj.message_id,
-            answer_text=answer_text
+            answer_text=answer_text,
+            question_id=question_id
         )
         logging.info(f"log_bot_answer: logged answer for user {user.id}, message_id {msg_obj.message_id}")
     except Exception as e:
@@ -4,30 +4,173 @@ logger.py
 Логика логирования диалога:
 - log_question: сохраняет сообщение пользователя
 - log_answer: сохраняет ответ бота
+- DialogLogWriter: фоновая очередь, которая пишет события в dialog_log пачками
 """
 
+import asyncio
 import logging
-from datetime import datetime, timedelta
+import os
+from collections import deque
+from datetime import datetime
+from typing import Optional
 import pytz
-from dateutil import parser
 
 from db.dialog_log import (
-    get_last_session,
-    start_new_session,
     insert_question,
     insert_answer,
-    SESSION_TIMEOUT_MINUTES
+    reserve_dialog_ids,
+    write_dialog_batch,
 )
+from log_dialog.sessions import session_tracker
 
 
 moscow = pytz.timezone("Europe/Moscow")
 
+DIALOG_LOG_BATCH_SIZE = int(os.getenv("DIALOG_LOG_BATCH_SIZE", 100))
+DIALOG_LOG_FLUSH_INTERVAL = float(os.getenv("DIALOG_LOG_FLUSH_INTERVAL", 1.0))
+DIALOG_LOG_QUEUE_SIZE = int(os.getenv("DIALOG_LOG_QUEUE_SIZE", 10000))
+# Поведение при переполненной очереди: "block" — ждать места, "drop" — отбросить событие
+DIALOG_LOG_OVERFLOW = os.getenv("DIALOG_LOG_OVERFLOW", "block")
+
+
+class DialogLogWriter:
+    """
+    Write-behind очередь для dialog_log.
+
+    Хендлеры только кладут события в ограниченную очередь, а фоновая задача
+    сбрасывает их в БД пачками — по достижении `batch_size` событий или
+    по истечении `flush_interval` секунд с первого события пачки.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = DIALOG_LOG_BATCH_SIZE,
+        flush_interval: float = DIALOG_LOG_FLUSH_INTERVAL,
+        queue_size: int = DIALOG_LOG_QUEUE_SIZE,
+        overflow: str = DIALOG_LOG_OVERFLOW,
+    ) -> None:
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._overflow = overflow
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: asyncio.Task | None = None
+        # Заранее зарезервированные значения dialog_log.id для новых вопросов
+        self._reserved_ids: deque[int] = deque()
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Запускает фоновую задачу записи."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logging.info("[DIALOG_LOG] Фоновая запись dialog_log запущена")
+
+    async def stop(self) -> None:
+        """Дописывает всё, что осталось в очереди, и останавливает задачу."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logging.info("[DIALOG_LOG] Очередь dialog_log записана, запись остановлена")
+
+    async def next_question_id(self) -> Optional[int]:
+        """
+        Выдаёт id для новой строки вопроса, резервируя их у БД пачками по batch_size.
+
+        Returns:
+            Optional[int]: id строки или None, если зарезервировать не удалось.
+        """
+        if not self._reserved_ids:
+            self._reserved_ids.extend(await reserve_dialog_ids(self._batch_size))
+        return self._reserved_ids.popleft() if self._reserved_ids else None
+
+    async def put_question(self, args: tuple) -> None:
+        """Ставит в очередь вопрос (аргументы в порядке INSERT_QUESTION_QUERY)."""
+        await self._put(("question", args))
+
+    async def put_answer(self, args: tuple) -> None:
+        """Ставит в очередь ответ по id вопроса (аргументы UPDATE_ANSWER_BY_ID_QUERY)."""
+        await self._put(("answer", args))
+
+    async def put_answer_latest(self, args: tuple) -> None:
+        """Ставит в очередь ответ к последнему неотвеченному вопросу (аргументы UPDATE_ANSWER_QUERY)."""
+        await self._put(("answer_latest", args))
+
+    async def _put(self, event: tuple[str, tuple]) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            if self._overflow == "drop":
+                self.dropped += 1
+                logging.warning(f"[DIALOG_LOG] Очередь переполнена, событие отброшено (всего: {self.dropped})")
+                return
+            await self._queue.put(event)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            event = await self._queue.get()
+            if event is None:
+                break
+
+            batch = [event]
+            deadline = loop.time() + self._flush_interval
+            while len(batch) < self._batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if event is None:
+                    stopping = True
+                    break
+                batch.append(event)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[tuple[str, tuple]]) -> None:
+        try:
+            await write_dialog_batch(batch)
+        except Exception as e:
+            logging.error(f"[DIALOG_LOG] Не удалось записать пачку из {len(batch)} событий: {e}")
+
+
+_writer: DialogLogWriter | None = None
+
+
+async def start_dialog_log_writer() -> None:
+    """
+    Запускает глобальную write-behind очередь dialog_log.
+    Должна вызываться внутри event-loop (например, в post_init).
+    """
+    global _writer
+    if _writer is None:
+        _writer = DialogLogWriter()
+        _writer.start()
+
+
+async def stop_dialog_log_writer() -> None:
+    """
+    Сбрасывает накопленные события в БД и останавливает очередь.
+    Вызывается при завершении работы бота до закрытия пула.
+    """
+    global _writer
+    if _writer is not None:
+        await _writer.stop()
+        _writer = None
+
 
 async def get_or_create_session(user_id: int) -> tuple[str, int]:
     """
     Проверяет активную сессию пользователя. Возвращает session_id и следующий step.
     Если прошло более SESSION_TIMEOUT_MINUTES — создаёт новую сессию.
 
+    Сессии ведутся в памяти (см. `log_dialog.sessions`), dialog_log читается
+    только при первом обращении пользователя после старта процесса.
+
     Args:
         user_id (int): ID пользователя.
 
@@ -35,20 +178,7 @@ async def get_or_create_session(user_id: int) -> tuple[str, int]:
         tuple[str, int]: session_id и номер следующего шага.
     """
     now_msk = datetime.now(moscow).replace(tzinfo=None)
-    last_session = await get_last_session(user_id)
-
-    if last_session:
-        session_id, last_step, last_time = last_session
-
-        if isinstance(last_time, str):
-            last_time = parser.parse(last_time)
-        if isinstance(last_time, datetime):
-            last_time = last_time.replace(tzinfo=None)
-
-        if (now_msk - last_time) < timedelta(minutes=SESSION_TIMEOUT_MINUTES):
-            return session_id, last_step + 1
-
-    return start_new_session(), 1
+    return await session_tracker.next_step(user_id, now_msk)
 
 
 async def log_question(
@@ -57,7 +187,7 @@ async def log_question(
     message_id: int,
     message_text: str,
     point: str
-) -> None:
+) -> Optional[int]:
     """
     Логирует сообщение пользователя.
 
@@ -67,27 +197,51 @@ async def log_question(
         message_id (int): ID сообщения.
         message_text (str): Текст.
         point (str): Точка сценария.
+
+    Returns:
+        Optional[int]: id строки вопроса в dialog_log — передаётся в `log_answer`,
+        чтобы ответ записался ровно в эту строку.
     """
     session_id, step = await get_or_create_session(user_id)
     now_msk = datetime.now(moscow).replace(tzinfo=None)
-    await insert_question(session_id, step, user_id, username, message_id, message_text, point, now_msk)
+    if _writer is not None:
+        question_id = await _writer.next_question_id()
+        await _writer.put_question(
+            (session_id, step, user_id, username, message_id, message_text, now_msk, point, question_id)
+        )
+        return question_id
+    return await insert_question(
+        session_id, step, user_id, username, message_id, message_text, point, now_msk
+    )
 
 
 async def log_answer(
     user_id: int,
     message_id: int,
-    answer_text: str
+    answer_text: str,
+    question_id: Optional[int] = None,
+    answered_at: Optional[datetime] = None
 ) -> None:
     """
-    Логирует ответ бота к последнему шагу.
+    Логирует ответ бота.
+
+    Ответ записывается в строку вопроса `question_id` (результат `log_question`).
+    Без него — к последнему неотвеченному шагу пользователя.
 
     Args:
         user_id (int): Telegram ID.
         message_id (int): ID сообщения ответа.
         answer_text (str): Ответ бота.
+        question_id (Optional[int]): id строки вопроса в dialog_log.
+        answered_at (Optional[datetime]): Время ответа (naive, МСК), по умолчанию — текущее.
     """
     try:
-        now_msk = datetime.now(moscow).replace(tzinfo=None)
-        await insert_answer(user_id, message_id, answer_text, now_msk)
+        now_msk = answered_at or datetime.now(moscow).replace(tzinfo=None)
+        if _writer is None:
+            await insert_answer(user_id, message_id, answer_text, now_msk, question_id)
+        elif question_id is not None:
+            await _writer.put_answer((message_id, answer_text, now_msk, question_id))
+        else:
+            await _writer.put_answer_latest((message_id, answer_text, now_msk, user_id))
     except Exception as e:
         logging.error(f"[log_answer] Ошибка при вставке ответа: {e}")
@@ -0,0 +1,84 @@
+"""
+sessions.py
+
+Трекер сессий диалога в памяти процесса.
+
+Для каждого пользователя хранит (session_id, последний step, время последнего шага).
+Пока процесс работает, трекер считается источником истины: dialog_log читается
+только один раз при первом обращении пользователя, чтобы продолжить сессию,
+начатую до перезапуска. Сессии старше SESSION_TIMEOUT_MINUTES вытесняются.
+"""
+
+from datetime import datetime, timedelta
+from dateutil import parser
+
+from db.dialog_log import get_last_session, start_new_session, SESSION_TIMEOUT_MINUTES
+
+
+class SessionTracker:
+    """
+    Хранит активные сессии пользователей и выдаёт номер следующего шага.
+    """
+
+    def __init__(self, timeout_minutes: int = SESSION_TIMEOUT_MINUTES) -> None:
+        self._timeout = timedelta(minutes=timeout_minutes)
+        self._sessions: dict[int, tuple[str, int, datetime]] = {}
+        # Пользователи, для которых БД уже прочитана в этом процессе
+        self._seeded: set[int] = set()
+        self._last_sweep: datetime | None = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def next_step(self, user_id: int, now: datetime) -> tuple[str, int]:
+        """
+        Возвращает session_id и номер следующего шага пользователя.
+        Если прошло более SESSION_TIMEOUT_MINUTES — открывает новую сессию.
+
+        Args:
+            user_id (int): Telegram ID пользователя.
+            now (datetime): Текущее время (naive, МСК).
+
+        Returns:
+            tuple[str, int]: session_id и номер шага.
+        """
+        if user_id not in self._seeded:
+            await self._seed(user_id)
+
+        self._evict_expired(now)
+
+        session = self._sessions.get(user_id)
+        if session and (now - session[2]) < self._timeout:
+            session_id, step = session[0], session[1] + 1
+        else:
+            session_id, step = start_new_session(), 1
+
+        self._sessions[user_id] = (session_id, step, now)
+        return session_id, step
+
+    async def _seed(self, user_id: int) -> None:
+        last_session = await get_last_session(user_id)
+        # Пока ждали БД, параллельный апдейт мог уже завести сессию — она свежее.
+        if user_id in self._seeded:
+            return
+        self._seeded.add(user_id)
+        if not last_session:
+            return
+
+        session_id, last_step, last_time = last_session
+        if isinstance(last_time, str):
+            last_time = parser.parse(last_time)
+        if isinstance(last_time, datetime):
+            last_time = last_time.replace(tzinfo=None)
+        self._sessions[user_id] = (session_id, last_step, last_time)
+
+    def _evict_expired(self, now: datetime) -> None:
+        if self._last_sweep and (now - self._last_sweep) < self._timeout:
+            return
+        self._last_sweep = now
+        expired = [uid for uid, (_, _, last) in self._sessions.items() if (now - last) >= self._timeout]
+        for uid in expired:
+            del self._sessions[uid]
+
+
+session_tracker = SessionTracker()
@@ -0,0 +1,215 @@
+"""
+catalog.py
+
+Каталог макросов (vba_unit) и формул (vba_formule) в памяти процесса.
+
+- Загружается один раз в post_init; просмотр списков, кода макроса и формулы
+  больше не обращается к БД.
+- Снимок каталога неизменяем и вместе с данными хранит готовые клавиатуры
+  разделов «Макросы» и «Формулы» и скомпилированные шаблоны макросов
+  (macro.templates); шаблон с ошибкой в каталог шаблонов не попадает.
+- Изменения таблиц приходят через NOTIFY на канал CATALOG_CHANNEL (триггеры
+  trg_vba_catalog_*): каталог помечается устаревшим и перечитывается при
+  следующем обращении. Потеря LISTEN-соединения (payload None) делает то же самое.
+- Администратор может перечитать каталог вручную (кнопка «Обновить каталог»).
+- Страховка на случай пропущенных уведомлений — VBA_CATALOG_MAX_AGE секунд.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from db.macros import fetch_vba_catalog
+from macro.templates import SCENARIO_PLACEHOLDERS, MacroTemplate, TemplateError, compile_template
+
+VBA_CATALOG_MAX_AGE = float(os.getenv("VBA_CATALOG_MAX_AGE", 3600))
+
+
+@dataclass(frozen=True)
+class MacroEntry:
+    id: int
+    name: str
+    code: str
+
+
+@dataclass(frozen=True)
+class FormulaEntry:
+    id: int
+    name: str
+    code: str
+    comment: Optional[str]
+
+
+def _items_keyboard(names: List[str], prefix: str) -> InlineKeyboardMarkup:
+    buttons = [[InlineKeyboardButton(name, callback_data=f"{prefix}:{name}")] for name in names]
+    buttons.append([InlineKeyboardButton("⬅️ В главное меню", callback_data="back_to_main")])
+    return InlineKeyboardMarkup(buttons)
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    Неизменяемый снимок каталога.
+
+    Attributes:
+        macros (Dict[str, MacroEntry]): Макросы по имени (в порядке id).
+        formulas (Dict[str, FormulaEntry]): Формулы по имени (в порядке id).
+        macros_keyboard (InlineKeyboardMarkup): Клавиатура раздела «Макросы».
+        formulas_keyboard (InlineKeyboardMarkup): Клавиатура раздела «Формулы».
+        templates (Dict[str, MacroTemplate]): Скомпилированные шаблоны макросов по имени.
+        loaded_at (float): time.monotonic() загрузки.
+    """
+    macros: Dict[str, MacroEntry] = field(default_factory=dict)
+    formulas: Dict[str, FormulaEntry] = field(default_factory=dict)
+    macros_keyboard: InlineKeyboardMarkup = field(default_factory=lambda: _items_keyboard([], "macro"))
+    formulas_keyboard: InlineKeyboardMarkup = field(default_factory=lambda: _items_keyboard([], "formula"))
+    templates: Dict[str, MacroTemplate] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+    def macro_code(self, name: str) -> Optional[str]:
+        macro = self.macros.get(name)
+        return macro.code if macro else None
+
+
+def build_snapshot(
+    macros: List[Tuple[int, str, str]],
+    formulas: List[Tuple[int, str, str, str]],
+) -> CatalogSnapshot:
+    """
+    Собирает снимок каталога из строк vba_unit и vba_formule, компилирует шаблоны макросов.
+
+    Args:
+        macros (List[Tuple[int, str, str]]): (id, vba_name, vba_code).
+        formulas (List[Tuple[int, str, str, str]]): (id, имя, код, комментарий).
+
+    Returns:
+        CatalogSnapshot: Снимок с готовыми клавиатурами и шаблонами.
+    """
+    macro_entries = {name: MacroEntry(id_, name, code) for id_, name, code in macros}
+    formula_entries = {name: FormulaEntry(id_, name, code, comment) for id_, name, code, comment in formulas}
+    templates = {}
+    for macro in macro_entries.values():
+        try:
+            templates[macro.name] = compile_template(
+                macro.name, macro.code, SCENARIO_PLACEHOLDERS.get(macro.name, ())
+            )
+        except TemplateError as e:
+            logging.error(f"[VBA_CATALOG] {e}")
+    return CatalogSnapshot(
+        macros=macro_entries,
+        formulas=formula_entries,
+        macros_keyboard=_items_keyboard(list(macro_entries), "macro"),
+        formulas_keyboard=_items_keyboard(list(formula_entries), "formula"),
+        templates=templates,
+        loaded_at=time.monotonic(),
+    )
+
+
+class VbaCatalog:
+    """
+    Каталог макросов и формул с ленивой перезагрузкой после инвалидации.
+    """
+
+    def __init__(self, max_age: float = VBA_CATALOG_MAX_AGE) -> None:
+        self._max_age = max_age
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+        # Растёт при каждой инвалидации: загрузка, начатая до неё, не снимает флаг устаревания
+        self.generation = 0
+        self.hits = 0
+        self.reloads = 0
+        self.reload_errors = 0
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and not self._stale
+            and time.monotonic() - self._snapshot.loaded_at < self._max_age
+        )
+
+    async def get(self) -> CatalogSnapshot:
+        """
+        Возвращает актуальный снимок; устаревший каталог перечитывается.
+        Если БД недоступна, отдаётся прежний снимок (или пустой до первой загрузки).
+
+        Returns:
+            CatalogSnapshot: Снимок каталога.
+        """
+        if self._is_fresh():
+            self.hits += 1
+            return self._snapshot
+        try:
+            return await self.reload(force=False)
+        except Exception as e:
+            logging.error(f"[VBA_CATALOG] Не удалось перечитать каталог: {e}")
+            return self._snapshot or CatalogSnapshot()
+
+    async def reload(self, force: bool = True) -> CatalogSnapshot:
+        """
+        Перечитывает каталог из БД. Одновременные вызовы выполняют одну загрузку.
+
+        Args:
+            force (bool): Перечитать, даже если другой вызов только что обновил каталог.
+
+        Returns:
+            CatalogSnapshot: Новый снимок.
+
+        Raises:
+            Exception: Ошибка загрузки из БД (прежний снимок остаётся).
+        """
+        async with self._lock:
+            if not force and self._is_fresh():
+                return self._snapshot
+            generation = self.generation
+            try:
+                macros, formulas = await fetch_vba_catalog()
+            except Exception:
+                self.reload_errors += 1
+                raise
+            self._snapshot = build_snapshot(macros, formulas)
+            self.reloads += 1
+            if generation == self.generation:
+                self._stale = False
+            logging.info(
+                f"[VBA_CATALOG] Загружено макросов: {len(self._snapshot.macros)}, "
+                f"формул: {len(self._snapshot.formulas)}"
+            )
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        """Помечает каталог устаревшим; он перечитается при следующем обращении."""
+        self.generation += 1
+        self._stale = True
+
+    def on_notify(self, payload: Optional[str]) -> None:
+        """
+        Обработчик NOTIFY канала CATALOG_CHANNEL.
+        Payload — имя изменённой таблицы; None — уведомления могли быть потеряны.
+        Каталог в обоих случаях сбрасывается целиком.
+        """
+        self.invalidate()
+
+    def stats(self) -> dict:
+        """
+        Возвращает счётчики каталога.
+
+        Returns:
+            dict: hits, reloads, reload_errors, macros и formulas.
+        """
+        snapshot = self._snapshot or CatalogSnapshot()
+        return {
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "macros": len(snapshot.macros),
+            "formulas": len(snapshot.formulas),
+        }
+
+
+vba_catalog = VbaCatalog()
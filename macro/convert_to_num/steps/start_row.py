@@ -11,9 +11,9 @@ from telegram.constants import ParseMode
 
 from log_dialog.models_daig import Point
 from log_dialog.handlers_diag import log_step
-from db.macros import fetch_macro_by_name
+from macro.catalog import vba_catalog
 from macro.utils import send_response, escape_markdown_v2
-from log_dialog.handlers_diag import log_bot_answer, log_question
+from log_dialog.handlers_diag import log_bot_answer, log_user_question
 
 from macro.filter_rows.steps.column import ask_column
 from macro.convert_to_num.steps import (
@@ -158,23 +158,17 @@ async def ask_start_cell_step(update: Update, context: ContextTypes.DEFAULT_TYPE
     user_input = update.message.text.strip()
     logging.info(f"[START_CELL] Введено пользователем: {user_input}")
 
-    await log_question(
-        user_id=update.effective_user.id,
-        username=update.effective_user.username,
-        message_id=update.message.message_id,
-        message_text=user_input,
-        point=Point.START_ROW,
-    )
+    question_id = await log_user_question(update, context, point=Point.START_ROW)
 
     if not user_input.isdigit():
         error_text = "❌ Неверный формат номера строки.\nНужны цифры. \nПример: 1, 2 и т.д."
         bot_msg = await send_response(update, error_text)
-        await log_bot_answer(update, context, bot_msg, error_text)
+        await log_bot_answer(update, context, bot_msg, error_text, question_id)
         logging.warning(f"[START_CELL] Некорректный ввод строки: {user_input}")
 
         repeat_text = "📍 С какой строки преобразовать?\n Укажи цифру. \n Цифры выглядят так: 1, 2, 5"
         repeat_msg = await send_response(update, repeat_text)
-        await log_bot_answer(update, context, repeat_msg, repeat_text)
+        await log_bot_answer(update, context, repeat_msg, repeat_text, question_id)
         return
 
     start_cell = int(user_input)
@@ -183,13 +177,13 @@ async def ask_start_cell_step(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     confirm_text = f"✅ Начнём со строки: {start_cell}"
     confirm_msg = await send_response(update, confirm_text)
-    await log_bot_answer(update, context, confirm_msg, confirm_text)
+    await log_bot_answer(update, context, confirm_msg, confirm_text, question_id)
 
-    macro_template = await fetch_macro_by_name("Преобразовать_столбец_в_число")
+    macro_template = (await vba_catalog.get()).templates.get("Преобразовать_столбец_в_число")
     if not macro_template:
-        error_text = "⚠️ Макрос 'Преобразовать столбец в число' не найден в базе данных."
+        error_text = "⚠️ Шаблон макроса 'Преобразовать столбец в число' не найден."
         err_msg = await send_response(update, error_text)
-        await log_bot_answer(update, context, err_msg, error_text)
+        await log_bot_answer(update, context, err_msg, error_text, question_id)
         context.user_data.pop("macro_step", None)
         logging.error("[START_CELL] Шаблон макроса не найден.")
         return
@@ -198,21 +192,20 @@ async def ask_start_cell_step(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not column_num:
         error_text = "⚠️ Номер столбца не найден! Возможно, вы пропустили предыдущий шаг."
         err_msg = await send_response(update, error_text)
-        await log_bot_answer(update, context, err_msg, error_text)
+        await log_bot_answer(update, context, err_msg, error_text, question_id)
         logging.error(f"[START_CELL] column_num отсутствует: {context.user_data}")
         return
 
-    final_macro = (
-        macro_template
-        .replace("{user_input_column}", str(column_num))
-        .replace("{user_input_start_cell}", str(start_cell))
-    )
+    final_macro = macro_template.render({
+        "user_input_column": str(column_num),
+        "user_input_start_cell": str(start_cell),
+    })
     final_macro = escape_markdown_v2(final_macro)
     logging.info(f"[START_CELL] Сгенерирован макрос для столбца {str(column_num)}, строки {start_cell}")
 
     macro_msg_text = f"Твой макрос:\n\n```vba\n{final_macro}\n```"
     macro_msg = await send_response(update, macro_msg_text, parse_mode=ParseMode.MARKDOWN_V2)
-    await log_bot_answer(update, context, macro_msg, macro_msg_text)
+    await log_bot_answer(update, context, macro_msg, macro_msg_text, question_id)
 
     context.user_data["macro_step"] = "show_instruction"
     logging.info("[START_CELL] Переход к следующему шагу: show_instruction")
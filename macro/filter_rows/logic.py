@@ -8,13 +8,15 @@ logic.py
 import logging
 from telegram.helpers import escape_markdown
 
+from macro.templates import MacroTemplate
 
-def build_macro_from_context(macro_template: str, context_data: dict) -> str:
+
+def build_macro_from_context(macro_template: MacroTemplate, context_data: dict) -> str:
     """
     Генерирует финальный текст макроса, подставляя параметры из context.user_data в шаблон.
 
     Args:
-        macro_template (str): Шаблон макроса с плейсхолдерами.
+        macro_template (MacroTemplate): Скомпилированный шаблон макроса (macro.catalog).
         context_data (dict): Данные пользователя из context.user_data.
 
     Returns:
@@ -26,25 +28,22 @@ def build_macro_from_context(macro_template: str, context_data: dict) -> str:
 
     try:
         params = {
-            "{user_input_column}": str(context_data["column_num"]),
-            "{user_input_mode}": mode
+            "user_input_column": str(context_data["column_num"]),
+            "user_input_mode": mode
         }
 
         if mode == "manual":
             values = context_data.get("values", [])
-            params["{user_input_values}"] = ", ".join(values)
+            params["user_input_values"] = ", ".join(values)
         else:
             range_raw = context_data["selected_range"]
             params.update({
-                "{user_input_sheet}": context_data["sheet"],
-                "{user_input_range}": range_raw.split("!", 1)[-1] if "!" in range_raw else range_raw,
-                "{user_input_values}": '""'
+                "user_input_sheet": context_data["sheet"],
+                "user_input_range": range_raw.split("!", 1)[-1] if "!" in range_raw else range_raw,
+                "user_input_values": '""'
             })
 
-        for placeholder, value in params.items():
-            macro_template = macro_template.replace(placeholder, value)
-
-        return escape_markdown(macro_template, version=2)
+        return escape_markdown(macro_template.render(params), version=2)
 
     except KeyError as e:
         logging.error(f"Отсутствует обязательный параметр: {e}")
@@ -9,7 +9,7 @@ from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, Message
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 
-from db.macros import fetch_macro_by_name
+from macro.catalog import vba_catalog
 from macro.utils import send_response
 from macro.filter_rows.logic import build_macro_from_context
 from macro.filter_rows import state
@@ -54,10 +54,10 @@ async def confirm_macro(update: Update, context: ContextTypes.DEFAULT_TYPE) -> M
 
     try:
         logging.info("Пытаемся получить макрос по имени 'Фильтр_Строки'")
-        macro_template = await fetch_macro_by_name("Фильтр_Строки")
+        macro_template = (await vba_catalog.get()).templates.get("Фильтр_Строки")
 
         if not macro_template:
-            raise ValueError("Макрос не найден в базе данных")
+            raise ValueError("Шаблон макроса не найден в каталоге")
 
         logging.info("Макрос найден, строим макрос...")
         macro_code = build_macro_from_context(macro_template, context.user_data)
@@ -1,7 +1,7 @@
 """
 macros_logic.py
 
-Обработка запуска макросов и сценариев, а также возврат кода макроса из базы данных.
+Обработка запуска макросов и сценариев, а также возврат кода макроса из каталога (macro.catalog).
 """
 
 import logging
@@ -9,7 +9,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, Message
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 
-from db.macros import fetch_macro_by_name
+from macro.catalog import vba_catalog
 from log_dialog.handlers_diag import log_step
 from log_dialog.models_daig import Point
 
@@ -99,7 +99,7 @@ scenario_handlers = {
 @log_step(question_point=Point.SCENARIO, answer_text_getter=lambda msg: msg.text)
 async def run_macro_scenario(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Message | None:
     """
-    Запускает макрос как сценарий, либо возвращает VBA-код из БД.
+    Запускает макрос как сценарий, либо возвращает VBA-код из каталога.
 
     Args:
         update (Update): Объект Telegram.
@@ -146,7 +146,7 @@ async def handle_macro_code(
     Returns:
         Optional[Message]: Ответное сообщение.
     """
-    macro_code = await fetch_macro_by_name(macro_name)
+    macro_code = (await vba_catalog.get()).macro_code(macro_name)
     if not macro_code:
         await send_error_message(update, f"Макрос {macro_name} не найден.")
         return
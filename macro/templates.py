@@ -0,0 +1,93 @@
+"""
+templates.py
+
+Компиляция шаблонов макросов из vba_unit.
+
+Шаблон разбирается один раз (при загрузке каталога, macro.catalog) на чередующиеся
+литералы и плейсхолдеры вида {user_input_<имя>}; подстановка — один проход
+и один "".join вместо цепочки str.replace по всему тексту макроса.
+
+Для макросов-сценариев (SCENARIO_PLACEHOLDERS) при компиляции проверяется, что
+в шаблоне есть все плейсхолдеры, которые заполняет сценарий: ошибка в шаблоне
+видна при загрузке каталога, а не у пользователя в конце сценария.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Mapping, Tuple
+
+PLACEHOLDER_PATTERN = re.compile(r"\{(user_input_[a-z_]+)\}")
+
+# Плейсхолдеры, которые заполняют сценарии макросов (macro.macros_logic.scenario_handlers)
+SCENARIO_PLACEHOLDERS: Dict[str, FrozenSet[str]] = {
+    "Преобразовать_столбец_в_число": frozenset({"user_input_column", "user_input_start_cell"}),
+    "Фильтр_Строки": frozenset({
+        "user_input_column",
+        "user_input_mode",
+        "user_input_values",
+        "user_input_sheet",
+        "user_input_range",
+    }),
+}
+
+
+class TemplateError(ValueError):
+    """В шаблоне макроса нет плейсхолдеров, которые заполняет сценарий."""
+
+
+@dataclass(frozen=True)
+class MacroTemplate:
+    """
+    Скомпилированный шаблон макроса.
+
+    Attributes:
+        name (str): Имя макроса.
+        segments (Tuple[str, ...]): Литералы на чётных позициях, имена плейсхолдеров — на нечётных.
+    """
+    name: str
+    segments: Tuple[str, ...]
+
+    @property
+    def placeholders(self) -> FrozenSet[str]:
+        return frozenset(self.segments[1::2])
+
+    def render(self, values: Mapping[str, str]) -> str:
+        """
+        Подставляет значения в шаблон.
+        Плейсхолдер без значения остаётся в тексте как есть (как при str.replace).
+
+        Args:
+            values (Mapping[str, str]): Имя плейсхолдера без скобок -> значение.
+
+        Returns:
+            str: Текст макроса.
+        """
+        return "".join(
+            segment if i % 2 == 0 else values.get(segment, f"{{{segment}}}")
+            for i, segment in enumerate(self.segments)
+        )
+
+
+def compile_template(name: str, text: str, required: Iterable[str] = ()) -> MacroTemplate:
+    """
+    Разбирает текст макроса на литералы и плейсхолдеры.
+
+    Args:
+        name (str): Имя макроса.
+        text (str): Текст шаблона из vba_unit.
+        required (Iterable[str]): Плейсхолдеры, которые обязаны быть в шаблоне.
+
+    Returns:
+        MacroTemplate: Скомпилированный шаблон.
+
+    Raises:
+        TemplateError: В шаблоне нет части обязательных плейсхолдеров.
+    """
+    template = MacroTemplate(name=name, segments=tuple(PLACEHOLDER_PATTERN.split(text)))
+    missing = set(required) - template.placeholders
+    if missing:
+        raise TemplateError(
+            f"В шаблоне макроса '{name}' нет плейсхолдеров: "
+            + ", ".join(f"{{{p}}}" for p in sorted(missing))
+        )
+    return template
@@ -5,27 +5,62 @@ from dotenv import load_dotenv
 from telegram.ext import Application, JobQueue
 
 from db.connection import init_db_pool, close_db_pool
+from db.listener import add_notify_handler, start_notify_listener, stop_notify_listener
+from db.role_cache import role_cache, ROLE_CHANNEL
 from db.initialize_db import create_tables, populate_initial_data
+from db.export import shutdown_export_pool
+from db.result_cache import query_result_cache
+from db.statements import statements
+from db.macros import CATALOG_CHANNEL
+from db.migrations import apply_migrations
 from bot.core.register_handlers import register_all_handlers
 from bot.core.utils.setup_logger import setup_logger
 from bot.core.init_app import build_application
-from bot.core.role_monitor import role_monitor
+from bot.core.role_monitor import role_monitor, on_role_notify
+from bot.core.broadcast_jobs import schedule_active_broadcasts
+from macro.catalog import vba_catalog
+from log_dialog.logger import start_dialog_log_writer, stop_dialog_log_writer
 
 
 async def bot_post_init(application: Application) -> None:
     """Асинхронная инициализация, выполняемая **внутри** event‑loop PTB.
 
-    1. Инициализируем пул БД и создаём/заполняем таблицы.
-    2. Регистрируем корутину для фонов задачи мониторинга ролей, которая будет запускаться при старте.
-    3. Регистрируем корутину для закрытия пула при выключении бота.
+    1. Инициализируем пул БД, создаём таблицы, применяем миграции и заполняем данные.
+    2. Запускаем фоновую пакетную запись dialog_log.
+    3. Загружаем каталог макросов и формул и подписываемся на NOTIFY об изменении
+       ролей (кэш ролей и мониторинг ролей) и каталога.
+    4. Планируем сохранённые рассылки (в т.ч. прерванные перезапуском).
+    5. Регистрируем корутину, которая при выключении бота дописывает
+       очередь dialog_log, останавливает пул выгрузок и закрывает соединения с БД.
     """
     # 1️⃣  База данных
     await init_db_pool()
     await create_tables()
+    await apply_migrations()
     await populate_initial_data()
 
-    # 2️⃣  Закрытие пула при Shutdown
+    # 2️⃣  Write-behind очередь логов диалога
+    await start_dialog_log_writer()
+
+    # 3️⃣  Каталог макросов и LISTEN/NOTIFY для кэша ролей, мониторинга ролей и каталога
+    await vba_catalog.reload()
+    add_notify_handler(ROLE_CHANNEL, role_cache.on_notify)
+    add_notify_handler(ROLE_CHANNEL, on_role_notify)
+    add_notify_handler(CATALOG_CHANNEL, vba_catalog.on_notify)
+    await start_notify_listener()
+
+    # 4️⃣  Запланированные и незавершённые рассылки
+    await schedule_active_broadcasts(application)
+
+    # 5️⃣  Сброс очереди и закрытие соединений при Shutdown
     async def _on_shutdown(app: Application) -> None:
+        await stop_dialog_log_writer()
+        await stop_notify_listener()
+        logging.info(f"[ROLE_CACHE] Статистика: {role_cache.stats()}")
+        logging.info(f"[QUERY_CACHE] Статистика: {query_result_cache.stats()}")
+        logging.info(f"[VBA_CATALOG] Статистика: {vba_catalog.stats()}")
+        logging.info(f"[STATEMENTS] Статистика: {statements.stats()[:10]}")
+        shutdown_export_pool()
         await close_db_pool()
     application.post_shutdown = _on_shutdown
 
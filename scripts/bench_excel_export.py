@@ -0,0 +1,100 @@
+"""
+bench_excel_export.py
+
+Сравнение скорости df_to_excel_bytes с прежней реализацией
+(Alignment на каждую ячейку, обычная книга, ширина через astype(str)).
+
+Запуск:
+    python -m scripts.bench_excel_export
+    python -m scripts.bench_excel_export --cells 10000 100000
+"""
+
+import argparse
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.styles import Alignment
+from openpyxl.utils import get_column_letter
+
+from db.export import df_to_excel_bytes
+
+COLUMNS = 10
+
+
+def legacy_df_to_excel_bytes(df: pd.DataFrame) -> BytesIO:
+    """Прежняя реализация df_to_excel_bytes — эталон для сравнения."""
+    wb = Workbook()
+    ws = wb.active
+
+    for col_num, column in enumerate(df.columns, 1):
+        cell = ws.cell(row=1, column=col_num, value=column)
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+
+    for row_num, row in enumerate(df.itertuples(index=False), 2):
+        for col_num, value in enumerate(row, 1):
+            val = str(value)
+            if len(val) > 40:
+                val = val[:40]
+            cell = ws.cell(row=row_num, column=col_num, value=val)
+            cell.alignment = Alignment(wrap_text=True, horizontal="center", vertical="center")
+
+    for col_num, column in enumerate(df.columns, 1):
+        col_letter = get_column_letter(col_num)
+        max_len = max(
+            [len(str(df.columns[col_num - 1]))]
+            + [len(str(val)) for val in df.iloc[:, col_num - 1].astype(str).values]
+        )
+        ws.column_dimensions[col_letter].width = min(max_len + 2, 40)
+
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return output
+
+
+def make_frame(cells: int) -> pd.DataFrame:
+    """Таблица из COLUMNS колонок: числа, короткие и длинные строки, даты, пропуски."""
+    rows = max(cells // COLUMNS, 1)
+    rng = np.random.default_rng(42)
+    data = {}
+    for i in range(COLUMNS):
+        kind = i % 5
+        if kind == 0:
+            data[f"int_{i}"] = rng.integers(0, 1_000_000, rows)
+        elif kind == 1:
+            data[f"float_{i}"] = rng.random(rows)
+        elif kind == 2:
+            data[f"text_{i}"] = [f"значение {n}" for n in range(rows)]
+        elif kind == 3:
+            data[f"long_{i}"] = ["Длинный текст ответа бота " * 3] * rows
+        else:
+            data[f"date_{i}"] = pd.date_range("2025-01-01", periods=rows, freq="min")
+    df = pd.DataFrame(data)
+    df.iloc[::7, 1] = None
+    return df
+
+
+def measure(func, df: pd.DataFrame) -> tuple[float, int]:
+    started = time.perf_counter()
+    size = len(func(df).getvalue())
+    return time.perf_counter() - started, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'ячеек':>10} {'прежняя, с':>12} {'новая, с':>10} {'ускорение':>10}")
+    for cells in args.cells:
+        df = make_frame(cells)
+        legacy_time, _ = measure(legacy_df_to_excel_bytes, df)
+        new_time, _ = measure(df_to_excel_bytes, df)
+        print(f"{cells:>10} {legacy_time:>12.2f} {new_time:>10.2f} {legacy_time / new_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+check_import_time.py
+
+Проверка времени импорта бота по `python -X importtime`.
+
+- Модуль (по умолчанию main) импортируется в отдельном интерпретаторе,
+  время берётся из его накопительного (cumulative) значения.
+- Проверка падает, если импорт дольше IMPORT_TIME_BUDGET_MS или если при старте
+  загрузилась тяжёлая библиотека из HEAVY_MODULES (pandas, openpyxl, pyarrow,
+  psycopg2) — они должны импортироваться только в коде SQL-выгрузки.
+
+Запуск:
+    python -m scripts.check_import_time
+    python -m scripts.check_import_time --module bot.core.register_handlers --budget-ms 800 --top 15
+
+Код возврата 0 — бюджет соблюдён, 1 — нет.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 1500))
+HEAVY_MODULES = ("pandas", "openpyxl", "pyarrow", "psycopg2")
+# Корень репозитория: модуль импортируется оттуда, как при запуске main.py
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+
+
+def measure_imports(module: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Импортирует модуль в отдельном интерпретаторе с -X importtime.
+
+    Args:
+        module (str): Импортируемый модуль.
+
+    Returns:
+        dict: Имя модуля -> (собственное время, накопительное время) в микросекундах.
+
+    Raises:
+        RuntimeError: Модуль не импортировался.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT_DIR,
+    )
+    timings = {}
+    other = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            other.append(line)
+            continue
+        timings[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n" + "\n".join(other))
+    return timings
+
+
+def check(module: str, budget_ms: float, top: int) -> List[str]:
+    """
+    Проверяет бюджет импорта и печатает самые долгие модули.
+
+    Returns:
+        List[str]: Нарушения (пустой список — всё в порядке).
+    """
+    timings = measure_imports(module)
+    total_ms = timings[module][1] / 1000
+
+    print(f"import {module}: {total_ms:.0f} мс (бюджет {budget_ms:.0f} мс)")
+    for name, (own, _) in sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:top]:
+        print(f"  {own / 1000:8.1f} мс  {name}")
+
+    problems = []
+    if total_ms > budget_ms:
+        problems.append(f"импорт {module} занял {total_ms:.0f} мс при бюджете {budget_ms:.0f} мс")
+    for heavy in HEAVY_MODULES:
+        if heavy in timings:
+            problems.append(f"при старте импортируется {heavy}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    try:
+        problems = check(args.module, args.budget_ms, args.top)
+    except RuntimeError as e:
+        problems = [str(e)]
+    for problem in problems:
+        print(f"❌ {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()